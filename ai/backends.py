@@ -0,0 +1,304 @@
+# finance-bot/ai/backends.py
+"""
+Backends de LLM usados pelo chat (ai.llm_chat) e pelos relatórios (ai.reports).
+
+GeminiBackend é o padrão e fala com o Gemini pelo SDK (carregado só no primeiro uso).
+FakeBackend roda tudo localmente, sem rede nem GOOGLE_API_KEY: um roteiro determinístico
+decide que ferramentas o "modelo" chama a cada mensagem, com latência configurável.
+Serve para benchmarks e para rodar o bot offline:
+
+    FINANCEBOT_LLM_BACKEND=fake FINANCEBOT_FAKE_LLM_LATENCY=0.3 python chatbot/main.py
+
+ou, em código, set_backend(FakeBackend(script=..., latency=...)).
+"""
+import asyncio
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from ai.gemini import API_KEY, get_genai
+
+LLM_BACKEND = os.getenv("FINANCEBOT_LLM_BACKEND", "gemini")
+FAKE_LLM_LATENCY = float(os.getenv("FINANCEBOT_FAKE_LLM_LATENCY", "0") or 0) # Segundos por ida e volta ao "modelo"
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self):
+        self._tools = {}
+
+    def available(self) -> bool:
+        return bool(API_KEY)
+
+    def _get_tools(self, tool_declarations: list):
+        # Os FunctionDeclaration/Tool do SDK são montados uma vez por conjunto de ferramentas
+        key = tuple(declaration["name"] for declaration in tool_declarations)
+        if key not in self._tools:
+            types = get_genai().types
+            self._tools[key] = types.Tool(function_declarations=[types.FunctionDeclaration(**declaration) for declaration in tool_declarations])
+        return self._tools[key]
+
+    def start_chat(self, model_name: str, system_instruction: str, tool_declarations: list, temperature: float):
+        """Retorna (modelo, configuração de geração, chat vazio). É aqui que o SDK do Gemini é carregado."""
+        genai = get_genai()
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction, tools=[self._get_tools(tool_declarations)])
+        return model, genai.types.GenerationConfig(temperature=temperature), model.start_chat(history=[])
+
+    def generate_content(self, model_name: str, prompt: str):
+        return get_genai().GenerativeModel(model_name).generate_content(prompt)
+
+    def function_response_part(self, tool_name: str, response: dict):
+        protos = get_genai().protos
+        return protos.Part(function_response=protos.FunctionResponse(name=tool_name, response=response))
+
+    def text_content(self, role: str, text: str):
+        protos = get_genai().protos
+        return protos.Content(role=role, parts=[protos.Part(text=text)])
+
+
+# --- Backend local ---
+
+class FakeFunctionCall:
+    __slots__ = ("name", "args")
+
+    def __init__(self, name: str = "", args: dict | None = None):
+        self.name = name
+        self.args = args or {}
+
+
+class FakeFunctionResponse(NamedTuple):
+    name: str
+    response: dict
+
+
+_NO_FUNCTION_CALL = FakeFunctionCall()
+
+
+class FakePart:
+    """Imita a Part do SDK no que ai.llm_chat usa: text, function_call e function_response."""
+    __slots__ = ("text", "function_call", "function_response")
+
+    def __init__(self, text: str = "", function_call: FakeFunctionCall | None = None, function_response: FakeFunctionResponse | None = None):
+        self.text = text
+        self.function_call = function_call or _NO_FUNCTION_CALL
+        self.function_response = function_response
+
+    def __str__(self):
+        if self.function_call.name:
+            return f"function_call {self.function_call.name}({json.dumps(self.function_call.args, ensure_ascii=False)})"
+        if self.function_response is not None:
+            return f"function_response {self.function_response.name}: {json.dumps(self.function_response.response, ensure_ascii=False, default=str)}"
+        return self.text
+
+
+class FakeContent(NamedTuple):
+    role: str
+    parts: list
+
+
+class _FakeCandidate(NamedTuple):
+    content: FakeContent
+
+
+class FakeResponse:
+    def __init__(self, parts: list):
+        self.candidates = [_FakeCandidate(FakeContent("model", parts))]
+
+    @property
+    def text(self) -> str:
+        return "".join(part.text for part in self.candidates[0].content.parts if part.text)
+
+
+class ScriptedTurn(NamedTuple):
+    """O que o modelo falso faz com uma mensagem: chama as ferramentas de calls, em ordem, e responde text."""
+    calls: tuple = () # Pares (nome da ferramenta, argumentos)
+    text: str | None = None # None: um resumo determinístico das respostas das ferramentas
+
+
+_MONTHS = "janeiro|fevereiro|março|marco|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro"
+_PERIOD_PATTERN = re.compile(rf"\b(hoje|ontem|esta semana|semana passada|este mês|mês passado|este ano|ano passado|"
+                             rf"(?:{_MONTHS})(?: de \d{{4}})?)\b")
+_ADD_PATTERN = re.compile(r"\b(gastei|paguei|recebi|ganhei|investi)\s+(?:r\$\s*)?(\d+(?:[.,]\d{1,2})?)(?:\s+reais)?"
+                          r"(?:\s+(?:com|em|de|no|na)\s+([a-zà-ú ]+?))?(?:\s+(hoje|ontem))?$")
+_REPORT_JOB_PATTERN = re.compile(r"\brelatório\s+(\d+)\b")
+
+
+def keyword_script(message: str) -> ScriptedTurn:
+    """
+    Roteiro padrão do FakeBackend: escolhe a ferramenta por palavras-chave, como o modelo
+    faria com o prompt do FinanceBot. Mensagens sem ferramenta recebem uma resposta fixa.
+    """
+    text = message.lower().strip()
+    period_match = _PERIOD_PATTERN.search(text)
+    period = period_match.group(1) if period_match else "este mês"
+    add_match = _ADD_PATTERN.search(text)
+    if add_match:
+        verb, amount, category, day = add_match.groups()
+        return ScriptedTurn(calls=(("add_financial_transaction", {
+            "transaction_type": "entrada" if verb in ("recebi", "ganhei") else "saída",
+            "amount": float(amount.replace(",", ".")),
+            "category": "investimentos" if verb == "investi" else (category or "outros").strip(),
+            "date_str": day or "hoje",
+        }),))
+    job_match = _REPORT_JOB_PATTERN.search(text)
+    if job_match and ("status" in text or "pronto" in text):
+        return ScriptedTurn(calls=(("get_report_status", {"job_id": int(job_match.group(1))}),))
+    if "relatório" in text or "relatorio" in text:
+        return ScriptedTurn(calls=(("generate_financial_summary_report", {"period_description": period}),))
+    if "saldo" in text:
+        return ScriptedTurn(calls=(("get_account_balance", {"period_description": period}),))
+    if any(word in text for word in ("liste", "listar", "mostre", "quais")):
+        return ScriptedTurn(calls=(("list_transactions", {"period_description": period}),))
+    if "quanto" in text:
+        args = {"period_description": period, "transaction_type_filter": "entrada" if ("recebi" in text or "ganhei" in text) else "saída"}
+        category_match = re.search(r"\b(?:com|em)\s+([a-zà-ú]+)", text)
+        if category_match and category_match.group(1) not in ("este", "esta"):
+            args["category_filter"] = category_match.group(1)
+        return ScriptedTurn(calls=(("query_financial_transactions", args),))
+    return ScriptedTurn(text="Olá! Sou o FinanceBot (modo offline). Como posso ajudar?")
+
+
+def _summarize_responses(responses: list) -> str:
+    if not responses:
+        return "Pronto."
+    lines = []
+    for function_response in responses:
+        response = function_response.response
+        detail = response.get("message") or ", ".join(f"{key}={value}" for key, value in response.items()
+                                                      if key != "status" and not isinstance(value, (list, dict)))
+        lines.append(f"{function_response.name}: {response.get('status', 'ok')}" + (f" ({detail})" if detail else ""))
+    return "\n".join(lines)
+
+
+class _FakeStream:
+    """Resposta com stream=True: os trechos de texto saem em pedaços de chunk_chars caracteres."""
+
+    def __init__(self, parts: list, chunk_chars: int, chunk_latency: float):
+        self._parts = parts
+        self._chunk_chars = chunk_chars
+        self._chunk_latency = chunk_latency
+
+    def __iter__(self):
+        for part in self._parts:
+            if part.function_call.name or not part.text:
+                yield FakeResponse([part])
+                continue
+            for start in range(0, len(part.text), self._chunk_chars):
+                if start and self._chunk_latency:
+                    time.sleep(self._chunk_latency)
+                yield FakeResponse([FakePart(text=part.text[start:start + self._chunk_chars])])
+
+
+class FakeChat:
+    """Chat do FakeBackend, com a mesma interface (e o mesmo formato de histórico) usada em ai.llm_chat."""
+
+    def __init__(self, backend: "FakeBackend"):
+        self.backend = backend
+        self.history = []
+        self._pending_calls = []
+        self._turn = ScriptedTurn()
+        self._responses = []
+
+    def _reply(self, message) -> list:
+        if isinstance(message, str):
+            self.history.append(FakeContent("user", [FakePart(text=message)]))
+            self._turn = self.backend.next_turn(message)
+            self._pending_calls = list(self._turn.calls)
+            self._responses = []
+        else: # Respostas de ferramentas (uma Part ou uma lista delas)
+            parts = list(message) if isinstance(message, (list, tuple)) else [message]
+            self.history.append(FakeContent("user", parts))
+            self._responses.extend(part.function_response for part in parts if part.function_response is not None)
+        if self._pending_calls: # Uma chamada por resposta, como o loop síncrono de ChatManager espera
+            name, args = self._pending_calls.pop(0)
+            reply = [FakePart(function_call=FakeFunctionCall(name, dict(args)))]
+        else:
+            reply = [FakePart(text=self._turn.text if self._turn.text is not None else _summarize_responses(self._responses))]
+        self.history.append(FakeContent("model", reply))
+        return reply
+
+    def send_message(self, message, generation_config=None, stream: bool = False):
+        if self.backend.latency:
+            time.sleep(self.backend.latency)
+        reply = self._reply(message)
+        if stream:
+            return _FakeStream(reply, self.backend.stream_chunk_chars, self.backend.stream_chunk_latency)
+        return FakeResponse(reply)
+
+    async def send_message_async(self, message, generation_config=None):
+        if self.backend.latency:
+            await asyncio.sleep(self.backend.latency)
+        return FakeResponse(self._reply(message))
+
+
+class FakeBackend:
+    """
+    Modelo local e determinístico. script é uma função (mensagem -> ScriptedTurn) ou uma
+    sequência de ScriptedTurn, usada em ciclo; latency (segundos) é somada a cada ida e
+    volta, e stream_chunk_latency a cada trecho depois do primeiro nas respostas em stream.
+    """
+    name = "fake"
+
+    def __init__(self, script=keyword_script, latency: float = FAKE_LLM_LATENCY,
+                 stream_chunk_chars: int = 24, stream_chunk_latency: float = 0.0):
+        if callable(script):
+            self._script = script
+        else:
+            turns = itertools.cycle(list(script))
+            self._script = lambda message: next(turns)
+        self.latency = latency
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_latency = stream_chunk_latency
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return True
+
+    def next_turn(self, message: str) -> ScriptedTurn:
+        with self._lock: # Roteiros em sequência são compartilhados entre sessões
+            return self._script(message)
+
+    def start_chat(self, model_name: str, system_instruction: str, tool_declarations: list, temperature: float):
+        return None, None, FakeChat(self)
+
+    def generate_content(self, model_name: str, prompt: str):
+        if self.latency:
+            time.sleep(self.latency)
+        lines = prompt.count("\n") + 1
+        return FakeResponse([FakePart(text=f"Relatório (modo offline) gerado a partir de {lines} linhas e {len(prompt)} caracteres de contexto.")])
+
+    def function_response_part(self, tool_name: str, response: dict):
+        return FakePart(function_response=FakeFunctionResponse(tool_name, response))
+
+    def text_content(self, role: str, text: str):
+        return FakeContent(role, [FakePart(text=text)])
+
+
+_BACKENDS = {"gemini": GeminiBackend, "fake": FakeBackend}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Backend do processo, escolhido por FINANCEBOT_LLM_BACKEND ('gemini' ou 'fake') no primeiro uso."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = _BACKENDS.get(LLM_BACKEND)
+                if backend_class is None:
+                    raise ValueError(f"FINANCEBOT_LLM_BACKEND inválido: '{LLM_BACKEND}' (use {', '.join(_BACKENDS)}).")
+                _backend = backend_class()
+    return _backend
+
+
+def set_backend(backend):
+    """Troca o backend (ex.: por um FakeBackend com outro roteiro). Chats já iniciados continuam no anterior."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,31 @@
+# finance-bot/ai/gemini.py
+"""
+Acesso sob demanda ao SDK do Gemini. Importar google.generativeai (grpc, protobuf, ...)
+leva mais de um segundo, então o módulo só é importado e configurado na primeira chamada
+real ao modelo, e não na inicialização do CLI ou do dashboard.
+"""
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+API_KEY = os.getenv("GOOGLE_API_KEY")
+CHARS_PER_TOKEN_ESTIMATE = 4 # Aproximação usada para estimar tokens (histórico, prompts) sem chamar a API
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """Retorna google.generativeai já configurado com a API key. Levanta ValueError se ela faltar."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                if not API_KEY:
+                    raise ValueError("GOOGLE_API_KEY não configurada.")
+                import google.generativeai as genai
+                genai.configure(api_key=API_KEY)
+                _genai = genai
+    return _genai
@@ -0,0 +1,164 @@
+# finance-bot/ai/jobs.py
+"""
+Fila de tarefas em segundo plano para trabalho lento (hoje, a geração de relatórios pelo
+Gemini), para que o turno do chat responda na hora com o id da tarefa. As tarefas ficam
+na tabela jobs do SQLite (sobrevivem a reinícios) e são executadas por um pool de threads
+limitado, com novas tentativas e backoff exponencial. Quem quiser ser avisado do fim de
+uma tarefa registra um listener; o CLI e o dashboard também podem consultar get_job().
+"""
+import atexit
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from ai.reports import generate_period_report_with_status
+from utils import tracing
+from utils.db import (JOB_DONE, JOB_FAILED, claim_next_job, complete_job, current_tenant, enqueue_job, fail_job, get_job,
+                      get_job_stats, tenant_scope)
+
+JOB_WORKERS = 2 # Tarefas executadas ao mesmo tempo (limita chamadas simultâneas ao Gemini)
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BASE_SECONDS = 5.0 # Atraso da 1ª nova tentativa; dobra a cada falha
+JOB_LEASE_SECONDS = 300.0 # Depois disso, uma tarefa "executando" é considerada abandonada
+JOB_POLL_SECONDS = 2.0 # Intervalo de consulta ao banco (tarefas de outros processos ou em backoff)
+
+REPORT_JOB = "report"
+
+# Dono das tarefas enfileiradas no contexto atual (ex.: a sessão de chat que pediu o relatório)
+current_job_owner: ContextVar[str | None] = ContextVar("current_job_owner", default=None)
+
+
+def _retry_delay(attempts: int) -> float:
+    base = JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return base + random.uniform(0, JOB_RETRY_BASE_SECONDS) # Jitter para não sincronizar as novas tentativas
+
+
+class JobQueue:
+    """Pool de workers que consome a tabela jobs. handlers: {tipo: função(payload) -> str}."""
+
+    def __init__(self, handlers: dict, workers: int = JOB_WORKERS, poll_seconds: float = JOB_POLL_SECONDS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.handlers = dict(handlers)
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._threads = []
+        self._listeners = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Inicia os workers (idempotente). Tarefas pendentes de execuções anteriores são retomadas."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"financebot-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        self._wake.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def add_listener(self, callback):
+        """callback(job) é chamado (na thread do worker) quando uma tarefa termina, com sucesso ou falha definitiva."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> int | None:
+        if kind not in self.handlers:
+            raise ValueError(f"Tipo de tarefa desconhecido: '{kind}'.")
+        job_id = enqueue_job(kind, payload, owner=current_job_owner.get(), max_attempts=max_attempts, tenant_id=current_tenant.get())
+        if job_id is not None:
+            self.start()
+            self._wake.set()
+        return job_id
+
+    def wait(self, job_id: int, timeout: float | None = None, poll_seconds: float = 0.2) -> dict | None:
+        """Espera a tarefa terminar (ou o timeout) e retorna seu estado atual."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = get_job(job_id)
+            if job is None or job["status"] in (JOB_DONE, JOB_FAILED):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_seconds)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "running_workers": sum(t.is_alive() for t in self._threads), **get_job_stats()}
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            job = claim_next_job(self.lease_seconds)
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            self._run_job(job)
+
+    def _run_job(self, job: dict):
+        started = time.perf_counter()
+        try:
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                raise ValueError(f"Tipo de tarefa desconhecido: '{job['kind']}'.")
+            # Roda no shard do inquilino que enfileirou a tarefa, num trace próprio
+            with tenant_scope(job["tenant_id"]), tracing.start_trace(f"job.{job['kind']}", job_id=job["id"], attempt=job["attempts"]):
+                result = handler(job["payload"])
+        except Exception as e:
+            retry_delay = _retry_delay(job["attempts"]) if job["attempts"] < job["max_attempts"] else None
+            fail_job(job["id"], str(e), retry_delay)
+            retry_note = f"; nova tentativa em {retry_delay:.1f}s" if retry_delay is not None else "; sem novas tentativas"
+            print(f"Job {job['id']} ({job['kind']}): tentativa {job['attempts']} falhou após {time.perf_counter() - started:.2f}s: {e}{retry_note}")
+            if retry_delay is None:
+                self._notify(job["id"])
+            return
+        complete_job(job["id"], result)
+        print(f"Job {job['id']} ({job['kind']}): concluído em {time.perf_counter() - started:.2f}s (tentativa {job['attempts']})")
+        self._notify(job["id"])
+
+    def _notify(self, job_id: int):
+        if not self._listeners:
+            return
+        job = get_job(job_id)
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"Erro num listener da fila de tarefas: {e}")
+
+
+def _run_report_job(payload: dict) -> str:
+    report_text, ok = generate_period_report_with_status(payload["start_date"], payload["end_date"], payload["period_description"])
+    if not ok:
+        raise RuntimeError(report_text) # Deixa a fila tentar de novo
+    return report_text
+
+
+_job_queue: JobQueue | None = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Fila compartilhada do processo, com os handlers do FinanceBot. Os workers iniciam no primeiro enqueue ou em start()."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue({REPORT_JOB: _run_report_job})
+            atexit.register(_job_queue.stop, 1.0)
+        return _job_queue
+
+
+def enqueue_report_job(start_date: str, end_date: str, period_description: str) -> int | None:
+    return get_job_queue().enqueue(REPORT_JOB, {"start_date": start_date, "end_date": end_date, "period_description": period_description})
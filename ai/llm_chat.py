@@ -1,52 +1,98 @@
 # finance-bot/ai/llm_chat.py (VERSÃO DA SUA PERGUNTA ORIGINAL PARA O CHATBOT CONVERSACIONAL)
-import google.generativeai as genai
-# Esta linha abaixo é a que provavelmente causará erro com SDK 0.8.5 se os tipos não estiverem lá
-from google.generativeai.types import GenerationConfig, FunctionDeclaration, Tool 
+import asyncio
+import contextvars
+import functools
+import json
 import os
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
 
-from utils.db import add_transaction, get_transactions
+from ai.backends import get_backend
+from ai.gemini import CHARS_PER_TOKEN_ESTIMATE
+from ai.jobs import REPORT_JOB, enqueue_report_job
+from utils.db import JOB_DONE, JOB_FAILED, add_transaction, current_tenant, get_job, iter_transactions, sum_transactions, get_summary_totals
+from utils.models import Transaction
+from utils import metrics, tracing
 from utils.date_utils import parse_date_to_str, parse_period_to_dates
-from ai.reports import generate_detailed_financial_report 
+from ai.reports import generate_period_report, get_cached_period_report
 from chatbot.prompts import SYSTEM_PROMPT_FINANCEBOT
 
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
 MODEL_NAME_CHAT = 'gemini-1.5-flash-latest' 
+# Relatórios novos são gerados pela fila de tarefas (ai.jobs); FINANCEBOT_BACKGROUND_REPORTS=0 volta a gerar no próprio turno
+BACKGROUND_REPORTS = os.getenv("FINANCEBOT_BACKGROUND_REPORTS", "1") != "0"
 
-if API_KEY: genai.configure(api_key=API_KEY)
-else: raise ValueError("GOOGLE_API_KEY não configurada.")
+# --- Definição das Ferramentas ---
+# Dicts simples: os FunctionDeclaration/Tool do SDK só são montados quando o primeiro chat é iniciado (ver ai.backends)
+add_financial_transaction_tool = dict( name="add_financial_transaction", description="Registra uma nova transação financeira (gasto/saída ou receita/entrada).", parameters={ "type": "object", "properties": { "transaction_type": {"type": "string", "description": "O tipo de transação, deve ser 'entrada' ou 'saída'."}, "amount": {"type": "number", "description": "O valor numérico da transação."}, "category": {"type": "string", "description": "A categoria da transação (ex: alimentação, salário, transporte, lazer)."}, "date_str": {"type": "string", "description": "A data da transação. O LLM deve converter 'hoje', 'ontem' ou datas como '15/07' para o formato YYYY-MM-DD."}, "description": {"type": "string", "description": "Uma descrição opcional para a transação."} }, "required": ["transaction_type", "amount", "category", "date_str"] } )
+query_financial_transactions_tool = dict( name="query_financial_transactions", description="Busca e resume transações financeiras com base em filtros.", parameters={ "type": "object", "properties": { "transaction_type_filter": {"type": "string", "description": "Filtrar por 'entrada' ou 'saída'."}, "category_filter": {"type": "string", "description": "Filtrar por uma categoria específica. Opcional."}, "period_description": {"type": "string", "description": "A descrição do período."} }, "required": ["period_description"] } )
+list_transactions_tool = dict( name="list_transactions", description="Lista transações financeiras, uma página por vez (mais recentes primeiro).", parameters={ "type": "object", "properties": { "period_description": {"type": "string", "description": "A descrição do período."}, "transaction_type_filter": {"type": "string", "description": "Filtrar por 'entrada', 'saída', 'gasto', 'ganho' ou 'investimento'. Opcional."}, "category_filter": {"type": "string", "description": "Filtrar por uma categoria específica. Opcional."}, "page_cursor": {"type": "string", "description": "O next_cursor retornado pela página anterior, para continuar a listagem. Opcional."} }, "required": ["period_description"] } )
+generate_financial_summary_report_tool = dict( name="generate_financial_summary_report", description="Gera um relatório financeiro resumido.", parameters={ "type": "object", "properties": { "period_description": {"type": "string", "description": "A descrição do período para o relatório."} }, "required": ["period_description"] } )
+get_account_balance_tool = dict( name="get_account_balance", description="Calcula e retorna o saldo financeiro.", parameters={ "type": "object", "properties": { "period_description": {"type": "string", "description": "A descrição do período para o cálculo do saldo."} }, "required": ["period_description"] } )
+get_report_status_tool = dict( name="get_report_status", description="Consulta o andamento de um relatório gerado em segundo plano e retorna o texto quando estiver pronto.", parameters={ "type": "object", "properties": { "job_id": {"type": "integer", "description": "O número do relatório (job_id) retornado por generate_financial_summary_report."} }, "required": ["job_id"] } )
+FINANCE_TOOL_DECLARATIONS = [ add_financial_transaction_tool, query_financial_transactions_tool, list_transactions_tool, generate_financial_summary_report_tool, get_account_balance_tool, get_report_status_tool ]
 
-# --- Definição das Ferramentas (usando FunctionDeclaration e Tool importados) ---
-add_financial_transaction_tool = FunctionDeclaration( name="add_financial_transaction", description="Registra uma nova transação financeira (gasto/saída ou receita/entrada).", parameters={ "type": "object", "properties": { "transaction_type": {"type": "string", "description": "O tipo de transação, deve ser 'entrada' ou 'saída'."}, "amount": {"type": "number", "description": "O valor numérico da transação."}, "category": {"type": "string", "description": "A categoria da transação (ex: alimentação, salário, transporte, lazer)."}, "date_str": {"type": "string", "description": "A data da transação. O LLM deve converter 'hoje', 'ontem' ou datas como '15/07' para o formato YYYY-MM-DD."}, "description": {"type": "string", "description": "Uma descrição opcional para a transação."} }, "required": ["transaction_type", "amount", "category", "date_str"] } )
-query_financial_transactions_tool = FunctionDeclaration( name="query_financial_transactions", description="Busca e resume transações financeiras com base em filtros.", parameters={ "type": "object", "properties": { "transaction_type_filter": {"type": "string", "description": "Filtrar por 'entrada' ou 'saída'."}, "category_filter": {"type": "string", "description": "Filtrar por uma categoria específica. Opcional."}, "period_description": {"type": "string", "description": "A descrição do período."} }, "required": ["period_description"] } )
-generate_financial_summary_report_tool = FunctionDeclaration( name="generate_financial_summary_report", description="Gera um relatório financeiro resumido.", parameters={ "type": "object", "properties": { "period_description": {"type": "string", "description": "A descrição do período para o relatório."} }, "required": ["period_description"] } )
-get_account_balance_tool = FunctionDeclaration( name="get_account_balance", description="Calcula e retorna o saldo financeiro.", parameters={ "type": "object", "properties": { "period_description": {"type": "string", "description": "A descrição do período para o cálculo do saldo."} }, "required": ["period_description"] } )
-FINANCE_TOOLS = Tool(function_declarations=[ add_financial_transaction_tool, query_financial_transactions_tool, generate_financial_summary_report_tool, get_account_balance_tool ])
+def _start_chat():
+    """Cria o modelo, a configuração de geração e um chat vazio no backend atual (com o Gemini, é aqui que o SDK é carregado)."""
+    return get_backend().start_chat(MODEL_NAME_CHAT, SYSTEM_PROMPT_FINANCEBOT, FINANCE_TOOL_DECLARATIONS, temperature=0.7)
 
 # --- Lógica das Funções de Ferramenta (como definido antes) ---
 def _tool_add_financial_transaction(transaction_type: str, amount: float, category: str, date_str: str, description: str = ""):
     parsed_date = parse_date_to_str(date_str)
     if not parsed_date: return {"status": "erro", "message": f"Data inválida: '{date_str}'."}
     if transaction_type.lower() not in ["entrada", "saída"]: return {"status": "erro", "message": f"Tipo inválido: '{transaction_type}'."}
-    transaction_id = add_transaction(type=transaction_type.lower(), amount=float(amount), category=category.lower().strip(), description=(description.strip() if description else ""), date_str=parsed_date)
-    if transaction_id: return {"status": "sucesso", "message": "Registrado.", "transaction_details": {"id": transaction_id, "type": transaction_type.lower(), "amount": float(amount), "category": category.lower().strip(), "date": parsed_date, "description": (description.strip() if description else "")}}
+    transaction = Transaction(None, transaction_type.lower(), float(amount), category.lower().strip(), description.strip() if description else "", parsed_date)
+    transaction_id = add_transaction(type=transaction.type, amount=transaction.amount, category=transaction.category, description=transaction.description, date_str=transaction.date)
+    if transaction_id: return {"status": "sucesso", "message": "Registrado.", "transaction_details": transaction._replace(id=transaction_id).to_dict()}
     else: return {"status": "erro", "message": "Erro no DB."}
 
 def _tool_query_financial_transactions(period_description: str, transaction_type_filter: str = None, category_filter: str = None):
     start_date, end_date, period_desc_for_user = parse_period_to_dates(period_description)
     if not start_date or not end_date: return {"status": "erro", "message": period_desc_for_user}
-    transactions = get_transactions(start_date=start_date, end_date=end_date, category=category_filter.lower().strip() if category_filter else None, transaction_type=transaction_type_filter.lower() if transaction_type_filter else None)
-    if not transactions: return {"status": "sucesso", "found_transactions": False, "message": "Nenhuma transação encontrada.", "period_details_for_user": period_desc_for_user, "category_filter_used": category_filter, "type_filter_used": transaction_type_filter}
-    total_amount = sum(t['amount'] for t in transactions); count = len(transactions)
-    return {"status": "sucesso", "found_transactions": True, "total_amount": total_amount, "count": count, "period_details_for_user": period_desc_for_user, "category_filter_used": category_filter, "type_filter_used": transaction_type_filter}
+    totals = sum_transactions(start_date=start_date, end_date=end_date, category=category_filter.lower().strip() if category_filter else None, transaction_type=transaction_type_filter.lower() if transaction_type_filter else None)
+    if not totals["count"]: return {"status": "sucesso", "found_transactions": False, "message": "Nenhuma transação encontrada.", "period_details_for_user": period_desc_for_user, "category_filter_used": category_filter, "type_filter_used": transaction_type_filter}
+    return {"status": "sucesso", "found_transactions": True, "total_amount": totals["total"], "count": totals["count"], "period_details_for_user": period_desc_for_user, "category_filter_used": category_filter, "type_filter_used": transaction_type_filter}
+
+LIST_PAGE_SIZE = 20 # Transações por página em list_transactions
+
+# Tipos aceitos em list_transactions -> (tipo no banco, categoria implícita)
+_LIST_TYPE_FILTERS = {"entrada": ("entrada", None), "ganho": ("entrada", None), "saída": ("saída", None), "saida": ("saída", None),
+                      "gasto": ("saída", None), "investimento": ("saída", "investimentos")}
+
+def _tool_list_transactions(period_description: str, transaction_type_filter: str = None, category_filter: str = None, page_cursor: str = None):
+    start_date, end_date, period_desc_for_user = parse_period_to_dates(period_description)
+    if not start_date or not end_date: return {"status": "erro", "message": period_desc_for_user}
+    transaction_type, category = None, category_filter.lower().strip() if category_filter else None
+    if transaction_type_filter:
+        if transaction_type_filter.lower() not in _LIST_TYPE_FILTERS: return {"status": "erro", "message": f"Tipo inválido: '{transaction_type_filter}'."}
+        transaction_type, implied_category = _LIST_TYPE_FILTERS[transaction_type_filter.lower()]
+        category = category or implied_category
+    after = None
+    if page_cursor:
+        # Cursor "data|id" da última transação da página anterior (paginação por chave, sem OFFSET)
+        cursor_date, _, cursor_id = page_cursor.partition("|")
+        if not cursor_id.isdigit(): return {"status": "erro", "message": f"Cursor de página inválido: '{page_cursor}'."}
+        after = (cursor_date, int(cursor_id))
+    rows = iter_transactions(start_date=start_date, end_date=end_date, category=category, transaction_type=transaction_type,
+                             batch_size=LIST_PAGE_SIZE + 1, after=after)
+    page = list(islice(rows, LIST_PAGE_SIZE + 1)) # Uma linha a mais só para saber se há próxima página
+    items = [transaction.to_dict() for transaction in page[:LIST_PAGE_SIZE]]
+    next_cursor = f"{items[-1]['date']}|{items[-1]['id']}" if len(page) > LIST_PAGE_SIZE else None
+    return {"status": "sucesso", "found_transactions": bool(items), "transactions": items, "next_cursor": next_cursor, "period_details_for_user": period_desc_for_user}
 
 def _tool_generate_financial_summary_report(period_description: str):
     start_date, end_date, period_desc_for_user = parse_period_to_dates(period_description)
     if not start_date or not end_date: return {"status": "erro", "message": period_desc_for_user}
-    transactions = get_transactions(start_date=start_date, end_date=end_date)
-    if not transactions: return {"status": "sucesso", "report_generated": False, "message": "Não há transações.", "period_details_for_user": period_desc_for_user}
-    report_text = generate_detailed_financial_report(transactions, period_desc_for_user)
+    if not sum_transactions(start_date=start_date, end_date=end_date)["count"]: return {"status": "sucesso", "report_generated": False, "message": "Não há transações.", "period_details_for_user": period_desc_for_user}
+    report_text = get_cached_period_report(start_date, end_date)
+    if report_text is None and BACKGROUND_REPORTS:
+        # A geração leva segundos: o turno responde já com o número da tarefa
+        job_id = enqueue_report_job(start_date, end_date, period_desc_for_user)
+        if job_id is not None:
+            return {"status": "sucesso", "report_generated": False, "job_id": job_id, "message": f"Relatório em geração (número {job_id}). Ele aparecerá aqui quando ficar pronto.", "period_details_for_user": period_desc_for_user}
+    if report_text is None:
+        # Períodos grandes vão ao modelo como agregados, dentro de um orçamento de tokens
+        report_text = generate_period_report(start_date, end_date, period_desc_for_user)
     return {"status": "sucesso", "report_generated": True, "report_text": report_text, "period_details_for_user": period_desc_for_user}
 
 def _tool_get_account_balance(period_description: str):
@@ -54,49 +100,306 @@ def _tool_get_account_balance(period_description: str):
     if not start_date or not end_date:
         if period_description.lower() == "todo o período" or not period_description: start_date, end_date = None, None; period_desc_for_user = "todo o período"
         else: return {"status": "erro", "message": period_desc_for_user}
-    transactions = get_transactions(start_date=start_date, end_date=end_date)
-    total_entradas = sum(t['amount'] for t in transactions if t['type'] == 'entrada')
-    total_saidas = sum(t['amount'] for t in transactions if t['type'] == 'saída')
-    saldo = total_entradas - total_saidas
-    return {"status": "sucesso", "balance": saldo, "total_income": total_entradas, "total_expenses": total_saidas, "period_details_for_user": period_desc_for_user}
+    totals = get_summary_totals(start_date=start_date, end_date=end_date) # Somas feitas no SQLite, em centavos
+    total_saidas = totals["expenses"] + totals["investments"]
+    return {"status": "sucesso", "balance": totals["balance"], "total_income": totals["income"], "total_expenses": total_saidas, "period_details_for_user": period_desc_for_user}
+
+def _tool_get_report_status(job_id: int):
+    job = get_job(int(job_id))
+    if job is None or job["kind"] != REPORT_JOB or job["tenant_id"] != current_tenant.get(): return {"status": "erro", "message": f"Relatório {job_id} não encontrado."}
+    response = {"status": "sucesso", "job_id": job["id"], "job_status": job["status"], "attempts": job["attempts"], "period_details_for_user": job["payload"]["period_description"]}
+    if job["status"] == JOB_DONE: response["report_text"] = job["result"]
+    elif job["status"] == JOB_FAILED: response["error"] = job["error"]
+    return response
+
+AVAILABLE_TOOL_FUNCTIONS = {"add_financial_transaction": _tool_add_financial_transaction, "query_financial_transactions": _tool_query_financial_transactions, "list_transactions": _tool_list_transactions, "generate_financial_summary_report": _tool_generate_financial_summary_report, "get_account_balance": _tool_get_account_balance, "get_report_status": _tool_get_report_status}
+
+def _instrument_tool(name: str, function):
+    """Latência e erros por ferramenta (financebot_tool_call_seconds{tool=...}) e um span tool.<name> por chamada."""
+    function = metrics.timed("financebot_tool_call_seconds", tool=name)(function)
+    @functools.wraps(function)
+    def wrapper(**kwargs):
+        if not tracing.enabled():
+            return function(**kwargs)
+        with tracing.span(f"tool.{name}", **{"tool.args": json.dumps(kwargs, ensure_ascii=False, default=str)[:500]}) as span:
+            result = function(**kwargs)
+            if isinstance(result, dict):
+                span.set_attribute("tool.status", result.get("status"))
+            return result
+    return wrapper
+
+AVAILABLE_TOOL_FUNCTIONS = {name: _instrument_tool(name, function) for name, function in AVAILABLE_TOOL_FUNCTIONS.items()}
+GEMINI_REQUEST_METRIC = "financebot_gemini_request_seconds"
+
+def _function_calls(response) -> list:
+    """Todas as chamadas de função de um turno do modelo (pode haver mais de uma)."""
+    return [part.function_call for part in response.candidates[0].content.parts if part.function_call.name]
+
+def _function_response_part(tool_name: str, tool_response_data: dict):
+    return get_backend().function_response_part(tool_name, tool_response_data)
+
+def _estimate_content_tokens(content) -> int:
+    chars = sum(len(part.text) if part.text else len(str(part)) for part in content.parts)
+    return chars // CHARS_PER_TOKEN_ESTIMATE
+
+def estimate_history_tokens(history) -> int:
+    """Estimativa barata do número de tokens reenviados a cada mensagem com este histórico."""
+    return sum(_estimate_content_tokens(content) for content in history)
+
+def _is_user_turn_start(content) -> bool:
+    # Respostas de ferramenta também têm role 'user', mas não iniciam um turno
+    return content.role == "user" and any(part.text for part in content.parts)
+
+def trim_chat_history(chat, max_tokens: int) -> int:
+    """
+    Remove os turnos mais antigos (sempre turnos completos, para não separar uma chamada
+    de função da sua resposta) até o histórico caber em max_tokens. Retorna quantas
+    entradas foram removidas.
+    """
+    history = list(chat.history)
+    sizes = [_estimate_content_tokens(content) for content in history]
+    remaining = sum(sizes)
+    start = 0
+    while remaining > max_tokens:
+        next_turn = next((i for i in range(start + 1, len(history)) if _is_user_turn_start(history[i])), None)
+        if next_turn is None: # Só resta o turno atual: mantém
+            break
+        remaining -= sum(sizes[start:next_turn])
+        start = next_turn
+    if start:
+        chat.history = history[start:]
+    return start
+
+def append_exchange_to_history(chat, user_message: str, bot_response: str):
+    """Registra no histórico um turno respondido fora do modelo, para manter o contexto da conversa."""
+    backend = get_backend()
+    chat.history = list(chat.history) + [backend.text_content("user", user_message), backend.text_content("model", bot_response)]
+
+def _call_tool(tool_name: str, tool_args: dict) -> dict:
+    """Executa uma ferramenta pelo nome e devolve o dict de resposta (também em caso de erro)."""
+    print(f"LLM: {tool_name}({tool_args})")
+    tool_function = AVAILABLE_TOOL_FUNCTIONS.get(tool_name)
+    if tool_function is None:
+        print(f"Erro: Ferramenta desconhecida '{tool_name}'.")
+        return {"status": "erro", "message": "Ferramenta não implementada."}
+    try:
+        tool_response_data = tool_function(**tool_args)
+    except Exception as e:
+        print(f"Erro na ferramenta '{tool_name}': {e}")
+        tool_response_data = {"status": "erro", "message": f"Erro ao executar a ferramenta: {e}"}
+    print(f"Tool: {tool_response_data}")
+    return tool_response_data
+
+class _LazyChatMixin:
+    """
+    Modelo e chat criados no primeiro uso (ver chat): o import do SDK do Gemini é lento.
+    Turnos respondidos sem o modelo (caminho rápido) ficam guardados como pares de texto
+    e só entram no histórico do chat quando ele é criado.
+    """
+    def _init_lazy_chat(self):
+        self.model = self.generation_config = None
+        self._chat = None
+        self._pending_exchanges = [] # (mensagem do usuário, resposta) ainda fora do chat
+
+    @property
+    def has_chat(self) -> bool:
+        return self._chat is not None
 
-AVAILABLE_TOOL_FUNCTIONS = {"add_financial_transaction": _tool_add_financial_transaction, "query_financial_transactions": _tool_query_financial_transactions, "generate_financial_summary_report": _tool_generate_financial_summary_report, "get_account_balance": _tool_get_account_balance}
+    @property
+    def chat(self):
+        if self._chat is None:
+            self.model, self.generation_config, chat = _start_chat() # Esta linha usa start_chat
+            for user_message, bot_response in self._pending_exchanges:
+                append_exchange_to_history(chat, user_message, bot_response)
+            self._pending_exchanges = []
+            self._chat = chat
+        return self._chat
 
-class ChatManager:
+    @property
+    def pending_exchanges(self) -> list[tuple[str, str]]:
+        return list(self._pending_exchanges)
+
+    def trim_history(self, max_tokens: int) -> int:
+        if self._chat is not None:
+            return trim_chat_history(self._chat, max_tokens)
+        # Sem chat, poda os pares guardados (mais antigos primeiro); conta entradas, como no histórico
+        removed = 0
+        while self._pending_exchanges and sum(len(user) + len(bot) for user, bot in self._pending_exchanges) // CHARS_PER_TOKEN_ESTIMATE > max_tokens:
+            self._pending_exchanges.pop(0)
+            removed += 2
+        return removed
+
+    def record_exchange(self, user_message: str, bot_response: str):
+        if self._chat is None:
+            self._pending_exchanges.append((user_message, bot_response))
+        else:
+            append_exchange_to_history(self._chat, user_message, bot_response)
+
+class ChatManager(_LazyChatMixin):
     def __init__(self):
-        self.model = genai.GenerativeModel(MODEL_NAME_CHAT, system_instruction=SYSTEM_PROMPT_FINANCEBOT, tools=[FINANCE_TOOLS])
-        self.generation_config = GenerationConfig(temperature=0.7)
-        self.chat = self.model.start_chat(history=[]) # Esta linha usa start_chat
+        self._init_lazy_chat()
+
+    def _send(self, message):
+        with tracing.span("gemini.send_message", call="chat"), metrics.timer(GEMINI_REQUEST_METRIC, call="chat"):
+            return self.chat.send_message(message, generation_config=self.generation_config)
 
     def send_message(self, user_message: str) -> str:
         try:
-            response = self.chat.send_message(user_message, generation_config=self.generation_config)
-            # Esta parte do loop é a que precisa ser compatível com a forma como a SDK 0.8.5
-            # retorna function_call e como ela espera function_response.
-            # A versão original usava genai.Part para a resposta da função.
-            # Se genai.Part não existir, isso falhará.
+            response = self._send(user_message)
+            # Cada function_call é respondida com uma Part de function_response montada pelo
+            # backend (protos.Part no Gemini), a mesma usada no streaming e na versão assíncrona.
             while response.candidates[0].content.parts[0].function_call.name:
                 function_call_part = response.candidates[0].content.parts[0].function_call
                 tool_name = function_call_part.name
                 tool_args = dict(function_call_part.args)
-                print(f"LLM: {tool_name}({tool_args})")
-                if tool_name in AVAILABLE_TOOL_FUNCTIONS:
-                    tool_response_data = AVAILABLE_TOOL_FUNCTIONS[tool_name](**tool_args)
-                    print(f"Tool: {tool_response_data}")
-                    # A linha abaixo (genai.Part) é um ponto provável de falha com SDK 0.8.5 se genai.Part não existir
-                    response = self.chat.send_message(
-                        genai.Part(function_response={'name': tool_name, 'response': tool_response_data}),
-                        generation_config=self.generation_config
-                    )
-                else:
-                    print(f"Erro: Ferramenta desconhecida '{tool_name}'.")
-                    response = self.chat.send_message(
-                        genai.Part(function_response={'name': tool_name, 'response': {"status": "erro", "message": "Ferramenta não implementada."}}),
-                        generation_config=self.generation_config
-                    )
+                response = self._send(_function_response_part(tool_name, _call_tool(tool_name, tool_args)))
             return response.candidates[0].content.parts[0].text
         except Exception as e:
             print(f"Erro em send_message: {e}")
             import traceback
             traceback.print_exc()
-            return "Transação registrada"
\ No newline at end of file
+            return "Transação registrada"
+
+    def send_message_stream(self, user_message: str):
+        """
+        Versão em streaming de send_message: gera os trechos de texto à medida que o Gemini
+        os produz. Chamadas de função que chegam no meio do stream são executadas quando o
+        stream daquele turno termina, e a resposta seguinte do modelo também é transmitida.
+        """
+        try:
+            message = user_message
+            while True:
+                function_calls = []
+                # Mede até o fim do stream, incluindo o tempo que quem consome leva com cada trecho
+                with tracing.span("gemini.send_message", call="chat_stream") as span, metrics.timer(GEMINI_REQUEST_METRIC, call="chat_stream"):
+                    response = self.chat.send_message(message, generation_config=self.generation_config, stream=True)
+                    for chunk in response: # Consumir o stream inteiro registra o turno no histórico
+                        for part in chunk.candidates[0].content.parts:
+                            if part.function_call.name:
+                                function_calls.append(part.function_call)
+                            elif part.text:
+                                span.add("gemini.chunks", 1)
+                                yield part.text
+                if not function_calls:
+                    break
+                message = [_function_response_part(call.name, _call_tool(call.name, dict(call.args))) for call in function_calls]
+        except Exception as e:
+            print(f"Erro em send_message_stream: {e}")
+            import traceback
+            traceback.print_exc()
+            yield "Desculpe, ocorreu um erro ao processar sua mensagem."
+
+# --- Versão assíncrona (não bloqueia o loop do chamador) ---
+TOOL_EXECUTOR_MAX_WORKERS = 4
+DEFAULT_TURN_TIMEOUT_SECONDS = 60.0
+# Ferramentas que gravam algo (uma transação, uma tarefa na fila): se o turno for interrompido
+# depois que uma delas rodou, o histórico e o usuário precisam saber, senão a repetição duplica
+WRITE_TOOLS = {"add_financial_transaction", "generate_financial_summary_report"}
+_tool_executor: ThreadPoolExecutor | None = None
+
+def _get_tool_executor() -> ThreadPoolExecutor:
+    # As ferramentas acessam o SQLite de forma síncrona: rodam neste pool de threads, cada
+    # uma com sua conexão persistente (ver utils.db.get_db_connection).
+    global _tool_executor
+    if _tool_executor is None:
+        _tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_MAX_WORKERS, thread_name_prefix="financebot-tool")
+    return _tool_executor
+
+def _describe_write(result: dict) -> str:
+    details = result.get("transaction_details")
+    if details:
+        amount = f"R$ {details['amount']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return f"{details['type']} de {amount} em '{details['category']}' no dia {details['date']} registrada"
+    return result.get("message", "operação concluída")
+
+def _partial_turn_message(problem: str, writes: list[str]) -> str:
+    return f"{problem}, mas parte do pedido já foi feita ({'; '.join(writes)}). Confira antes de repetir a mensagem."
+
+class AsyncChatManager(_LazyChatMixin):
+    """
+    Equivalente assíncrono do ChatManager: as chamadas ao Gemini usam send_message_async,
+    as ferramentas rodam num pool de threads e as chamadas de função independentes de um
+    mesmo turno do modelo são executadas em paralelo. Cada mensagem tem um timeout
+    configurável e pode ser cancelada; nesses casos o histórico volta ao estado anterior,
+    depois de esperar as ferramentas que já estavam rodando. Se alguma delas gravou algo,
+    o turno fica no histórico como um resumo do que foi feito e a resposta avisa o usuário.
+    """
+    def __init__(self, timeout: float | None = DEFAULT_TURN_TIMEOUT_SECONDS, executor: ThreadPoolExecutor | None = None):
+        self._init_lazy_chat() # Chat criado no primeiro uso, como no ChatManager
+        self.timeout = timeout
+        self._executor = executor
+        self._lock = asyncio.Lock() # Um turno por vez: o histórico do chat é sequencial
+        self._turn_tools = [] # (nome, argumentos, concurrent.futures.Future) das ferramentas do turno atual
+
+    async def _run_tool(self, function_call):
+        tool_name = function_call.name
+        tool_args = dict(function_call.args)
+        loop = asyncio.get_running_loop()
+        # copy_context: a ferramenta vê as ContextVars do turno (ex.: o dono das tarefas enfileiradas)
+        context = contextvars.copy_context()
+        # O Future do pool (e não o do asyncio) é guardado: continua consultável se o turno for cancelado
+        future = (self._executor or _get_tool_executor()).submit(context.run, _call_tool, tool_name, tool_args)
+        self._turn_tools.append((tool_name, tool_args, future))
+        tool_response_data = await asyncio.wrap_future(future, loop=loop)
+        return _function_response_part(tool_name, tool_response_data)
+
+    async def _finish_interrupted_turn(self, history_checkpoint: int, user_message: str) -> list[str]:
+        """
+        Espera as ferramentas do turno que ainda rodam (não dá para interromper uma thread) e
+        volta o histórico ao checkpoint. Retorna um resumo das gravações feitas; se houver,
+        registra o turno no histórico com esse resumo, para o modelo não repeti-las.
+        """
+        running = [asyncio.wrap_future(future) for _, _, future in self._turn_tools if not future.done()]
+        if running:
+            await asyncio.shield(asyncio.gather(*running, return_exceptions=True))
+        writes, notes = [], []
+        for tool_name, tool_args, future in self._turn_tools:
+            if tool_name not in WRITE_TOOLS or future.cancelled() or future.exception() is not None:
+                continue
+            result = future.result()
+            if result.get("status") == "sucesso":
+                writes.append(_describe_write(result))
+                notes.append(f"{tool_name}({json.dumps(tool_args, ensure_ascii=False, default=str)}) -> {json.dumps(result, ensure_ascii=False, default=str)}")
+        self.chat.history = self.chat.history[:history_checkpoint]
+        if notes:
+            append_exchange_to_history(self.chat, user_message, "[Turno interrompido antes da resposta final. Já executado: " + "; ".join(notes) + "]")
+        return writes
+
+    async def _send(self, message):
+        with tracing.span("gemini.send_message", call="chat_async"), metrics.timer(GEMINI_REQUEST_METRIC, call="chat_async"):
+            return await self.chat.send_message_async(message, generation_config=self.generation_config)
+
+    async def _send_message(self, user_message: str) -> str:
+        response = await self._send(user_message)
+        function_calls = _function_calls(response)
+        while function_calls:
+            tool_response_parts = await asyncio.gather(*(self._run_tool(call) for call in function_calls))
+            response = await self._send(list(tool_response_parts))
+            function_calls = _function_calls(response)
+        return response.text
+
+    async def send_message(self, user_message: str, timeout: float | None = None) -> str:
+        timeout = self.timeout if timeout is None else timeout
+        async with self._lock:
+            history_checkpoint = len(self.chat.history)
+            self._turn_tools = []
+            try:
+                return await asyncio.wait_for(self._send_message(user_message), timeout)
+            except asyncio.TimeoutError:
+                writes = await self._finish_interrupted_turn(history_checkpoint, user_message)
+                print(f"Erro em send_message: tempo limite de {timeout}s excedido.")
+                if writes:
+                    return _partial_turn_message("Desculpe, demorei demais para responder", writes)
+                return "Desculpe, demorei demais para responder. Pode tentar novamente?"
+            except asyncio.CancelledError:
+                # Descarta o turno incompleto para não deixar uma chamada de função sem resposta no histórico
+                await self._finish_interrupted_turn(history_checkpoint, user_message)
+                raise
+            except Exception as e:
+                writes = await self._finish_interrupted_turn(history_checkpoint, user_message)
+                print(f"Erro em send_message: {e}")
+                import traceback
+                traceback.print_exc()
+                if writes:
+                    return _partial_turn_message("Desculpe, ocorreu um erro ao processar sua mensagem", writes)
+                return "Desculpe, ocorreu um erro ao processar sua mensagem."
@@ -1,60 +1,195 @@
 # finance-bot/ai/reports.py
-import google.generativeai as genai
 import os
-import pandas as pd
-from dotenv import load_dotenv
+import time
+from itertools import chain
+from ai.backends import get_backend
+from ai.gemini import CHARS_PER_TOKEN_ESTIMATE
 from chatbot.prompts import REPORT_PROMPT_TEMPLATE_FOR_GENERATION_TOOL # Importa o template correto
+from utils.db import (aggregate_transactions, get_cached_report, get_largest_transactions, get_outlier_transactions,
+                      get_period_fingerprint, get_summary_totals, iter_transactions, store_cached_report)
+from utils import metrics, tracing
+from utils.models import Transaction
 
-load_dotenv()
-
-API_KEY = os.getenv("GOOGLE_API_KEY")
 MODEL_NAME_REPORTS = 'gemini-1.5-flash-latest' 
+REPORT_TOKEN_BUDGET = 3000 # Tokens (estimados) para o resumo das transações dentro do prompt
+FULL_DETAIL_MAX_TRANSACTIONS = 200 # Até aqui, o prompt leva cada transação (se couber no orçamento)
+TOP_TRANSACTIONS = 10
+OUTLIER_FACTOR = 3.0 # "Fora do padrão": valor >= 3x a média da categoria no período
+SECTION_SEPARATOR = "\n\n"
 
-if API_KEY:
-    genai.configure(api_key=API_KEY)
-else:
+if not get_backend().available():
     print("AVISO: GOOGLE_API_KEY não configurada para ai.reports. A geração de relatórios por IA não funcionará.")
 
-def _format_transactions_for_report_ia(transactions_list: list) -> str: # Renomeado no seu exemplo
-    """Formata a lista de transações para ser enviada à IA para geração de relatório."""
-    if not transactions_list:
-        return "Nenhuma transação encontrada para este período."
+def _format_transaction_line(transaction: Transaction) -> str:
+    description_part = f" - {transaction.description}" if transaction.description else ""
+    return f"- {transaction.date}: {transaction.type} de R${transaction.amount:.2f} ({transaction.category}){description_part}"
+
+def _format_transactions_for_report_ia(transactions) -> str: # Renomeado no seu exemplo
+    """
+    Formata as transações para serem enviadas à IA para geração de relatório. Aceita uma
+    lista ou qualquer iterável de Transaction (ex.: utils.db.iter_transactions, direto do cursor).
+    """
+    summary = "\n".join(map(_format_transaction_line, transactions))
+    return summary or "Nenhuma transação encontrada para este período."
 
-    df = pd.DataFrame(transactions_list)
-    df['amount'] = pd.to_numeric(df['amount'])
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN_ESTIMATE
 
-    summary_lines = []
-    for _, row in df.iterrows():
-        description_part = f" - {row['description']}" if row['description'] else ""
-        summary_lines.append(
-            f"- {row['date']}: {row['type']} de R${row['amount']:.2f} ({row['category']}){description_part}"
-        )
-    return "\n".join(summary_lines)
+def _money(value: float) -> str:
+    return f"R${value:.2f}"
 
-def generate_detailed_financial_report(transactions_list: list, period_description: str) -> str: # Nome da função no seu exemplo
+def _fit_sections(sections: list[tuple[str, list[str]]], max_chars: int) -> str:
     """
-    Gera um relatório financeiro detalhado usando IA do Google com base nas transações fornecidas.
-    Esta função é chamada pela ferramenta do LLM, não diretamente pelo handler.
+    Junta as seções (título, linhas) na ordem de prioridade, cortando linhas do fim de cada
+    seção quando o orçamento acaba. Seções que não cabem nem com uma linha são omitidas.
     """
-    if not API_KEY:
-        return "Erro: API Key do Google não configurada. Não é possível gerar o relatório detalhado."
-    if not transactions_list:
-        return f"Não há transações para o período de {period_description} para gerar um relatório detalhado."
+    output, used = [], 0
+    for title, lines in sections:
+        if not lines:
+            continue
+        kept = []
+        separator = len(SECTION_SEPARATOR) if output else 0
+        budget = max_chars - used - separator - len(title) # Cada linha custa ela mesma + o "\n" antes dela
+        for line in lines:
+            if len(line) + 1 > budget:
+                break
+            kept.append(line)
+            budget -= len(line) + 1
+        if len(kept) < len(lines): # O aviso de omissão também precisa caber
+            while kept and len(f"(... mais {len(lines) - len(kept)} itens omitidos)") + 1 > budget:
+                budget += len(kept.pop()) + 1
+            if kept:
+                kept.append(f"(... mais {len(lines) - len(kept)} itens omitidos)")
+        if not kept:
+            continue
+        block = "\n".join([title] + kept)
+        output.append(block)
+        used += separator + len(block)
+    return SECTION_SEPARATOR.join(output)
+
+def _category_lines(rows: list[dict], transaction_type: str, type_total: float) -> list[str]:
+    rows = sorted((row for row in rows if row["type"] == transaction_type), key=lambda row: row["total"], reverse=True)
+    return [f"- {row['category']}: {_money(row['total'])} em {row['count']} transações"
+            f" ({row['total'] / type_total * 100 if type_total else 0:.0f}%)" for row in rows]
 
-    transactions_summary = _format_transactions_for_report_ia(transactions_list) # Usa a função renomeada
+def _monthly_lines(rows: list[dict]) -> list[str]:
+    months = {}
+    for row in rows:
+        month = months.setdefault(row["month"], {"entrada": 0.0, "saída": 0.0})
+        month[row["type"]] = month.get(row["type"], 0.0) + row["total"]
+    return [f"- {month}: entradas {_money(totals['entrada'])}, saídas {_money(totals['saída'])}, "
+            f"saldo {_money(totals['entrada'] - totals['saída'])}" for month, totals in sorted(months.items())]
 
+def build_report_context(start_date: str, end_date: str, token_budget: int = REPORT_TOKEN_BUDGET) -> tuple[str, str]:
+    """
+    Monta o texto com as transações do período para o prompt de relatório, dentro de
+    token_budget tokens (estimados). Períodos pequenos vão com todas as transações; os
+    demais, com agregados calculados no SQLite: totais, categorias, evolução mensal,
+    maiores transações e transações fora do padrão. Retorna (texto, modo).
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN_ESTIMATE
+    categories = aggregate_transactions(("type", "category"), start_date, end_date)
+    count = sum(row["count"] for row in categories)
+    if not count:
+        return "Nenhuma transação encontrada para este período.", "vazio"
+
+    if count <= FULL_DETAIL_MAX_TRANSACTIONS:
+        full_detail = _format_transactions_for_report_ia(iter_transactions(start_date=start_date, end_date=end_date))
+        if len(full_detail) <= max_chars:
+            return full_detail, "completo"
+
+    totals = get_summary_totals(start_date, end_date)
+    total_out = totals["expenses"] + totals["investments"]
+    header = (f"Resumo pré-calculado de {count} transações (a lista completa foi omitida por tamanho). "
+              f"Entradas: {_money(totals['income'])}; saídas: {_money(total_out)} "
+              f"(das quais investimentos {_money(totals['investments'])}); saldo: {_money(totals['balance'])}.")
+    outliers = [f"{_format_transaction_line(transaction)} (média da categoria {_money(category_average)})"
+                for transaction, category_average in get_outlier_transactions(start_date, end_date, factor=OUTLIER_FACTOR, limit=TOP_TRANSACTIONS)]
+    sections = [
+        ("Saídas por categoria:", _category_lines(categories, "saída", total_out)),
+        ("Entradas por categoria:", _category_lines(categories, "entrada", totals["income"])),
+        ("Evolução mensal:", _monthly_lines(aggregate_transactions(("month", "type"), start_date, end_date))),
+        ("Maiores saídas:", [_format_transaction_line(row) for row in get_largest_transactions(start_date, end_date, "saída", TOP_TRANSACTIONS)]),
+        (f"Transações fora do padrão (>= {OUTLIER_FACTOR:g}x a média da categoria):", outliers),
+        ("Maiores entradas:", [_format_transaction_line(row) for row in get_largest_transactions(start_date, end_date, "entrada", TOP_TRANSACTIONS)]),
+    ]
+    return header + SECTION_SEPARATOR + _fit_sections(sections, max_chars - len(header) - len(SECTION_SEPARATOR)), "agregado"
+
+def _generate_report_text(transactions_summary: str, period_description: str, mode: str) -> tuple[str, bool]:
+    """Chama o Gemini. Retorna (texto, sucesso); em caso de erro, o texto é a mensagem para o usuário."""
     prompt = REPORT_PROMPT_TEMPLATE_FOR_GENERATION_TOOL.format(
         period_description=period_description,
         transactions_summary=transactions_summary
     )
 
+    started = time.perf_counter()
     try:
-        model = genai.GenerativeModel(MODEL_NAME_REPORTS)
-        response = model.generate_content(prompt)
-        return response.text
+        with tracing.span("gemini.generate_content", call="report", prompt_chars=len(prompt)), \
+                metrics.timer("financebot_gemini_request_seconds", call="report"):
+            response = get_backend().generate_content(MODEL_NAME_REPORTS, prompt)
+        return response.text, True
     except Exception as e:
         print(f"Erro ao gerar relatório detalhado com IA: {e}")
-        return f"Desculpe, ocorreu um erro ao tentar gerar o relatório detalhado: {e}"
+        return f"Desculpe, ocorreu um erro ao tentar gerar o relatório detalhado: {e}", False
+    finally:
+        print(f"Relatório ({mode}): prompt com {len(prompt)} caracteres (~{_estimate_tokens(prompt)} tokens), "
+              f"geração em {time.perf_counter() - started:.2f}s")
+
+def _report_variant(token_budget: int) -> str:
+    return f"{MODEL_NAME_REPORTS}:{token_budget}"
+
+def get_cached_period_report(start_date: str, end_date: str, token_budget: int = REPORT_TOKEN_BUDGET) -> str | None:
+    """Relatório do período já guardado no cache e ainda válido, sem gerar nada."""
+    fingerprint = get_period_fingerprint(start_date, end_date)
+    if fingerprint is None:
+        return None
+    return get_cached_report(start_date, end_date, _report_variant(token_budget), fingerprint)
+
+def generate_period_report_with_status(start_date: str, end_date: str, period_description: str, token_budget: int = REPORT_TOKEN_BUDGET) -> tuple[str, bool]:
+    """Como generate_period_report, mas retorna (texto, sucesso) para quem precisa distinguir erros (ex.: a fila de tarefas)."""
+    if not get_backend().available():
+        return "Erro: API Key do Google não configurada. Não é possível gerar o relatório detalhado.", False
+    variant = _report_variant(token_budget)
+    fingerprint = get_period_fingerprint(start_date, end_date)
+    if fingerprint is not None:
+        cached = get_cached_report(start_date, end_date, variant, fingerprint)
+        if cached is not None:
+            print(f"Relatório: cache para {start_date}..{end_date}")
+            return cached, True
+
+    transactions_summary, mode = build_report_context(start_date, end_date, token_budget)
+    if mode == "vazio":
+        return f"Não há transações para o período de {period_description} para gerar um relatório detalhado.", True
+    report_text, ok = _generate_report_text(transactions_summary, period_description, mode)
+    if ok and fingerprint is not None:
+        store_cached_report(start_date, end_date, variant, fingerprint, report_text)
+    return report_text, ok
+
+def generate_period_report(start_date: str, end_date: str, period_description: str, token_budget: int = REPORT_TOKEN_BUDGET) -> str:
+    """
+    Gera o relatório de um período com um prompt limitado a token_budget tokens de dados
+    (ver build_report_context).
+    O resultado fica no cache de relatórios do SQLite: pedir de novo o mesmo período, sem
+    nenhuma escrita nele, devolve o texto guardado sem chamar o Gemini.
+    """
+    return generate_period_report_with_status(start_date, end_date, period_description, token_budget)[0]
+
+def generate_detailed_financial_report(transactions_list, period_description: str) -> str: # Nome da função no seu exemplo
+    """
+    Gera um relatório financeiro detalhado usando IA do Google com base nas transações fornecidas
+    (uma lista ou um iterável de Transaction), enviando todas elas no prompt.
+    Para períodos grandes, prefira generate_period_report.
+    """
+    if not get_backend().available():
+        return "Erro: API Key do Google não configurada. Não é possível gerar o relatório detalhado."
+    # Um gerador é sempre "verdadeiro": olha o primeiro item e o devolve à frente dos demais
+    transactions = iter(transactions_list)
+    first = next(transactions, None)
+    if first is None:
+        return f"Não há transações para o período de {period_description} para gerar um relatório detalhado."
+
+    transactions_summary = _format_transactions_for_report_ia(chain((first,), transactions)) # Usa a função renomeada
+    return _generate_report_text(transactions_summary, period_description, "completo")[0]
 
 if __name__ == '__main__':
     import sys
@@ -71,7 +206,7 @@ if __name__ == '__main__':
 
     sample_transactions = get_transactions(start_date="2024-07-01", end_date="2024-07-31")
     if sample_transactions:
-        report = generate_detailed_financial_report(sample_transactions, "Julho de 2024")
+        report = generate_period_report("2024-07-01", "2024-07-31", "Julho de 2024")
         print("\n--- Relatório Financeiro Detalhado (Julho 2024) ---")
         print(report)
     else:
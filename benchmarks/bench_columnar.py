@@ -0,0 +1,63 @@
+# finance-bot/benchmarks/bench_columnar.py
+"""
+Carga dos dados do dashboard num DataFrame: o caminho antigo (todas as transações como
+lista de dicts -> pd.DataFrame -> to_datetime/to_numeric) contra o atual
+(dashboard.data.load_dashboard_data: totais diários agregados no SQLite e lidos por
+get_daily_total_columns em arrays NumPy tipados). Mede tempo e pico de memória
+(tracemalloc) num banco temporário. Requer numpy e pandas.
+
+    python benchmarks/bench_columnar.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import utils.db as db
+from dashboard.data import load_dashboard_data
+from benchmarks.bench_report_format import _populate
+
+
+def legacy_frame() -> pd.DataFrame:
+    """Caminho anterior do dashboard: um dict por transação e conversões de tipo depois de montar o DataFrame."""
+    df = pd.DataFrame([t.to_dict() for t in db.get_transactions()])
+    df['date'] = pd.to_datetime(df['date'])
+    df['amount'] = pd.to_numeric(df['amount'])
+    return df
+
+
+def _measure(function) -> tuple[float, int, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    df = function()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, int(df.memory_usage(deep=True).sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da carga dos dados do dashboard (leitura colunar).")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000], help="Tamanhos da tabela (linhas).")
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db.DATABASE_NAME = os.path.join(tmp_dir, "bench_columnar.db")
+            db.init_db()
+            _populate(rows)
+            print(f"\n{rows} linhas")
+            for name, function in (("dicts -> DataFrame", legacy_frame), ("colunas diárias", load_dashboard_data)):
+                elapsed, peak, frame_size = _measure(function)
+                print(f"  {name:18s} {elapsed:7.2f} s, pico {peak / 2**20:7.1f} MiB, DataFrame {frame_size / 2**20:7.1f} MiB")
+            db.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# finance-bot/benchmarks/bench_date_parsing.py
+"""
+Compara o parsing de datas/períodos de utils/date_utils.py (regex pré-compiladas + cache
+LRU + dateparser sob demanda) com a implementação anterior (dateparser a cada chamada),
+num corpus de entradas reais das ferramentas. Mede o cache frio (logo após
+clear_parse_caches) e o quente, e lista as entradas cujo resultado mudou.
+
+    python benchmarks/bench_date_parsing.py --rounds 20
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.date_utils as date_utils
+
+DATE_CORPUS = [
+    "hoje", "ontem", "anteontem", "15/05", "15/05/2024", "15-05-2024", "01/12", "12/04/24",
+    "2024-05-15", "15 de maio", "15 de maio de 2024", "3 de janeiro", "dia 10/05",
+    "natal", "próxima semana", "15/13/2023", "semana passada",
+]
+PERIOD_CORPUS = [
+    "hoje", "ontem", "este mês", "mês passado", "todo o período", "julho", "julho de 2023",
+    "julho 2023", "dezembro", "janeiro", "jan 2024", "07/2023", "ano passado", "bla",
+]
+
+
+# --- Implementação anterior (resumida, mesmo comportamento) ---------------------------
+
+def _legacy_dateparser(text):
+    import dateparser
+    settings = {'PREFER_DATES_FROM': 'past', 'DATE_ORDER': 'DMY'}
+    return dateparser.parse(text.replace(' de ', ' '), languages=['pt'], settings=settings)
+
+
+def legacy_parse_date_to_str(date_input, default_to_today=True):
+    now = datetime.now()
+    if not date_input:
+        return now.strftime('%Y-%m-%d') if default_to_today else None
+    date_input_lower = date_input.lower().strip()
+    if date_input_lower == 'hoje':
+        return now.strftime('%Y-%m-%d')
+    if date_input_lower == 'ontem':
+        return (now - timedelta(days=1)).strftime('%Y-%m-%d')
+    parsed_dt = None
+    for fmt in ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            parsed_dt = datetime.strptime(date_input, fmt)
+            break
+        except ValueError:
+            continue
+    if not parsed_dt:
+        for fmt in ('%d/%m', '%d-%m'):
+            try:
+                parsed_dt = datetime.strptime(date_input, fmt).replace(year=now.year)
+                break
+            except ValueError:
+                continue
+    if not parsed_dt:
+        parsed_dt = _legacy_dateparser(date_input_lower)
+    if parsed_dt:
+        return parsed_dt.strftime('%Y-%m-%d')
+    return now.strftime('%Y-%m-%d') if default_to_today else None
+
+
+def legacy_parse_period_to_dates(period_str):
+    now = datetime.now()
+    period_str_lower = period_str.lower().strip()
+    if not period_str_lower:
+        return None, None, "Período não especificado."
+    if period_str_lower in ("hoje", "ontem"):
+        day = now if period_str_lower == "hoje" else now - timedelta(days=1)
+        return day.strftime('%Y-%m-%d'), day.strftime('%Y-%m-%d'), period_str_lower
+    if period_str_lower == "todo o período":
+        return None, None, "todo o período"
+    if period_str_lower in ("este mês", "mês atual"):
+        parsed = now
+    elif period_str_lower == "mês passado":
+        parsed = now.replace(day=1) - timedelta(days=1)
+    else:
+        parsed = _legacy_dateparser(period_str_lower)
+        if not parsed:
+            return None, None, f"Período '{period_str}' não reconhecido. Tente 'mês passado', 'este mês', 'Julho de 2023', etc."
+    start = datetime(parsed.year, parsed.month, 1)
+    next_month = start.replace(day=28) + timedelta(days=4)
+    end = next_month - timedelta(days=next_month.day)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), start.strftime('%B de %Y').capitalize()
+
+# ---------------------------------------------------------------------------------------
+
+
+def _run_corpus(parse_date, parse_period):
+    for text in DATE_CORPUS:
+        parse_date(text, default_to_today=False)
+    for text in PERIOD_CORPUS:
+        parse_period(text)
+
+
+def _time_rounds(rounds, parse_date, parse_period, before_round=None):
+    elapsed = 0.0
+    for _ in range(rounds):
+        if before_round:
+            before_round()
+        start = time.perf_counter()
+        _run_corpus(parse_date, parse_period)
+        elapsed += time.perf_counter() - start
+    return elapsed / rounds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do parsing de datas e períodos.")
+    parser.add_argument("--rounds", type=int, default=20, help="Repetições do corpus por cenário.")
+    args = parser.parse_args(argv)
+    calls = len(DATE_CORPUS) + len(PERIOD_CORPUS)
+
+    # Primeira chamada de cada implementação (inclui o import do dateparser)
+    start = time.perf_counter()
+    _run_corpus(legacy_parse_date_to_str, legacy_parse_period_to_dates)
+    legacy_first = time.perf_counter() - start
+    date_utils.clear_parse_caches()
+    start = time.perf_counter()
+    _run_corpus(date_utils.parse_date_to_str, date_utils.parse_period_to_dates)
+    new_first = time.perf_counter() - start
+
+    legacy = _time_rounds(args.rounds, legacy_parse_date_to_str, legacy_parse_period_to_dates)
+    cold = _time_rounds(args.rounds, date_utils.parse_date_to_str, date_utils.parse_period_to_dates,
+                        before_round=date_utils.clear_parse_caches)
+    warm = _time_rounds(args.rounds, date_utils.parse_date_to_str, date_utils.parse_period_to_dates)
+
+    print(f"Corpus: {len(DATE_CORPUS)} datas + {len(PERIOD_CORPUS)} períodos, {args.rounds} rodadas")
+    print(f"Primeira passada:   anterior {legacy_first * 1000:9.2f} ms | nova {new_first * 1000:9.2f} ms")
+    print(f"Anterior:           {legacy * 1e6 / calls:9.1f} µs/chamada")
+    print(f"Nova, cache frio:   {cold * 1e6 / calls:9.1f} µs/chamada ({legacy / cold:6.1f}x)")
+    print(f"Nova, cache quente: {warm * 1e6 / calls:9.1f} µs/chamada ({legacy / warm:6.1f}x)")
+
+    differences = []
+    for text in DATE_CORPUS:
+        old, new = legacy_parse_date_to_str(text, default_to_today=False), date_utils.parse_date_to_str(text, default_to_today=False)
+        if old != new:
+            differences.append((f"data '{text}'", old, new))
+    for text in PERIOD_CORPUS:
+        old, new = legacy_parse_period_to_dates(text), date_utils.parse_period_to_dates(text)
+        if old != new:
+            differences.append((f"período '{text}'", old, new))
+    print(f"\nResultados diferentes: {len(differences)}")
+    for label, old, new in differences:
+        print(f"  {label}: {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# finance-bot/benchmarks/bench_fast_path.py
+"""
+Mede o caminho rápido de intenções (chatbot/intents.py) num corpus de mensagens típicas:
+taxa de acerto, custo local por mensagem e a latência economizada em relação às duas idas
+ao Gemini (chamada da ferramenta + resposta final) que cada acerto evita.
+
+    python benchmarks/bench_fast_path.py --llm-round-trip-ms 900
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db as db
+
+CORPUS = [
+    "gastei 50 reais com mercado hoje",
+    "Gastei R$ 32,90 com almoço",
+    "paguei 120 de luz ontem",
+    "gastei 15 com uber dia 10/05",
+    "recebi 2500 de salário",
+    "ganhei 300 de freelance ontem",
+    "investi 200 em tesouro direto",
+    "qual meu saldo este mês",
+    "qual é o meu saldo?",
+    "meu saldo do mês passado",
+    "quanto gastei com mercado este mês?",
+    "quanto recebi mês passado",
+    "quanto investi este mês",
+    # Mensagens que devem seguir para o LLM
+    "apague meu último gasto",
+    "me dá um relatório do mês passado",
+    "gastei 50 com mercado e 20 com farmácia",
+    "edite o item 2 para 75 reais",
+    "oi, tudo bem?",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50, help="Repetições do corpus.")
+    parser.add_argument("--llm-round-trip-ms", type=float, default=800.0,
+                        help="Latência de uma ida ao Gemini usada para estimar a economia (medida no seu ambiente).")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.DATABASE_NAME = os.path.join(tmp_dir, "bench_fast_path.db")
+        db.init_db()
+        from chatbot.intents import get_fast_path_stats, try_fast_path
+
+        timings_ms = []
+        for _ in range(args.rounds):
+            for message in CORPUS:
+                started = time.perf_counter()
+                try_fast_path(message)
+                timings_ms.append((time.perf_counter() - started) * 1000)
+        db.close_db_connections()
+
+    stats = get_fast_path_stats()
+    saved_per_hit_ms = 2 * args.llm_round_trip_ms - statistics.mean(timings_ms)
+    print(f"Mensagens: {stats['attempts']}  acertos: {stats['hits']}  taxa de acerto: {stats['hit_rate']:.1%}")
+    print(f"Acertos por intenção: {stats['by_intent']}")
+    print(f"Caminho rápido: média {statistics.mean(timings_ms):.3f} ms, p95 {statistics.quantiles(timings_ms, n=20)[-1]:.3f} ms")
+    print(f"Economia estimada por acerto: {saved_per_hit_ms:.0f} ms (2 idas ao LLM de {args.llm_round_trip_ms:.0f} ms)")
+    print(f"Economia média por mensagem do corpus: {saved_per_hit_ms * stats['hit_rate']:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
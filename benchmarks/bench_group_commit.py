@@ -0,0 +1,71 @@
+# finance-bot/benchmarks/bench_group_commit.py
+"""
+Escritas concorrentes: N threads chamando add_transaction, com commit próprio por
+escrita (GROUP_COMMIT desligado) e pela thread escritora com group commit. Mostra
+vazão, latência p50/p99 por escrita, erros e o tamanho médio dos grupos.
+
+    python benchmarks/bench_group_commit.py --threads 1 8 32 --writes 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db as db
+from benchmarks.bench_tenants import _percentile
+
+
+def _run(threads: int, writes: int) -> tuple[float, list[float], int]:
+    latencies, errors = [], []
+
+    def writer():
+        local = []
+        for i in range(writes):
+            started = time.perf_counter()
+            if db.add_transaction("saída", 10.0, "lazer", "", f"2024-01-{i % 28 + 1:02d}") is None:
+                errors.append(i)
+            local.append(time.perf_counter() - started)
+        latencies.extend(local)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started, latencies, len(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do group commit.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32], help="Threads escrevendo ao mesmo tempo.")
+    parser.add_argument("--writes", type=int, default=500, help="Escritas por thread.")
+    args = parser.parse_args(argv)
+
+    for threads in args.threads:
+        print(f"\n{threads} threads x {args.writes} escritas")
+        for group_commit in (False, True):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                db.DATABASE_NAME = os.path.join(tmp_dir, "bench_group_commit.db")
+                db.init_db()
+                db.GROUP_COMMIT = group_commit
+                db._write_batcher = None  # Métricas zeradas a cada rodada
+                elapsed, latencies, errors = _run(threads, args.writes)
+                total = threads * args.writes
+                line = (f"  {'group commit' if group_commit else 'commit próprio':15s} {total / elapsed:8.0f} escritas/s, "
+                        f"p50 {statistics.median(latencies) * 1000:6.2f} ms, p99 {_percentile(latencies, 0.99) * 1000:7.2f} ms, {errors} erros")
+                if group_commit:
+                    stats = db.get_write_batcher().stats()
+                    line += f", grupos de {stats['avg_batch_size']:.1f} (máx. {stats['max_batch_size']}), commit {stats['avg_commit_ms']:.2f} ms"
+                    db.get_write_batcher().stop()
+                print(line)
+                db.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# finance-bot/benchmarks/bench_listing.py
+"""
+Mede a listagem completa do histórico: get_transactions (lista inteira) contra
+iter_transactions (paginação por chave, gerando Transaction) e a exportação
+CSV. O pico de memória (tracemalloc) da versão em streaming deve ficar constante com
+o tamanho da tabela.
+
+    python benchmarks/bench_listing.py --rows 10000 100000 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db as db
+from benchmarks.bench_report_format import _measure, _populate
+from utils.export import export_transactions_csv
+
+
+def _drain(rows) -> int:
+    count = 0
+    for _ in rows:
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da listagem e exportação de transações.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Tamanhos da tabela (linhas).")
+    parser.add_argument("--batch-size", type=int, default=db.ITER_BATCH_SIZE, help="Linhas por consulta em iter_transactions.")
+    args = parser.parse_args(argv)
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db.DATABASE_NAME = os.path.join(tmp_dir, "bench_listing.db")
+            db.init_db()
+            _populate(rows)
+
+            cases = [
+                ("get_transactions (lista)", lambda: len(db.get_transactions())),
+                ("iter_transactions", lambda: _drain(db.iter_transactions(batch_size=args.batch_size))),
+                ("exportação CSV", lambda: export_transactions_csv(os.path.join(tmp_dir, "export.csv"), batch_size=args.batch_size)["exported"]),
+            ]
+            print(f"\n{rows} linhas")
+            for name, function in cases:
+                elapsed, peak, count = _measure(function)
+                print(f"  {name:26s} {elapsed * 1000:9.1f} ms, pico {peak / 2**20:7.1f} MiB ({count} linhas)")
+            db.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
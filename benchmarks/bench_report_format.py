@@ -0,0 +1,88 @@
+# finance-bot/benchmarks/bench_report_format.py
+"""
+Compara a formatação das transações para o prompt de relatório: a versão anterior
+(get_transactions -> DataFrame -> iterrows) contra a atual (iter_transactions -> gerador,
+direto do cursor). Mede tempo e pico de memória (tracemalloc) num banco temporário.
+
+    python benchmarks/bench_report_format.py --rows 10000 100000
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db as db
+from ai.reports import _format_transactions_for_report_ia
+
+CATEGORIES = ["alimentação", "transporte", "lazer", "contas", "saúde", "investimentos", "salário"]
+
+
+def legacy_format(transactions_list: list) -> str:
+    """Implementação anterior, mantida aqui só para comparação."""
+    import pandas as pd
+    if not transactions_list:
+        return "Nenhuma transação encontrada para este período."
+    df = pd.DataFrame(transactions_list)
+    df['amount'] = pd.to_numeric(df['amount'])
+    summary_lines = []
+    for _, row in df.iterrows():
+        description_part = f" - {row['description']}" if row['description'] else ""
+        summary_lines.append(f"- {row['date']}: {row['type']} de R${row['amount']:.2f} ({row['category']}){description_part}")
+    return "\n".join(summary_lines)
+
+
+def _populate(rows: int):
+    rng = random.Random(42)
+    start = date(2020, 1, 1)
+    db.bulk_add_transactions(
+        {"type": rng.choice(["entrada", "saída"]), "amount": round(rng.uniform(1, 2000), 2),
+         "category": rng.choice(CATEGORIES), "description": rng.choice(["", "mercado", "uber", "pix"]),
+         "date": (start + timedelta(days=rng.randrange(1500))).isoformat()}
+        for _ in range(rows))
+
+
+def _measure(function) -> tuple[float, int, str]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da formatação de transações para relatórios.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="Tamanhos do período (linhas).")
+    args = parser.parse_args(argv)
+
+    has_pandas = importlib.util.find_spec("pandas") is not None
+    if not has_pandas:
+        print("pandas não instalado: medindo só a versão atual.")
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db.DATABASE_NAME = os.path.join(tmp_dir, "bench_report_format.db")
+            db.init_db()
+            _populate(rows)
+
+            new_time, new_peak, new_text = _measure(lambda: _format_transactions_for_report_ia(db.iter_transactions()))
+            print(f"\n{rows} linhas")
+            print(f"  Gerador do cursor:  {new_time * 1000:9.1f} ms, pico {new_peak / 2**20:7.1f} MiB")
+            if has_pandas:
+                old_time, old_peak, old_text = _measure(lambda: legacy_format([t.to_dict() for t in db.get_transactions()]))
+                print(f"  DataFrame/iterrows: {old_time * 1000:9.1f} ms, pico {old_peak / 2**20:7.1f} MiB")
+                print(f"  Ganho: {old_time / new_time:.1f}x no tempo, {old_peak / max(new_peak, 1):.1f}x no pico de memória;"
+                      f" saída idêntica: {old_text == new_text}")
+            db.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
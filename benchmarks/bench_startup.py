@@ -0,0 +1,70 @@
+# finance-bot/benchmarks/bench_startup.py
+"""
+Mede o custo de inicialização (cold start) dos pontos de entrada do FinanceBot. Cada
+módulo é importado num interpretador novo com `python -X importtime`; o script mostra o
+tempo total, os módulos mais caros (tempo cumulativo) e quais dependências pesadas
+(SDK do Gemini, pandas, dateparser, ...) foram carregadas já na importação.
+
+    python benchmarks/bench_startup.py --top 15
+    python benchmarks/bench_startup.py chatbot.handlers ai.reports
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["chatbot.main", "chatbot.handlers", "ai.llm_chat", "ai.reports", "utils.date_utils", "utils.db"]
+HEAVY_MODULES = ["google.generativeai", "pandas", "numpy", "dateparser", "matplotlib", "plotly"]
+
+
+def _import_in_fresh_interpreter(module: str) -> tuple[float, list[tuple[int, int, str]], list[str]]:
+    """Importa `module` num processo novo. Retorna (segundos, [(self_us, cumulativo_us, nome)], pesados carregados)."""
+    probe = (f"import sys, {module}\n"
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")])))
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=PROJECT_ROOT, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # Formato: "import time:       self [us] |   cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(self_us), int(cumulative_us), name.strip()))
+    loaded_heavy = [name for name in result.stdout.strip().split(",") if name]
+    return elapsed, entries, loaded_heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Custo de importação por módulo (cold start).")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Módulos a medir.")
+    parser.add_argument("--top", type=int, default=10, help="Quantos módulos mais caros listar por ponto de entrada.")
+    parser.add_argument("--rounds", type=int, default=3, help="Repetições; vale o menor tempo total.")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        try:
+            runs = [_import_in_fresh_interpreter(module) for _ in range(args.rounds)]
+        except RuntimeError as e:
+            print(f"\n{module}: falhou ao importar ({e})")
+            continue
+        elapsed, entries, loaded_heavy = min(runs, key=lambda run: run[0])
+        own = next((cumulative for _, cumulative, name in entries if name == module), 0)
+        print(f"\n{module}: {elapsed * 1000:.0f} ms de processo, {own / 1000:.1f} ms importando o módulo")
+        print(f"  Dependências pesadas carregadas: {', '.join(loaded_heavy) or 'nenhuma'}")
+        # Só módulos de topo de cada pacote, para não repetir o mesmo custo em cada submódulo
+        top_level = [entry for entry in entries if "." not in entry[2].strip() or entry[2].startswith(("ai.", "chatbot.", "utils."))]
+        for self_us, cumulative_us, name in sorted(top_level, key=lambda entry: entry[1], reverse=True)[:args.top]:
+            print(f"  {cumulative_us / 1000:9.1f} ms cumulativo {self_us / 1000:8.1f} ms próprio  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# finance-bot/benchmarks/bench_tenants.py
+"""
+Armazenamento por inquilino: cria um shard SQLite para cada um de N inquilinos e mede
+a criação (arquivo + migrações + carga), depois consultas (get_summary_totals) em
+inquilinos aleatórios com LRUs de conexões de tamanhos diferentes. Mostra latência
+p50/p99 e quantas conexões ficaram abertas.
+
+    python benchmarks/bench_tenants.py --tenants 1000 --rows 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db as db
+from benchmarks.bench_report_format import _populate
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de shards por inquilino.")
+    parser.add_argument("--tenants", type=int, default=1000, help="Número de inquilinos.")
+    parser.add_argument("--rows", type=int, default=200, help="Transações por inquilino.")
+    parser.add_argument("--queries", type=int, default=5000, help="Consultas em inquilinos aleatórios.")
+    parser.add_argument("--lru", type=int, nargs="+", default=[16, 64, 256, 1024], help="Tamanhos de MAX_OPEN_SHARDS.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.DATABASE_NAME = os.path.join(tmp_dir, "bench_tenants.db")
+        db.TENANTS_DIR = os.path.join(tmp_dir, "tenants")
+        db.init_db()
+        tenants = [f"tenant{i:05d}" for i in range(args.tenants)]
+
+        started = time.perf_counter()
+        for tenant in tenants:
+            with db.tenant_scope(tenant):
+                _populate(args.rows)
+        elapsed = time.perf_counter() - started
+        print(f"{args.tenants} shards com {args.rows} transações: {elapsed:.1f} s ({elapsed / args.tenants * 1000:.1f} ms por inquilino)")
+
+        rng = random.Random(42)
+        picks = [rng.choice(tenants) for _ in range(args.queries)]
+        for lru_size in args.lru:
+            db.close_db_connections()
+            db.MAX_OPEN_SHARDS = lru_size
+            latencies = []
+            started = time.perf_counter()
+            for tenant in picks:
+                query_started = time.perf_counter()
+                with db.tenant_scope(tenant):
+                    db.get_summary_totals()
+                latencies.append(time.perf_counter() - query_started)
+            elapsed = time.perf_counter() - started
+            print(f"  LRU {lru_size:5d}: {args.queries / elapsed:8.0f} consultas/s, p50 {statistics.median(latencies) * 1000:6.2f} ms, "
+                  f"p99 {_percentile(latencies, 0.99) * 1000:6.2f} ms, {len(db._thread_local.connections)} conexões abertas")
+        db.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# finance-bot/benchmarks/bench_transaction_model.py
+"""
+Memória por transação em cada representação: dict (como get_transactions devolvia),
+Transaction (NamedTuple) e colunas (transactions_to_columns). Mede com tracemalloc
+só os contêineres, sobre os mesmos valores, e o tempo de construção a partir das
+tuplas do cursor.
+
+    python benchmarks/bench_transaction_model.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.models import Transaction, transactions_to_columns
+
+FIELDS = Transaction._fields
+CATEGORIES = ["alimentação", "transporte", "lazer", "contas", "saúde", "investimentos", "salário"]
+
+
+def _sample_rows(rows: int) -> list[tuple]:
+    """Tuplas como as que o cursor devolve, na ordem de TRANSACTION_COLUMNS (strings compartilhadas)."""
+    rng = random.Random(42)
+    start = date(2020, 1, 1)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(1500)]
+    return [(i, rng.choice(["entrada", "saída"]), round(rng.uniform(1, 2000), 2), rng.choice(CATEGORIES),
+             rng.choice(["", "mercado", "uber", "pix"]), rng.choice(dates)) for i in range(1, rows + 1)]
+
+
+def _measure(function) -> tuple[float, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de memória do modelo Transaction.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Número de transações.")
+    args = parser.parse_args(argv)
+
+    rows = _sample_rows(args.rows)
+    cases = [
+        ("dict", lambda: [dict(zip(FIELDS, row)) for row in rows]),
+        ("Transaction", lambda: [Transaction.from_row(row) for row in rows]),
+        ("colunas", lambda: transactions_to_columns(map(Transaction._make, rows))),
+    ]
+    print(f"{args.rows} transações")
+    baseline = None
+    for name, function in cases:
+        elapsed, size = _measure(function)
+        baseline = baseline or size
+        saving = f" ({baseline / size:.1f}x menos memória que dict)" if size != baseline else ""
+        print(f"  {name:12s} {size / args.rows:7.1f} bytes/linha, {size / 2**20:7.1f} MiB, {elapsed * 1000:8.1f} ms{saving}")
+
+
+if __name__ == "__main__":
+    main()
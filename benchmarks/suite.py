@@ -0,0 +1,235 @@
+# finance-bot/benchmarks/suite.py
+"""
+Suíte de benchmarks offline: CRUD no banco, turnos completos do chat (handle_message),
+geração de relatórios e carga dos dados do dashboard, para cada tamanho de tabela. O
+Gemini é substituído pelo FakeBackend (ai.backends), então nada depende de rede ou de
+GOOGLE_API_KEY; --llm-latency simula o tempo de cada ida e volta ao modelo.
+
+Cada caso roda até --min-time segundos (entre --min-rounds e --max-rounds rodadas) e
+os resultados (mín., mediana, média, desvio) são gravados em benchmarks/results/ em
+JSON, com o commit atual. --compare aponta regressões em relação a um resultado
+anterior ('latest' usa o mais recente):
+
+    python benchmarks/suite.py                          # 10k, 100k e 1M linhas
+    python benchmarks/suite.py --rows 10000 --groups db chat
+    python benchmarks/suite.py --compare latest --fail-on-regression
+    python benchmarks/suite.py --compare antigo.json --current novo.json  # só compara
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FINANCEBOT_LLM_BACKEND", "fake") # Antes de importar ai.*: nenhum caso chama o Gemini
+
+import utils.db as db
+from ai.backends import FakeBackend, set_backend
+from benchmarks.bench_report_format import _populate
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+GROUPS = ("db", "chat", "report", "dashboard")
+RESULTS_VERSION = 1
+
+
+def _bench(function, setup=None, min_time: float = 0.5, min_rounds: int = 5, max_rounds: int = 200) -> dict:
+    """Roda function (após setup(), fora da medição) até min_time segundos e devolve as estatísticas em segundos."""
+    if setup:
+        setup()
+    function() # Aquecimento: caches de statement, imports preguiçosos
+    times = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < max_rounds and (len(times) < min_rounds or time.perf_counter() < deadline):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": len(times),
+    }
+
+
+def _db_cases(rows: int) -> list:
+    rng = random.Random(rows)
+    ids = [row[0] for row in db.get_db_connection().execute("SELECT id FROM transactions")]
+    rng.shuffle(ids)
+    to_delete = iter(ids[len(ids) // 2:])
+    update_ids = ids[:len(ids) // 2]
+    return [
+        ("db.add_transaction", lambda: db.add_transaction("saída", 25.0, "lazer", "cinema", "2023-06-15"), None),
+        ("db.get_transactions_page", lambda: db.get_transactions(limit=50), None),
+        ("db.get_transactions_month", lambda: db.get_transactions("2023-03-01", "2023-03-31"), None),
+        ("db.update_transaction", lambda: db.update_transaction(rng.choice(update_ids), new_amount=round(rng.uniform(1, 500), 2)), None),
+        ("db.delete_transaction", lambda: db.delete_transaction_by_id(next(to_delete)), None),
+        ("db.summary_totals_all", lambda: db.get_summary_totals(), None),
+        ("db.summary_totals_month", lambda: db.get_summary_totals("2023-03-01", "2023-03-31"), None),
+        ("db.aggregate_year_by_category", lambda: db.aggregate_transactions(("type", "category"), "2023-01-01", "2023-12-31"), None),
+    ]
+
+
+def _chat_cases(rows: int) -> list:
+    from chatbot.handlers import handle_message
+    session = f"bench-{rows}"
+    return [
+        # Resolvida pelo caminho rápido (chatbot.intents), sem o modelo
+        ("chat.fast_path_add", lambda: handle_message("gastei 12 com padaria hoje", session_id=session + "-fast"), None),
+        # Modelo falso -> list_transactions -> resposta final: duas idas ao "modelo"
+        ("chat.model_list", lambda: handle_message("liste meus gastos de março de 2023", session_id=session + "-list"), None),
+        ("chat.model_balance", lambda: handle_message("qual foi meu saldo em março de 2023?", session_id=session + "-balance"), None),
+    ]
+
+
+def _report_cases(rows: int) -> list:
+    from ai.reports import generate_period_report
+    clear_cache = lambda: db.clear_report_cache()
+    return [
+        ("report.generate_month", lambda: generate_period_report("2023-03-01", "2023-03-31", "março de 2023"), clear_cache),
+        ("report.generate_year", lambda: generate_period_report("2023-01-01", "2023-12-31", "2023"), clear_cache),
+        ("report.cached_year", lambda: generate_period_report("2023-01-01", "2023-12-31", "2023"), None),
+    ]
+
+
+def _dashboard_cases(rows: int) -> list:
+    from dashboard.data import calculate_summary, load_dashboard_data
+    return [
+        ("dashboard.load_data_all", lambda: load_dashboard_data(), None),
+        ("dashboard.load_data_year", lambda: load_dashboard_data("2023-01-01", "2023-12-31"), None),
+        ("dashboard.summary_all", lambda: calculate_summary(), None),
+    ]
+
+
+_CASES = {"db": _db_cases, "chat": _chat_cases, "report": _report_cases, "dashboard": _dashboard_cases}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(rows_list, groups, min_time: float, min_rounds: int, max_rounds: int, llm_latency: float) -> dict:
+    set_backend(FakeBackend(latency=llm_latency))
+    results = {}
+    for rows in rows_list:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db.DATABASE_NAME = os.path.join(tmp_dir, "bench_suite.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.init_db()
+                started = time.perf_counter()
+                _populate(rows)
+            print(f"\n{rows} linhas (carga em {time.perf_counter() - started:.1f}s)")
+            for group in groups:
+                for name, function, setup in _CASES[group](rows):
+                    # Os prints do bot e das ferramentas iriam para o terminal a cada rodada
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        stats = _bench(function, setup, min_time, min_rounds, max_rounds)
+                    key = f"{name}[{rows}]"
+                    results[key] = stats
+                    print(f"  {key:42s} mediana {stats['median'] * 1000:9.3f} ms  mín. {stats['min'] * 1000:9.3f} ms  "
+                          f"± {stats['stdev'] * 1000:8.3f} ms  ({stats['rounds']} rodadas)")
+            db.close_db_connections()
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"rows": list(rows_list), "groups": list(groups), "min_time": min_time, "llm_latency": llm_latency},
+        "results": results,
+    }
+
+
+def save_results(run: dict, directory: str = RESULTS_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    stamp = run["created_at"].replace(":", "").replace("-", "")
+    path = os.path.join(directory, f"{stamp}-{run['commit'] or 'sem-commit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def _latest_results(directory: str = RESULTS_DIR, exclude: str = None) -> str | None:
+    paths = sorted(path for path in glob.glob(os.path.join(directory, "*.json")) if path != exclude)
+    return paths[-1] if paths else None
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> list[str]:
+    """Compara as medianas dos casos presentes nos dois resultados. Retorna os casos que ficaram mais lentos que threshold."""
+    regressions = []
+    print(f"\nComparação com {baseline.get('commit') or '?'} ({baseline.get('created_at')}), limite ±{threshold:.0%}:")
+    for name, stats in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = stats["median"] / old["median"] if old["median"] else float("inf")
+        note = ""
+        if ratio > 1 + threshold:
+            note = "REGRESSÃO"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            note = "melhora"
+        print(f"  {name:42s} {old['median'] * 1000:9.3f} -> {stats['median'] * 1000:9.3f} ms  {ratio:5.2f}x  {note}")
+    return regressions
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks offline do FinanceBot (com o FakeBackend no lugar do Gemini).")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Tamanhos da tabela (linhas).")
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS), help="Grupos de casos a rodar.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Segundos mínimos medidos por caso.")
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument("--max-rounds", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latência simulada (s) de cada chamada ao modelo.")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="Onde gravar o JSON com os resultados.")
+    parser.add_argument("--compare", help="Resultado anterior para comparar ('latest' para o mais recente).")
+    parser.add_argument("--current", help="Com --compare: compara com este arquivo em vez de rodar a suíte.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Variação da mediana considerada regressão (0.10 = 10%%).")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Sai com código 1 se houver regressão.")
+    args = parser.parse_args(argv)
+
+    if args.current:
+        if not args.compare:
+            parser.error("--current exige --compare.")
+        current, current_path = _load(args.current), args.current
+    else:
+        current = run_suite(args.rows, args.groups, args.min_time, args.min_rounds, args.max_rounds, args.llm_latency)
+        current_path = save_results(current, args.output_dir)
+        print(f"\nResultados gravados em '{current_path}'.")
+
+    if args.compare:
+        baseline_path = _latest_results(args.output_dir, exclude=current_path) if args.compare == "latest" else args.compare
+        if baseline_path is None:
+            print("Nenhum resultado anterior para comparar.")
+            return 0
+        regressions = compare_results(_load(baseline_path), current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} caso(s) mais lento(s) que o limite.")
+            if args.fail_on_regression:
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,142 @@
 # finance-bot/chatbot/handlers.py
-from ai.llm_chat import ChatManager 
+import asyncio
+import contextvars
+import time
 
-_chat_manager_instance = None
+from ai.jobs import current_job_owner, get_job_queue
+from ai.llm_chat import ChatManager, AsyncChatManager
+from chatbot.intents import try_fast_path
+from chatbot.sessions import DEFAULT_SESSION_ID, ChatSessionRegistry
+from utils import tracing
+from utils.db import current_tenant, get_jobs, get_tenant_database_path
 
-def get_chat_manager():
-    global _chat_manager_instance
-    if _chat_manager_instance is None:
-        _chat_manager_instance = ChatManager()
-    return _chat_manager_instance
+# Um ChatManager (e um histórico) por sessão; sem session_id, todos usam a sessão padrão
+_chat_sessions = ChatSessionRegistry(ChatManager)
+_async_chat_sessions = ChatSessionRegistry(AsyncChatManager)
 
-def handle_message(user_input: str) -> str:
-    manager = get_chat_manager()
+def _session_key(session_id: str | None, tenant_id: str | None) -> str | None:
+    """Sessões de inquilinos diferentes nunca compartilham histórico, mesmo com o mesmo session_id."""
+    if tenant_id is None:
+        return session_id
+    get_tenant_database_path(tenant_id) # Valida o id
+    return f"{tenant_id}/{session_id or DEFAULT_SESSION_ID}"
+
+def get_chat_manager(session_id: str | None = None, tenant_id: str | None = None):
+    return _chat_sessions.get(_session_key(session_id, tenant_id)).manager
+
+def get_session_stats() -> dict:
+    """Estatísticas de memória (histórico) e latência por sessão, síncronas e assíncronas."""
+    return {"sync": _chat_sessions.stats(), "async": _async_chat_sessions.stats()}
+
+def start_background_jobs():
+    """Inicia os workers da fila de tarefas, retomando relatórios pendentes de execuções anteriores."""
+    get_job_queue().start()
+
+def get_session_jobs(session_id: str | None = None, statuses=None, tenant_id: str | None = None) -> list[dict]:
+    """Tarefas em segundo plano (ex.: relatórios) pedidas pela sessão, das mais recentes para as mais antigas."""
+    return get_jobs(owner=_session_key(session_id, tenant_id) or DEFAULT_SESSION_ID, statuses=statuses)
+
+def add_job_listener(callback, session_id: str | None = None, tenant_id: str | None = None):
+    """Chama callback(job), na thread do worker, quando terminar uma tarefa pedida pela sessão."""
+    owner = _session_key(session_id, tenant_id) or DEFAULT_SESSION_ID
+    def listener(job):
+        if job is not None and job["owner"] == owner:
+            callback(job)
+    get_job_queue().add_listener(listener)
+    return listener
+
+def _turn_trace(session, tenant_id: str | None, user_input: str, mode: str = "sync"):
+    # Só o tamanho da mensagem vai para o trace, não o texto
+    return tracing.start_trace("chat.turn", **{"chat.session": session.session_id, "chat.tenant": tenant_id,
+                                               "chat.mode": mode, "chat.message_chars": len(user_input)})
+
+def handle_message(user_input: str, session_id: str | None = None, tenant_id: str | None = None) -> str:
+    """Responde a uma mensagem da sessão. Com tenant_id, tudo (ferramentas, banco, tarefas) usa o shard do inquilino."""
+    session = _chat_sessions.get(_session_key(session_id, tenant_id))
+    if not user_input.strip():
+        return "Por favor, diga algo."
+    started = time.perf_counter()
+    owner_token = current_job_owner.set(session.session_id) # Tarefas enfileiradas neste turno pertencem à sessão
+    tenant_token = current_tenant.set(tenant_id)
+    try:
+        # Um trace por turno: os spans do Gemini, das ferramentas e do SQL ficam abaixo dele
+        with _turn_trace(session, tenant_id, user_input) as turn:
+            # Mensagens simples ("gastei 50 com mercado hoje") são resolvidas localmente, sem o Gemini
+            bot_response = try_fast_path(user_input)
+            turn.set_attribute("chat.fast_path", bot_response is not None)
+            if bot_response is not None:
+                session.manager.record_exchange(user_input, bot_response)
+            else:
+                bot_response = session.manager.send_message(user_input)
+    finally:
+        current_tenant.reset(tenant_token)
+        current_job_owner.reset(owner_token)
+    _chat_sessions.record_turn(session, time.perf_counter() - started)
+    return bot_response
+
+def handle_message_stream(user_input: str, session_id: str | None = None, tenant_id: str | None = None):
+    """
+    Como handle_message, mas gera a resposta em trechos à medida que o modelo os produz.
+    Cada passo do turno roda numa cópia do contexto: entre um trecho e outro, o chamador
+    não enxerga o inquilino, o dono das tarefas nem o trace do turno.
+    """
+    session = _chat_sessions.get(_session_key(session_id, tenant_id))
+    if not user_input.strip():
+        yield "Por favor, diga algo."
+        return
+    context = contextvars.copy_context()
+    steps = _stream_turn(session, tenant_id, user_input)
+    try:
+        while True:
+            try:
+                chunk = context.run(next, steps)
+            except StopIteration:
+                return
+            yield chunk
+    finally:
+        context.run(steps.close) # Consumidor parou antes do fim: os resets rodam no mesmo contexto dos sets
+
+def _stream_turn(session, tenant_id: str | None, user_input: str):
+    started = time.perf_counter()
+    owner_token = current_job_owner.set(session.session_id)
+    tenant_token = current_tenant.set(tenant_id)
+    try:
+        with _turn_trace(session, tenant_id, user_input, mode="stream") as turn:
+            bot_response = try_fast_path(user_input)
+            turn.set_attribute("chat.fast_path", bot_response is not None)
+            if bot_response is not None:
+                session.manager.record_exchange(user_input, bot_response)
+                yield bot_response
+            else:
+                yield from session.manager.send_message_stream(user_input)
+    finally:
+        current_tenant.reset(tenant_token)
+        current_job_owner.reset(owner_token)
+    _chat_sessions.record_turn(session, time.perf_counter() - started)
+
+def get_async_chat_manager(session_id: str | None = None, tenant_id: str | None = None):
+    return _async_chat_sessions.get(_session_key(session_id, tenant_id)).manager
+
+async def handle_message_async(user_input: str, timeout: float | None = None, session_id: str | None = None, tenant_id: str | None = None) -> str:
+    """Versão assíncrona de handle_message: não bloqueia o loop de eventos do chamador."""
+    session = _async_chat_sessions.get(_session_key(session_id, tenant_id))
     if not user_input.strip():
         return "Por favor, diga algo."
-    bot_response = manager.send_message(user_input)
+    started = time.perf_counter()
+    owner_token = current_job_owner.set(session.session_id)
+    tenant_token = current_tenant.set(tenant_id)
+    try:
+        with _turn_trace(session, tenant_id, user_input, mode="async") as turn:
+            bot_response = await asyncio.to_thread(try_fast_path, user_input) # As ferramentas acessam o SQLite
+            turn.set_attribute("chat.fast_path", bot_response is not None)
+            if bot_response is not None:
+                session.manager.record_exchange(user_input, bot_response)
+            else:
+                bot_response = await session.manager.send_message(user_input, timeout=timeout)
+    finally:
+        current_tenant.reset(tenant_token)
+        current_job_owner.reset(owner_token)
+    _async_chat_sessions.record_turn(session, time.perf_counter() - started)
     return bot_response
 
 if __name__ == '__main__':
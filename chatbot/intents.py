@@ -0,0 +1,145 @@
+# finance-bot/chatbot/intents.py
+"""
+Reconhecedor local de intenções para as mensagens mais frequentes ("gastei 50 reais com
+mercado hoje", "qual meu saldo este mês"). Quando a mensagem inteira casa com um padrão,
+a ferramenta correspondente é chamada diretamente e a resposta é montada aqui, sem
+nenhuma ida ao Gemini. Qualquer outra mensagem (ou parâmetro duvidoso) segue para o LLM.
+"""
+import re
+import threading
+
+from ai.llm_chat import AVAILABLE_TOOL_FUNCTIONS
+
+# Formato brasileiro: ponto só como separador de milhar ("1.000", "1.500,50") e vírgula nos centavos.
+# Ponto decimal ("12.50", "1.00") é ambíguo com o milhar e fica para o LLM.
+_AMOUNT = r'(?:r\$\s*)?(?P<amount>\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:,\d{1,2})?)(?:\s*(?:reais|real|conto|contos))?'
+_CATEGORY = r'(?P<category>[a-zà-ÿ][a-zà-ÿ ]{0,40}?)'
+_DATE = r'(?:\s+(?:no\s+|em\s+)?(?P<date>hoje|ontem|(?:dia\s+)?\d{1,2}/\d{1,2}(?:/\d{2,4})?))?'
+_END = r'\s*[.!]?$'
+_PERIOD = r'(?P<period>este mês|esse mês|neste mês|nesse mês|mês atual|mês passado|no mês passado|hoje|ontem|total)'
+
+INTENT_PATTERNS = (
+    ("add_expense", re.compile(rf'^(?:eu\s+)?(?:gastei|paguei)\s+{_AMOUNT}\s+(?:com|em|no|na|de|do|da)\s+{_CATEGORY}{_DATE}{_END}')),
+    ("add_income", re.compile(rf'^(?:eu\s+)?(?:recebi|ganhei)\s+{_AMOUNT}\s+(?:de|do|da|com|como)\s+{_CATEGORY}{_DATE}{_END}')),
+    ("add_investment", re.compile(rf'^(?:eu\s+)?(?:investi|apliquei)\s+{_AMOUNT}\s+(?:em|no|na)\s+{_CATEGORY}{_DATE}{_END}')),
+    ("get_balance", re.compile(rf'^(?:qual\s+(?:é\s+|e\s+)?(?:o\s+)?)?meu\s+saldo(?:\s+(?:d[oe]\s+)?{_PERIOD})?\s*\??$')),
+    ("query_totals", re.compile(rf'^quanto\s+(?P<verb>gastei|recebi|investi)(?:\s+(?:com|em|de)\s+{_CATEGORY})?\s+{_PERIOD}\s*\??$')),
+)
+
+# Palavras que, se capturadas como categoria, indicam que o padrão casou por acaso
+_AMBIGUOUS_CATEGORIES = {"hoje", "ontem", "dia", "reais", "real", "algo", "coisa", "coisas", "tudo", "isso"}
+# Datas/períodos não reconhecidos ou várias coisas numa frase ("mercado e farmácia") ficam para o LLM
+_AMBIGUOUS_CATEGORY_WORDS = re.compile(r'\b(?:e|semana|mês|mes|ano|passad[oa]|amanhã|anteontem|cada|todo|toda)\b')
+_MAX_CATEGORY_WORDS = 3
+
+# A resposta fala do usuário na terceira pessoa: "quanto gastei" -> "você gastou"
+_THIRD_PERSON_VERBS = {"gastei": "gastou", "recebi": "recebeu", "investi": "investiu"}
+
+_stats_lock = threading.Lock()
+_stats = {"attempts": 0, "hits": 0, "by_intent": {}}
+
+
+def _parse_amount(raw: str) -> float:
+    """Valor casado por _AMOUNT: o ponto é sempre separador de milhar, a vírgula separa os centavos."""
+    return float(raw.replace(".", "").replace(",", "."))
+
+
+def _format_currency(value: float) -> str:
+    return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _normalize_period(period: str | None) -> str:
+    if not period or period == "total":
+        return "todo o período"
+    period = period.removeprefix("no ")
+    if period in ("esse mês", "neste mês", "nesse mês", "mês atual"):
+        return "este mês"
+    return period
+
+
+def _date_argument(raw_date: str | None) -> str:
+    if not raw_date:
+        return "hoje"
+    return raw_date.removeprefix("dia ").strip()
+
+
+def match_intent(user_input: str) -> tuple[str, dict] | None:
+    """Retorna (intenção, grupos capturados) se a mensagem inteira casar com um padrão confiável."""
+    text = " ".join(user_input.lower().split())
+    for intent, pattern in INTENT_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+        groups = match.groupdict()
+        category = (groups.get("category") or "").strip()
+        if (category in _AMBIGUOUS_CATEGORIES or _AMBIGUOUS_CATEGORY_WORDS.search(category)
+                or len(category.split()) > _MAX_CATEGORY_WORDS):
+            return None
+        groups["category"] = category or None
+        return intent, groups
+    return None
+
+
+def _run_intent(intent: str, groups: dict) -> str | None:
+    if intent in ("add_expense", "add_income", "add_investment"):
+        transaction_type = "entrada" if intent == "add_income" else "saída"
+        category = "investimentos" if intent == "add_investment" else groups["category"]
+        description = groups["category"] if intent == "add_investment" else ""
+        result = AVAILABLE_TOOL_FUNCTIONS["add_financial_transaction"](
+            transaction_type=transaction_type, amount=_parse_amount(groups["amount"]), category=category,
+            date_str=_date_argument(groups.get("date")), description=description)
+        if result.get("status") != "sucesso":
+            return None # Deixa o LLM lidar com o erro e conversar com o usuário
+        details = result["transaction_details"]
+        kind = {"add_expense": "gasto", "add_income": "ganho", "add_investment": "investimento"}[intent]
+        return (f"Ok! Registrei um {kind} de {_format_currency(details['amount'])} em '{details['category']}' "
+                f"no dia {details['date']}. ✅ Confira seu dashboard!")
+
+    if intent == "get_balance":
+        result = AVAILABLE_TOOL_FUNCTIONS["get_account_balance"](period_description=_normalize_period(groups.get("period")))
+        if result.get("status") != "sucesso":
+            return None
+        return (f"Seu saldo ({result['period_details_for_user']}) é de {_format_currency(result['balance'])}: "
+                f"{_format_currency(result['total_income'])} em entradas e {_format_currency(result['total_expenses'])} em saídas.")
+
+    if intent == "query_totals":
+        period = _normalize_period(groups.get("period"))
+        if period == "todo o período":
+            return None # A ferramenta de consulta exige um período definido
+        verb = groups["verb"]
+        transaction_type = "entrada" if verb == "recebi" else "saída"
+        category = "investimentos" if verb == "investi" else groups.get("category")
+        result = AVAILABLE_TOOL_FUNCTIONS["query_financial_transactions"](
+            period_description=period, transaction_type_filter=transaction_type, category_filter=category)
+        if result.get("status") != "sucesso":
+            return None
+        scope = f" com '{category}'" if category and verb != "investi" else ""
+        if not result.get("found_transactions"):
+            return f"Não encontrei transações{scope} em {result['period_details_for_user']}."
+        count = result["count"]
+        return (f"Em {result['period_details_for_user']}, você {_THIRD_PERSON_VERBS[verb]} {_format_currency(result['total_amount'])}{scope} "
+                f"({count} {'transação' if count == 1 else 'transações'}).")
+    return None
+
+
+def try_fast_path(user_input: str) -> str | None:
+    """
+    Tenta responder à mensagem localmente. Retorna o texto da resposta ou None quando
+    não há confiança suficiente (nesse caso, a mensagem deve seguir para o LLM).
+    """
+    matched = match_intent(user_input)
+    response = _run_intent(*matched) if matched else None
+    with _stats_lock:
+        _stats["attempts"] += 1
+        if response is not None:
+            _stats["hits"] += 1
+            _stats["by_intent"][matched[0]] = _stats["by_intent"].get(matched[0], 0) + 1
+    return response
+
+
+def get_fast_path_stats() -> dict:
+    """Tentativas, acertos, taxa de acerto e acertos por intenção do caminho rápido."""
+    with _stats_lock:
+        attempts, hits = _stats["attempts"], _stats["hits"]
+        return {"attempts": attempts, "hits": hits, "hit_rate": hits / attempts if attempts else 0.0,
+                "by_intent": dict(_stats["by_intent"])}
@@ -1,8 +1,13 @@
 # finance-bot/chatbot/main.py
-from chatbot.handlers import handle_message, get_chat_manager # Adicionar get_chat_manager
-from utils.db import init_db
+from ai.backends import get_backend
+from chatbot.handlers import add_job_listener, handle_message_stream, start_background_jobs
+from utils.db import JOB_DONE, get_tenant_database_path, init_db
+from utils.metrics import start_metrics_server
 import os # Para verificar se é a primeira execução
 
+# Inquilino (usuário ou família) deste terminal; sem ele, usa o banco padrão (data/transactions.db)
+TENANT_ID = os.getenv("FINANCEBOT_TENANT") or None
+
 # Arquivo para marcar a primeira execução
 FIRST_RUN_FLAG_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', '.first_run_completed')
 
@@ -27,9 +32,30 @@ Como posso te ajudar a começar?
 """
     print(f"FinanceBot: {greeting}")
 
+def print_streamed_response(user_input: str):
+    """Imprime a resposta do bot trecho a trecho, assim que cada um chega do modelo."""
+    print("FinanceBot: ", end="", flush=True)
+    for chunk in handle_message_stream(user_input, tenant_id=TENANT_ID):
+        print(chunk, end="", flush=True)
+    print()
+
+def print_finished_job(job: dict):
+    """Avisa no terminal, assim que o worker termina, um relatório pedido em segundo plano."""
+    if job["status"] == JOB_DONE:
+        message = f"📄 Seu relatório ({job['payload']['period_description']}) ficou pronto:\n{job['result']}"
+    else:
+        message = f"Não consegui gerar o relatório {job['id']}: {job['error']}"
+    print(f"\nFinanceBot: {message}\nVocê: ", end="", flush=True)
+
 def run_chatbot_cli():
     """Inicia o chatbot no modo de linha de comando."""
+    if not get_backend().available(): # Checagem barata: o SDK do Gemini só é carregado quando uma mensagem precisar do modelo
+        raise ValueError("GOOGLE_API_KEY não configurada.")
+    get_tenant_database_path(TENANT_ID) # Levanta ValueError se FINANCEBOT_TENANT for inválido
     init_db() # Garante que o banco de dados e a tabela existam
+    add_job_listener(print_finished_job, tenant_id=TENANT_ID)
+    start_background_jobs() # Retoma relatórios que ficaram pendentes na execução anterior
+    start_metrics_server() # Só com FINANCEBOT_METRICS=1 e FINANCEBOT_METRICS_PORT definidos
     
     # Garante que o diretório data exista para o arquivo de flag
     os.makedirs(os.path.join(os.path.dirname(__file__), '..', 'data'), exist_ok=True)
@@ -46,21 +72,17 @@ def run_chatbot_cli():
         print("FinanceBot: Olá! Sou o FinanceBot. Como posso te ajudar hoje?")
 
 
-    # Certifique-se de que o ChatManager é inicializado para carregar o system prompt
-    get_chat_manager() 
-
     while True:
         user_input = input("Você: ")
         if user_input.lower() == 'sair':
             # Usar o LLM para a despedida, se desejado, ou uma mensagem fixa.
             # Para consistência com o system prompt:
-            print(f"FinanceBot: {handle_message('tchau, obrigado')}") 
+            print_streamed_response('tchau, obrigado')
             # Ou a mensagem fixa:
             # print("FinanceBot: Tudo certo por aqui! Qualquer coisa, é só me chamar de novo. Te desejo ótimas finanças! 💸📊")
             break
         
-        response = handle_message(user_input)
-        print(f"FinanceBot: {response}")
+        print_streamed_response(user_input)
 
 if __name__ == '__main__':
     # Adicionar o diretório raiz ao sys.path se estiver executando este arquivo diretamente:
@@ -22,7 +22,8 @@ Você tem acesso às seguintes ferramentas para interagir com o banco de dados e
     *   Exemplo de chamada que você faria: `add_financial_transaction(transaction_type="saída", amount=200, category="investimentos", date_str="2024-05-18", description="Ações XYZ")`
 
 2.  **`list_transactions`**: Para listar transações.
-    *   Parâmetros: `period_description`, `transaction_type_filter` (pode ser "entrada", "saída", "gasto", "investimento", "ganho"), `category_filter`.
+    *   Parâmetros: `period_description`, `transaction_type_filter` (pode ser "entrada", "saída", "gasto", "investimento", "ganho"), `category_filter`, `page_cursor`.
+    *   A lista vem em páginas (mais recentes primeiro). Se o resultado trouxer `next_cursor`, há mais transações: ofereça mostrar a próxima página e, se o usuário quiser, chame a ferramenta de novo com `page_cursor` igual a esse valor.
     *   Você formatará a lista retornada para o usuário, incluindo o índice e ID de cada item.
 
 3.  **`delete_financial_transactions`**: Para excluir transações.
@@ -35,6 +36,7 @@ Você tem acesso às seguintes ferramentas para interagir com o banco de dados e
 
 5.  **`generate_financial_summary_report`**: Para gerar um relatório financeiro.
     *   Parâmetros: `period_description`.
+    *   Relatórios novos são gerados em segundo plano: a ferramenta retorna um `job_id`. Avise o usuário que o relatório aparecerá aqui assim que ficar pronto (informe o número). Se ele perguntar depois, use `get_report_status`.
 
 6.  **`query_financial_transactions`**: Para responder perguntas como "quanto gastei...".
     *   Parâmetros: `period_description`, `transaction_type_filter`, `category_filter`.
@@ -42,6 +44,9 @@ Você tem acesso às seguintes ferramentas para interagir com o banco de dados e
 7.  **`get_account_balance`**: Para obter o saldo.
     *   Parâmetros: `period_description`.
 
+8.  **`get_report_status`**: Para consultar um relatório em geração.
+    *   Parâmetros: `job_id` (integer). Se estiver concluído, apresente o `report_text` retornado.
+
 
 **FLUXO DE INTERAÇÃO COM O USUÁRIO:**
 - Saudação Inicial: Use a mensagem fornecida pelo sistema.
@@ -0,0 +1,118 @@
+# finance-bot/chatbot/sessions.py
+import threading
+import time
+from collections import OrderedDict
+
+from ai.llm_chat import estimate_history_tokens
+
+DEFAULT_SESSION_ID = "default" # Sessão usada pelo CLI e por chamadas sem session_id
+MAX_LIVE_SESSIONS = 50
+SESSION_TTL_SECONDS = 30 * 60
+HISTORY_TOKEN_BUDGET = 8000 # Acima disso, os turnos mais antigos são descartados
+
+
+class ChatSession:
+    """Um ChatManager (com seu histórico próprio) e as estatísticas de uso da sessão."""
+
+    def __init__(self, session_id: str, manager):
+        self.session_id = session_id
+        self.manager = manager
+        self.created_at = time.time()
+        self.last_used_at = self.created_at
+        self.turns = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+        self.trimmed_entries = 0
+
+    def record_turn(self, latency: float, history_token_budget: int | None):
+        self.turns += 1
+        self.total_latency += latency
+        self.last_latency = latency
+        self.last_used_at = time.time()
+        if history_token_budget:
+            self.trimmed_entries += self.manager.trim_history(history_token_budget)
+
+    def stats(self) -> dict:
+        # Sessões que ainda não falaram com o modelo não têm chat: não o cria só para as estatísticas
+        history = self.manager.chat.history if self.manager.has_chat else []
+        return {
+            "session_id": self.session_id,
+            "turns": self.turns,
+            "history_entries": len(history),
+            "history_tokens_estimate": estimate_history_tokens(history),
+            "trimmed_entries": self.trimmed_entries,
+            "avg_latency_seconds": self.total_latency / self.turns if self.turns else 0.0,
+            "last_latency_seconds": self.last_latency,
+            "idle_seconds": time.time() - self.last_used_at,
+        }
+
+
+class ChatSessionRegistry:
+    """
+    Mantém um ChatManager por sessão (ex.: uma aba do navegador no dashboard), limitado a
+    max_sessions sessões vivas com despejo LRU e expiração por inatividade (ttl_seconds).
+    Após cada turno, o histórico da sessão é podado para caber em history_token_budget.
+    """
+
+    def __init__(self, manager_factory, max_sessions: int = MAX_LIVE_SESSIONS, ttl_seconds: float | None = SESSION_TTL_SECONDS, history_token_budget: int | None = HISTORY_TOKEN_BUDGET):
+        self.manager_factory = manager_factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_token_budget = history_token_budget
+        self._sessions = OrderedDict() # session_id -> ChatSession, da menos para a mais recente
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _evict_expired(self, now: float):
+        if not self.ttl_seconds:
+            return
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used_at <= self.ttl_seconds:
+                break # As seguintes foram usadas mais recentemente
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def get(self, session_id: str | None = None) -> ChatSession:
+        # Quem vai para o fim da fila (mais recente) tem last_used_at atualizado junto:
+        # a ordem LRU é também a ordem de inatividade, da qual _evict_expired depende
+        session_id = session_id or DEFAULT_SESSION_ID
+        with self._lock:
+            now = time.time()
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used_at = now
+                self._sessions.move_to_end(session_id)
+                return session
+        # Criar o ChatManager pode ser lento: fora do lock
+        new_session = ChatSession(session_id, self.manager_factory())
+        with self._lock:
+            session = self._sessions.setdefault(session_id, new_session)
+            session.last_used_at = time.time()
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        return session
+
+    def record_turn(self, session: ChatSession, latency: float):
+        session.record_turn(latency, self.history_token_budget)
+        with self._lock:
+            if session.session_id in self._sessions:
+                session.last_used_at = time.time()
+                self._sessions.move_to_end(session.session_id)
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "live_sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "evictions": self.evictions,
+            "sessions": [session.stats() for session in sessions],
+        }
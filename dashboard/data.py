@@ -0,0 +1,48 @@
+# finance-bot/dashboard/data.py
+"""
+Carga dos dados do dashboard, separada de dashboard/main.py para não depender do
+Streamlit (usada também em benchmarks/suite.py e nos testes).
+"""
+import pandas as pd
+
+from utils.db import get_daily_total_columns, get_summary_totals
+
+def columns_to_frame(columns):
+    # Colunas NumPy de utils.db -> DataFrame sem conversões por linha: textos codificados viram Categorical
+    data = {}
+    for name, values in columns.items():
+        if name.endswith('_labels'):
+            continue
+        labels = columns.get(f'{name}_labels')
+        data[name] = pd.Categorical.from_codes(values, categories=labels) if labels is not None else values
+    return pd.DataFrame(data)
+
+def load_dashboard_data(start_date_str=None, end_date_str=None, selected_categories=None, available_categories_list=None):
+    # Uma linha por dia/tipo/categoria, agregada no SQLite e lida já tipada (datas datetime64, centavos int64)
+    columns = get_daily_total_columns(start_date=start_date_str, end_date=end_date_str)
+    if not columns:
+        return pd.DataFrame(columns=['date', 'type', 'category', 'amount', 'count'])
+    df = columns_to_frame(columns)
+    df['amount'] = df.pop('amount_cents') / 100
+    if selected_categories and available_categories_list and len(selected_categories) < len(available_categories_list):
+        df = df[df['category'].isin(selected_categories)]
+    return df
+
+def monthly_overview(df):
+    # Totais por mês de Ganhos (entradas), Gastos (saídas fora de 'investimentos') e Investimentos,
+    # a partir do frame diário de load_dashboard_data: uma linha por mês/tipo, para o gráfico de barras
+    if df.empty:
+        return pd.DataFrame(columns=['Mês', 'Tipo', 'Valor'])
+    kind = pd.Series('Gastos', index=df.index)
+    kind[df['category'] == 'investimentos'] = 'Investimentos'
+    kind[df['type'] == 'entrada'] = 'Ganhos'
+    month = df['date'].dt.strftime('%Y-%m')
+    totals = df['amount'].groupby([month.rename('Mês'), kind.rename('Tipo')]).sum()
+    return totals.rename('Valor').reset_index()
+
+def calculate_summary(start_date_str=None, end_date_str=None):
+    # Somas feitas no SQLite sobre centavos inteiros, sem carregar as transações
+    # Gastos são todas as saídas exceto a categoria 'investimentos' (se existir)
+    # Saldo considera Ganhos - (Gastos Operacionais + Investimentos)
+    totals = get_summary_totals(start_date=start_date_str, end_date=end_date_str)
+    return totals["income"], totals["expenses"], totals["investments"], totals["balance"]
@@ -1,10 +1,8 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta, date
 import sys
 import os
-import matplotlib.colors as mcolors
+import uuid
 
 # Adiciona o diretório raiz do projeto
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -12,14 +10,27 @@ project_root = os.path.dirname(current_dir)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from utils.db import get_transactions, init_db
-from ai.reports import generate_detailed_financial_report
-from chatbot.handlers import handle_message, get_chat_manager
+from utils.db import get_tenant_database_path, get_write_generation, init_db, tenant_scope
+from dashboard.data import calculate_summary, load_dashboard_data, monthly_overview
+from chatbot.handlers import get_session_jobs, handle_message_stream, start_background_jobs
+from utils.db import JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING
+from utils.metrics import start_metrics_server
 
 # --- Inicialização ---
 init_db()
+start_metrics_server() # Idempotente: as reexecuções do script reutilizam o mesmo servidor
 st.set_page_config(layout="wide", page_title="FinanceBot")
-chat_manager = get_chat_manager()
+# Inquilino (usuário ou família) cujos dados esta página mostra: ?tenant=... na URL ou FINANCEBOT_TENANT
+TENANT_ID = st.query_params.get("tenant") or os.getenv("FINANCEBOT_TENANT") or None
+try:
+    get_tenant_database_path(TENANT_ID)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+# Cada aba do navegador tem sua própria sessão de chat (e seu próprio histórico no Gemini)
+if "chat_session_id" not in st.session_state:
+    st.session_state.chat_session_id = uuid.uuid4().hex
+# O ChatManager da sessão (e o SDK do Gemini) só é criado quando a primeira mensagem precisar do modelo
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -36,12 +47,44 @@ if "messages" not in st.session_state:
     st.session_state.messages.append({"role": "assistant", "content": welcome_message, "type": "text"})
     # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 
+# --- Relatórios gerados em segundo plano (ai/jobs.py) ---
+REPORT_POLL_SECONDS = 3
+if "delivered_jobs" not in st.session_state:
+    st.session_state.delivered_jobs = set()
+
+def deliver_finished_reports() -> bool:
+    """Coloca no chat os relatórios desta sessão que ficaram prontos. Retorna True se entregou algum."""
+    delivered = False
+    for job in reversed(get_session_jobs(st.session_state.chat_session_id, tenant_id=TENANT_ID, statuses=(JOB_DONE, JOB_FAILED))):
+        if job["id"] in st.session_state.delivered_jobs:
+            continue
+        st.session_state.delivered_jobs.add(job["id"])
+        if job["status"] == JOB_DONE:
+            content = f"📄 Seu relatório ({job['payload']['period_description']}) ficou pronto:\n\n{job['result']}"
+        else:
+            content = f"Não consegui gerar o relatório {job['id']}: {job['error']}"
+        st.session_state.messages.append({"role": "assistant", "content": content, "type": "text"})
+        delivered = True
+    return delivered
+
+@st.fragment(run_every=REPORT_POLL_SECONDS)
+def report_jobs_poller():
+    # Só este trecho é reexecutado a cada REPORT_POLL_SECONDS enquanto houver relatórios em geração
+    pending = get_session_jobs(st.session_state.chat_session_id, tenant_id=TENANT_ID, statuses=(JOB_PENDING, JOB_RUNNING))
+    if pending:
+        st.caption(f"⏳ Gerando {len(pending)} relatório(s) em segundo plano...")
+    elif deliver_finished_reports():
+        st.rerun()
+
+start_background_jobs()
+deliver_finished_reports()
+
 # --- Função para escurecer cor (como antes) ---
 def darken_color(hex_color, amount=0.1):
+    # Sem matplotlib: ele só era importado para isto e custava quase um segundo na inicialização
     try:
-        rgb = mcolors.hex2color(hex_color)
-        darkened_rgb = tuple(max(0, c - amount) for c in rgb)
-        return mcolors.to_hex(darkened_rgb)
+        rgb = tuple(int(hex_color.lstrip("#")[i:i + 2], 16) / 255 for i in (0, 2, 4))
+        return "#" + "".join(f"{round(max(0, c - amount) * 255):02x}" for c in rgb)
     except ValueError: return hex_color
 
 # --- Paleta de Cores (como antes) ---
@@ -172,30 +215,33 @@ st.markdown(f"""
     </style>
 """, unsafe_allow_html=True)
 
-# --- Funções Auxiliares (sem mudanças) ---
-def load_dashboard_data(start_date_str=None, end_date_str=None, selected_categories=None, available_categories_list=None):
-    transactions = get_transactions(start_date=start_date_str, end_date=end_date_str)
-    df = pd.DataFrame(transactions)
-    if not df.empty:
-        df['amount'] = pd.to_numeric(df['amount'])
-        df['date'] = pd.to_datetime(df['date'])
-        if selected_categories and available_categories_list and len(selected_categories) < len(available_categories_list):
-            df = df[df['category'].isin(selected_categories)]
-    else:
-        df = pd.DataFrame(columns=['id', 'type', 'amount', 'category', 'description', 'date'])
-    return df
-
-def calculate_summary(df):
-    if not df.empty:
-        total_receitas = df[df['type'] == 'entrada']['amount'].sum()
-        # Gastos são todas as saídas exceto a categoria 'investimentos' (se existir)
-        total_despesas_operacionais = df[(df['type'] == 'saída') & (df['category'].str.lower() != 'investimentos')]['amount'].sum()
-        total_investimentos = df[(df['type'] == 'saída') & (df['category'].str.lower() == 'investimentos')]['amount'].sum()
-        # Saldo considera Ganhos - (Gastos Operacionais + Investimentos)
-        saldo_geral = total_receitas - (total_despesas_operacionais + total_investimentos)
-    else:
-        total_receitas, total_despesas_operacionais, total_investimentos, saldo_geral = 0, 0, 0, 0
-    return total_receitas, total_despesas_operacionais, total_investimentos, saldo_geral
+# --- Funções Auxiliares (em dashboard/data.py, sem dependência do Streamlit) ---
+
+# --- Cache dos dados do dashboard ---
+# As funções em cache recebem o contador de escritas do período como primeiro argumento:
+# reruns sem escrita reutilizam o resultado, e uma escrita só invalida os períodos que tocou.
+# O inquilino também entra na chave: o cache do Streamlit é compartilhado entre as sessões.
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_summary(tenant_id, write_generation, start_date_str=None, end_date_str=None):
+    with tenant_scope(tenant_id):
+        return calculate_summary(start_date_str, end_date_str)
+
+def get_summary(start_date_str=None, end_date_str=None):
+    generation = get_write_generation(start_date_str, end_date_str)
+    if generation is None:
+        return calculate_summary(start_date_str, end_date_str)
+    return _cached_summary(TENANT_ID, generation, start_date_str, end_date_str)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _cached_dashboard_data(tenant_id, write_generation, start_date_str=None, end_date_str=None):
+    with tenant_scope(tenant_id):
+        return load_dashboard_data(start_date_str, end_date_str)
+
+def get_dashboard_data(start_date_str=None, end_date_str=None):
+    generation = get_write_generation(start_date_str, end_date_str)
+    if generation is None:
+        return load_dashboard_data(start_date_str, end_date_str)
+    return _cached_dashboard_data(TENANT_ID, generation, start_date_str, end_date_str)
 
 
 def format_currency(value):
@@ -234,6 +280,10 @@ with col_chat_wrapper:
                 </div>"""
     message_area_html += '</div>' 
     st.markdown(message_area_html, unsafe_allow_html=True)
+    if get_session_jobs(st.session_state.chat_session_id, tenant_id=TENANT_ID, statuses=(JOB_PENDING, JOB_RUNNING)):
+        report_jobs_poller()
+    # Área onde a resposta em andamento é exibida enquanto chega do modelo
+    streaming_placeholder = st.empty()
     
     user_prompt = st.chat_input("Enviar uma mensagem...", key="chat_input_scroll_fixed_height")
 
@@ -241,17 +291,23 @@ with col_chat_wrapper:
 
 if user_prompt:
     st.session_state.messages.append({"role": "user", "content": user_prompt, "type": "text"})
-    with st.spinner("FinanceBot está digitando..."):
-        bot_response_text = handle_message(user_prompt)
+    user_bubble_html = f'<div class="message-wrapper user-message"><div class="message-bubble">{user_prompt.replace(chr(10), "<br>")}</div></div>'
+    streaming_placeholder.markdown(f'<div class="chat-messages-area">{user_bubble_html}</div>', unsafe_allow_html=True)
+    # Renderiza a resposta progressivamente: o usuário vê o primeiro trecho assim que ele chega
+    bot_response_text = ""
+    for chunk in handle_message_stream(user_prompt, session_id=st.session_state.chat_session_id, tenant_id=TENANT_ID):
+        bot_response_text += chunk
+        bot_bubble_html = f'<div class="message-wrapper assistant-message"><div class="message-bubble">{bot_response_text.replace(chr(10), "<br>")}</div></div>'
+        streaming_placeholder.markdown(f'<div class="chat-messages-area">{user_bubble_html}{bot_bubble_html}</div>', unsafe_allow_html=True)
     st.session_state.messages.append({"role": "assistant", "content": bot_response_text, "type": "text"})
     st.rerun()
 
 # --- Coluna do Dashboard (Direita) ---
-with col_dashboard_wrapper:
+# As consultas vão para o shard do inquilino só neste bloco; o chat recebe tenant_id explicitamente
+with col_dashboard_wrapper, tenant_scope(TENANT_ID):
     st.markdown('<div class="dashboard-column-wrapper">', unsafe_allow_html=True)
-    df_all_data = load_dashboard_data() 
     # Use os nomes de variáveis retornados por calculate_summary consistentemente
-    receitas, despesas_operacionais, investimentos_val, saldo_geral = calculate_summary(df_all_data)
+    receitas, despesas_operacionais, investimentos_val, saldo_geral = get_summary()
     
     st.markdown(f""" <div class="dashboard-grid"> 
                         <div class="dashboard-card card-style"><p class="card-title">Saldo</p><p class="card-value">{format_currency(saldo_geral)}</p></div> 
@@ -279,6 +335,7 @@ with col_dashboard_wrapper:
 
         if graph_data_list: # Só plota se houver dados
             overview_df = pd.DataFrame(graph_data_list)
+            import plotly.express as px # Carregado só quando há um gráfico a desenhar
             
             fig_pie_overview = px.pie(overview_df, 
                                  values='Valor', 
@@ -321,4 +378,27 @@ with col_dashboard_wrapper:
     # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
             
     st.markdown(f'</div>', unsafe_allow_html=True) 
+
+    # Evolução mês a mês, a partir dos totais diários lidos em colunas (dashboard/data.py)
+    st.markdown('<div class="graph-card card-style">', unsafe_allow_html=True)
+    st.markdown('<h3 class="graph-title">Evolução Mensal</h3>', unsafe_allow_html=True)
+    monthly_df = monthly_overview(get_dashboard_data())
+    if not monthly_df.empty:
+        import plotly.express as px
+        fig_monthly = px.bar(monthly_df, x='Mês', y='Valor', color='Tipo', barmode='group',
+                             color_discrete_map={
+                                 'Ganhos': COLOR_HIGHLIGHT_GREEN,
+                                 'Gastos': COLOR_GASTOS_RED_PIE,
+                                 'Investimentos': COLOR_INVESTIMENTOS_BLUEGREEN_PIE
+                             })
+        fig_monthly.update_layout(
+            legend=dict(title=None, orientation='h', y=1.1),
+            xaxis_title=None, yaxis_title=None,
+            margin=dict(t=10, b=10, l=10, r=10),
+            plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=280
+        )
+        st.plotly_chart(fig_monthly, use_container_width=True)
+    else:
+        st.markdown(f"<p style='text-align:center; color:{COLOR_TEXT_SECONDARY};'>Sem dados para exibir a evolução mensal.</p>", unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
\ No newline at end of file
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.db as db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Banco vazio e migrado num diretório temporário, no lugar de data/transactions.db."""
+    monkeypatch.setattr(db, "DATABASE_NAME", str(tmp_path / "transactions.db"))
+    db.init_db()
+    yield db
+    db.close_db_connections()
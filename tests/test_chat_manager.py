@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import time
+
+import ai.backends as backends
+from ai.backends import FakeBackend
+from ai.llm_chat import AVAILABLE_TOOL_FUNCTIONS, AsyncChatManager
+from ai.jobs import current_job_owner
+from chatbot.handlers import get_chat_manager, get_session_stats, handle_message, handle_message_stream
+from utils.db import current_tenant
+
+
+def test_fast_path_does_not_start_the_chat(temp_db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("o caminho rápido não deveria criar o chat")
+    monkeypatch.setattr(backends.GeminiBackend, "start_chat", fail)
+    monkeypatch.setattr(backends, "_backend", backends.GeminiBackend())
+
+    handle_message("gastei 50 com mercado hoje", session_id="sem-modelo")
+
+    manager = get_chat_manager("sem-modelo")
+    assert not manager.has_chat
+    assert [user for user, _ in manager.pending_exchanges] == ["gastei 50 com mercado hoje"]
+
+
+def test_buffered_exchanges_enter_history_when_chat_starts(temp_db, monkeypatch):
+    monkeypatch.setattr(backends, "_backend", FakeBackend())
+    handle_message("gastei 50 com mercado hoje", session_id="depois-modelo")
+    handle_message("oi", session_id="depois-modelo") # Vai para o modelo
+
+    manager = get_chat_manager("depois-modelo")
+    texts = [content.parts[0].text for content in manager.chat.history]
+    assert texts[0] == "gastei 50 com mercado hoje"
+    assert texts[2:] == ["oi", "Olá! Sou o FinanceBot (modo offline). Como posso ajudar?"]
+    assert manager.pending_exchanges == []
+
+
+def test_session_stats_do_not_start_the_chat(temp_db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("as estatísticas não deveriam criar o chat")
+    monkeypatch.setattr(backends.GeminiBackend, "start_chat", fail)
+    monkeypatch.setattr(backends, "_backend", backends.GeminiBackend())
+    handle_message("gastei 50 com mercado hoje", session_id="estatisticas")
+
+    stats = next(session for session in get_session_stats()["sync"]["sessions"] if session["session_id"] == "estatisticas")
+    assert stats["history_entries"] == 0
+    assert stats["turns"] == 1
+
+
+def test_stream_does_not_leak_context_between_chunks(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(temp_db, "TENANTS_DIR", str(tmp_path / "tenants"))
+    monkeypatch.setattr(backends, "_backend", FakeBackend())
+    seen = []
+    def list_tool(**kwargs):
+        seen.append(current_tenant.get())
+        return {"status": "sucesso", "transactions": []}
+    monkeypatch.setitem(AVAILABLE_TOOL_FUNCTIONS, "list_transactions", list_tool)
+
+    stream = handle_message_stream("liste meus gastos de março de 2023", session_id="stream", tenant_id="t1")
+    assert next(stream)
+    assert current_tenant.get() is None
+    assert current_job_owner.get() is None
+    list(stream)
+
+    assert seen == ["t1"]
+
+
+def test_stream_closed_early_from_another_context(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(temp_db, "TENANTS_DIR", str(tmp_path / "tenants"))
+    monkeypatch.setattr(backends, "_backend", FakeBackend())
+    stream = handle_message_stream("liste meus gastos de março de 2023", session_id="stream-fechado", tenant_id="t1")
+    next(stream)
+
+    contextvars.copy_context().run(stream.close) # Não levanta ValueError nos resets
+    assert current_tenant.get() is None
+
+
+def test_async_timeout_waits_for_running_write_tool(temp_db, monkeypatch):
+    monkeypatch.setattr(backends, "_backend", FakeBackend())
+    add_tool = AVAILABLE_TOOL_FUNCTIONS["add_financial_transaction"]
+    def slow_add(**kwargs):
+        time.sleep(0.3) # Termina depois do tempo limite do turno
+        return add_tool(**kwargs)
+    monkeypatch.setitem(AVAILABLE_TOOL_FUNCTIONS, "add_financial_transaction", slow_add)
+    manager = AsyncChatManager(timeout=0.05)
+
+    reply = asyncio.run(manager.send_message("gastei 50 com mercado hoje"))
+
+    assert len(temp_db.get_transactions()) == 1
+    assert "parte do pedido já foi feita" in reply and "R$ 50,00" in reply
+    texts = [content.parts[0].text for content in manager.chat.history]
+    assert texts[0] == "gastei 50 com mercado hoje"
+    assert texts[1].startswith("[Turno interrompido") and "add_financial_transaction" in texts[1]
+    assert len(texts) == 2
+
+
+def test_async_timeout_without_writes_rewinds_history(temp_db, monkeypatch):
+    monkeypatch.setattr(backends, "_backend", FakeBackend())
+    balance_tool = AVAILABLE_TOOL_FUNCTIONS["get_account_balance"]
+    def slow_balance(**kwargs):
+        time.sleep(0.2)
+        return balance_tool(**kwargs)
+    monkeypatch.setitem(AVAILABLE_TOOL_FUNCTIONS, "get_account_balance", slow_balance)
+    manager = AsyncChatManager(timeout=0.05)
+
+    reply = asyncio.run(manager.send_message("qual meu saldo?"))
+
+    assert reply == "Desculpe, demorei demais para responder. Pode tentar novamente?"
+    assert list(manager.chat.history) == []
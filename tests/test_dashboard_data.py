@@ -0,0 +1,35 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+
+from dashboard.data import load_dashboard_data, monthly_overview
+
+
+def _add(db, type, amount, category, date):
+    db.add_transaction(type, amount, category, "", date)
+
+
+def test_load_dashboard_data_is_typed_daily_totals(temp_db):
+    _add(temp_db, "saída", 50, "mercado", "2024-01-06")
+    _add(temp_db, "saída", 30.5, "Mercado", "2024-01-06")
+    _add(temp_db, "entrada", 1000, "salário", "2024-01-05")
+
+    df = load_dashboard_data()
+
+    assert list(df.columns) == ["date", "type", "category", "count", "amount"]
+    assert df["date"].dtype.kind == "M"
+    assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+    row = df[df["category"] == "mercado"].iloc[0]
+    assert (row["count"], row["amount"]) == (2, 80.5)
+
+
+def test_monthly_overview_splits_income_expenses_and_investments(temp_db):
+    _add(temp_db, "entrada", 1000, "salário", "2024-01-05")
+    _add(temp_db, "saída", 80, "mercado", "2024-01-06")
+    _add(temp_db, "saída", 200, "investimentos", "2024-02-01")
+
+    totals = monthly_overview(load_dashboard_data())
+
+    assert totals.values.tolist() == [["2024-01", "Ganhos", 1000.0], ["2024-01", "Gastos", 80.0], ["2024-02", "Investimentos", 200.0]]
+    assert monthly_overview(load_dashboard_data("2030-01-01", "2030-12-31")).empty
@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+import utils.date_utils as date_utils
+from utils.date_utils import _parse_date_cached, _parse_period_cached
+
+TODAY = date(2024, 1, 20)
+
+
+@pytest.fixture(autouse=True)
+def no_dateparser(monkeypatch):
+    """Os formatos abaixo são todos resolvidos pelas regex: o dateparser não pode ser usado."""
+    def fail():
+        raise AssertionError("dateparser não deveria ser importado")
+    monkeypatch.setattr(date_utils, "_get_dateparser", fail)
+    date_utils.clear_parse_caches()
+    yield
+    date_utils.clear_parse_caches()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hoje", "2024-01-20"),
+    ("ontem", "2024-01-19"),
+    ("anteontem", "2024-01-18"),
+    ("2024-03-05", "2024-03-05"),
+    ("15/05", "2024-05-15"),
+    ("15/05/2023", "2023-05-15"),
+    ("12/04/24", "2024-04-12"), # Ano com dois dígitos: antes virava 0024
+    ("01-02-99", "1999-02-01"),
+    ("15 de maio de 2023", "2023-05-15"),
+    ("dia 10 de janeiro", "2024-01-10"),
+    ("15 de dezembro", "2023-12-15"), # Sem ano, prefere o passado
+])
+def test_parse_date_fast_path(text, expected):
+    assert _parse_date_cached(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text", ["15/13/2023", "31/02/2024", "2024-02-30"])
+def test_impossible_dates_are_rejected_without_dateparser(text):
+    assert _parse_date_cached(text, TODAY) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("julho de 2023", ("2023-07-01", "2023-07-31", "Julho de 2023")),
+    ("jan 2024", ("2024-01-01", "2024-01-31", "Janeiro de 2024")),
+    ("02/2024", ("2024-02-01", "2024-02-29", "Fevereiro de 2024")),
+    ("dezembro", ("2023-12-01", "2023-12-31", "Dezembro de 2023")), # Ainda não chegou: o do ano anterior
+    ("janeiro", ("2024-01-01", "2024-01-31", "Janeiro de 2024")),
+    ("mês passado", ("2023-12-01", "2023-12-31", "Dezembro de 2023")),
+    ("este mês", ("2024-01-01", "2024-01-31", "Janeiro de 2024")),
+    ("todo o período", (None, None, "todo o período")),
+])
+def test_parse_period_fast_path(text, expected):
+    assert _parse_period_cached(text, TODAY) == expected
+
+
+def test_invalid_numeric_period_is_not_recognized(monkeypatch):
+    monkeypatch.setattr(date_utils, "_dateparser_parse", lambda text: None)
+
+    start, end, message = _parse_period_cached("13/2024", TODAY)
+
+    assert (start, end) == (None, None)
+    assert "não reconhecido" in message
+
+
+def test_results_are_cached_per_day():
+    _parse_date_cached("ontem", TODAY)
+    _parse_date_cached("ontem", TODAY)
+    assert _parse_date_cached.cache_info().hits == 1
+    assert _parse_date_cached("ontem", date(2024, 1, 21)) == "2024-01-20"
@@ -0,0 +1,35 @@
+import pytest
+
+from utils.db import to_cents
+from utils.migrations import SCHEMA_VERSION
+
+
+@pytest.mark.parametrize("amount, cents", [(0.125, 13), (-0.125, -13), (1.005, 101), (19.99, 1999), (12, 1200), (0.1 + 0.2, 30)])
+def test_to_cents_rounds_half_away_from_zero(amount, cents):
+    assert to_cents(amount) == cents
+
+
+def test_report_cache_hit_is_read_only(temp_db):
+    temp_db.store_cached_report("2024-01-01", "2024-01-31", "agregado", "fp", "relatório")
+    conn = temp_db.get_db_connection()
+    changes = conn.total_changes
+
+    assert temp_db.get_cached_report("2024-01-01", "2024-01-31", "agregado", "fp") == "relatório"
+    assert conn.total_changes == changes
+
+    # Os acertos são gravados junto com a próxima entrada do cache
+    temp_db.store_cached_report("2024-02-01", "2024-02-29", "agregado", "fp", "outro")
+    row = conn.execute("SELECT hits FROM report_cache WHERE start_date = '2024-01-01'").fetchone()
+    assert row["hits"] == 1
+
+
+def test_tenant_shard_has_no_jobs_table(temp_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(temp_db, "TENANTS_DIR", str(tmp_path / "tenants"))
+    with temp_db.tenant_scope("familia_silva"):
+        conn = temp_db.get_db_connection()
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    assert "transactions" in tables and "report_cache" in tables
+    assert "jobs" not in tables
+    assert version == SCHEMA_VERSION
@@ -0,0 +1,34 @@
+from datetime import date
+
+import pytest
+
+from chatbot.intents import match_intent, try_fast_path
+from utils.date_utils import PT_MONTH_NAMES
+
+
+def _this_month() -> str:
+    today = date.today()
+    return f"{PT_MONTH_NAMES[today.month - 1]} de {today.year}".capitalize()
+
+
+def test_query_totals_reply_uses_third_person_and_singular(temp_db):
+    assert try_fast_path("gastei 50 com mercado hoje") is not None
+    assert try_fast_path("quanto gastei com mercado este mês?") == (
+        f"Em {_this_month()}, você gastou R$ 50,00 com 'mercado' (1 transação).")
+
+
+def test_query_totals_reply_plural(temp_db):
+    try_fast_path("recebi 1000 de salário hoje")
+    try_fast_path("recebi 200 de freela hoje")
+    assert try_fast_path("quanto recebi este mês") == f"Em {_this_month()}, você recebeu R$ 1.200,00 (2 transações)."
+
+
+@pytest.mark.parametrize("text, amount", [("1.000", 1000.0), ("1.500,50", 1500.5), ("12,50", 12.5), ("r$ 2.345.678", 2345678.0)])
+def test_fast_path_amounts_use_brazilian_separators(temp_db, text, amount):
+    assert try_fast_path(f"gastei {text} reais com aluguel hoje") is not None
+    assert temp_db.get_transactions()[0].amount == amount
+
+
+@pytest.mark.parametrize("text", ["12.50", "1.00", "1.0000"])
+def test_fast_path_leaves_decimal_point_to_the_model(text):
+    assert match_intent(f"gastei {text} reais com aluguel hoje") is None
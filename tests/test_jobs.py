@@ -0,0 +1,23 @@
+from utils.db import JOB_FAILED, JOB_RUNNING, claim_next_job, enqueue_job, get_job
+
+
+def test_expired_lease_is_reclaimed_until_max_attempts(temp_db):
+    job_id = enqueue_job("report", {}, max_attempts=2)
+
+    # Prazo negativo: o worker "morre" e a reserva já nasce vencida
+    assert claim_next_job(lease_seconds=-1)["attempts"] == 1
+    assert claim_next_job(lease_seconds=-1)["attempts"] == 2
+    assert claim_next_job(lease_seconds=-1) is None
+
+    job = get_job(job_id)
+    assert job["status"] == JOB_FAILED
+    assert job["attempts"] == 2
+    assert "2 tentativa(s)" in job["error"]
+
+
+def test_live_lease_is_not_reclaimed(temp_db):
+    job_id = enqueue_job("report", {}, max_attempts=2)
+
+    assert claim_next_job(lease_seconds=60)["id"] == job_id
+    assert claim_next_job(lease_seconds=60) is None
+    assert get_job(job_id)["status"] == JOB_RUNNING
@@ -0,0 +1,126 @@
+import json
+import socket
+import urllib.request
+
+import pytest
+
+from utils import metrics
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _histogram(name, **labels):
+    return next(entry for entry in metrics.dump_json()["histograms"] if entry["name"] == name and entry["labels"] == labels)
+
+
+def _counter(name, **labels):
+    return next((entry["value"] for entry in metrics.dump_json()["counters"]
+                 if entry["name"] == name and entry["labels"] == labels), 0)
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    metrics.reset()
+    timed = metrics.timed("test_seconds", function="f")(lambda: 1)
+
+    assert timed() == 1
+    with metrics.timer("test_seconds"):
+        pass
+    metrics.inc("test_total")
+    assert metrics.dump_json() == {"histograms": [], "counters": []}
+
+
+def test_timed_counts_calls_and_errors(enabled):
+    @metrics.timed("test_seconds", function="boom")
+    def boom(fail):
+        if fail:
+            raise ValueError("falhou")
+        return "ok"
+
+    assert boom(False) == "ok"
+    with pytest.raises(ValueError):
+        boom(True)
+
+    assert _histogram("test_seconds", function="boom")["count"] == 2
+    assert _counter("test_errors_total", function="boom") == 1
+
+
+def test_timed_generator_measures_the_whole_iteration(enabled):
+    @metrics.timed("test_seconds", function="gen")
+    def gen():
+        yield from range(3)
+
+    assert list(gen()) == [0, 1, 2]
+    partial = gen()
+    next(partial)
+    partial.close() # Consumidor que para no meio não é erro
+
+    assert _histogram("test_seconds", function="gen")["count"] == 2
+    assert _counter("test_errors_total", function="gen") == 0
+
+
+def test_timer_counts_errors_and_reraises(enabled):
+    with pytest.raises(KeyError):
+        with metrics.timer("test_seconds", call="x"):
+            raise KeyError("x")
+
+    assert _histogram("test_seconds", call="x")["count"] == 1
+    assert _counter("test_errors_total", call="x") == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert (snapshot["count"], snapshot["sum"]) == (4, pytest.approx(3.65))
+
+
+def test_render_prometheus_format(enabled):
+    metrics.observe("financebot_db_call_seconds", 0.003, function="add_transaction")
+    metrics.inc("financebot_db_call_errors_total", function='quo"te')
+
+    lines = metrics.render_prometheus().splitlines()
+
+    assert "# TYPE financebot_db_call_seconds histogram" in lines
+    assert 'financebot_db_call_seconds_bucket{function="add_transaction",le="0.0025"} 0' in lines
+    assert 'financebot_db_call_seconds_bucket{function="add_transaction",le="0.005"} 1' in lines
+    assert 'financebot_db_call_seconds_bucket{function="add_transaction",le="+Inf"} 1' in lines
+    assert 'financebot_db_call_seconds_count{function="add_transaction"} 1' in lines
+    assert "# TYPE financebot_db_call_errors_total counter" in lines
+    assert 'financebot_db_call_errors_total{function="quo\\"te"} 1' in lines
+
+
+def test_db_functions_are_instrumented(enabled, temp_db):
+    temp_db.add_transaction("saída", 10, "Mercado", "", "2024-01-10")
+    temp_db.get_transactions()
+
+    assert _histogram("financebot_db_call_seconds", function="add_transaction")["count"] == 1
+    assert _histogram("financebot_db_call_seconds", function="get_transactions")["count"] == 1
+
+
+def test_metrics_server_serves_both_formats(enabled, monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    metrics.observe("test_seconds", 0.2, call="http")
+    with socket.socket() as probe: # Porta livre (0 desliga o servidor)
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = metrics.start_metrics_server(port=port)
+    try:
+        assert metrics.start_metrics_server(port=port) is server # Reaproveita o servidor
+        base = f"http://127.0.0.1:{port}"
+        with urllib.request.urlopen(base + "/metrics", timeout=5) as response:
+            assert 'test_seconds_count{call="http"} 1' in response.read().decode()
+        with urllib.request.urlopen(base + "/metrics.json", timeout=5) as response:
+            assert json.load(response)["histograms"][0]["labels"] == {"call": "http"}
+    finally:
+        server.shutdown()
+        server.server_close()
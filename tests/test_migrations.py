@@ -0,0 +1,71 @@
+import sqlite3
+
+import utils.db as db
+from utils.migrations import SCHEMA_VERSION, run_migrations
+from utils.models import to_cents
+
+# Esquema do banco antes das migrações (a versão original de utils/db.py)
+BASELINE_SCHEMA = '''
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT,
+    date TEXT NOT NULL
+)
+'''
+
+
+def _create_baseline_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO transactions (type, amount, category, description, date) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_amount_migration_rounds_like_new_writes(tmp_path, monkeypatch):
+    amounts = [1.005, 0.145, 0.125, 19.99, 2.675]
+    path = str(tmp_path / "legado.db")
+    _create_baseline_db(path, [("saída", amount, "lazer", "", "2024-01-10") for amount in amounts])
+    monkeypatch.setattr(db, "DATABASE_NAME", path)
+    try:
+        db.init_db()
+        migrated = [row[0] for row in db.get_db_connection().execute("SELECT amount_cents FROM transactions ORDER BY id")]
+    finally:
+        db.close_db_connections()
+
+    assert migrated == [to_cents(amount) for amount in amounts]
+    assert migrated[:2] == [101, 15]
+
+
+def test_baseline_database_is_upgraded_in_place(tmp_path, monkeypatch):
+    path = str(tmp_path / "legado.db")
+    _create_baseline_db(path, [
+        ("saída", 50.0, " Alimentação", "mercado", "2024-01-10"),
+        ("saída", 20.0, "alimentação", "padaria", "2024-01-11"),
+        ("entrada", 1000.0, "Salário", "", "2024-01-05"),
+        ("saída", 5.0, "lazer", "apagada", "2024-02-01"),
+    ])
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM transactions WHERE id = 4") # O id 4 não pode ser reutilizado
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(db, "DATABASE_NAME", path)
+    try:
+        db.init_db()
+        conn = db.get_db_connection()
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert run_migrations(conn) == SCHEMA_VERSION # Já atualizado: nada a fazer
+
+        rows = [tuple(row) for row in conn.execute("SELECT id, category, amount_cents FROM transactions ORDER BY id")]
+        assert rows == [(1, "alimentação", 5000), (2, "alimentação", 2000), (3, "salário", 100000)]
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'transactions'")}
+        assert {"idx_transactions_date_id", "idx_transactions_type_date", "idx_transactions_category_date"} <= indexes
+        rollups = [tuple(row) for row in conn.execute("SELECT month, type, category, total_cents, count FROM monthly_rollups ORDER BY type")]
+        assert rollups == [("2024-01", "entrada", "salário", 100000, 1), ("2024-01", "saída", "alimentação", 7000, 2)]
+
+        assert db.add_transaction("saída", 1.0, "lazer", "", "2024-02-02") == 5
+    finally:
+        db.close_db_connections()
@@ -0,0 +1,50 @@
+import pytest
+
+import ai.llm_chat as llm_chat
+from ai.llm_chat import AVAILABLE_TOOL_FUNCTIONS
+
+# Várias transações no mesmo dia: a ordem (date, id) desempata pelo id
+DATES = ["2024-01-03", "2024-01-05", "2024-01-05", "2024-01-05", "2024-01-10", "2024-01-10", "2024-01-20", "2024-02-01"]
+
+
+@pytest.fixture
+def rows(temp_db):
+    ids = [temp_db.add_transaction("saída", n + 1, "teste", "", date) for n, date in enumerate(DATES)]
+    return sorted(zip(DATES, ids), reverse=True) # Mais recentes primeiro
+
+
+def test_iter_transactions_pages_by_date_and_id(temp_db, rows):
+    listed = [(t.date, t.id) for t in temp_db.iter_transactions(batch_size=3)]
+
+    assert listed == rows
+
+
+def test_iter_transactions_resumes_after_a_key(temp_db, rows):
+    after = rows[2] # Terceira transação, no meio de um dia com empate
+    listed = [(t.date, t.id) for t in temp_db.iter_transactions(batch_size=2, after=after)]
+
+    assert listed == rows[3:]
+    assert [(t.date, t.id) for t in temp_db.get_transactions(limit=2, after=after)] == rows[3:5]
+
+
+def test_list_transactions_next_cursor_walks_every_page(temp_db, rows, monkeypatch):
+    monkeypatch.setattr(llm_chat, "LIST_PAGE_SIZE", 3)
+    list_tool = AVAILABLE_TOOL_FUNCTIONS["list_transactions"]
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = list_tool(period_description="janeiro de 2024", page_cursor=cursor)
+        assert page["status"] == "sucesso"
+        seen += [(item["date"], item["id"]) for item in page["transactions"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [row for row in rows if row[0].startswith("2024-01")]
+    assert pages == 3
+
+
+def test_list_transactions_rejects_malformed_cursor(temp_db):
+    result = AVAILABLE_TOOL_FUNCTIONS["list_transactions"](period_description="janeiro de 2024", page_cursor="2024-01-05")
+
+    assert result["status"] == "erro"
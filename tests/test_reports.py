@@ -0,0 +1,10 @@
+from ai.reports import _fit_sections
+
+
+def test_fit_sections_stays_within_budget():
+    sections = [(f"Seção {n}:", [f"- linha {i} da seção {n}" for i in range(8)]) for n in range(5)]
+    full = _fit_sections(sections, 10_000)
+
+    for max_chars in range(0, len(full) + 1):
+        assert len(_fit_sections(sections, max_chars)) <= max_chars
+    assert _fit_sections(sections, len(full)) == full
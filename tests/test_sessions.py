@@ -0,0 +1,56 @@
+import types
+
+import pytest
+
+import chatbot.sessions as sessions
+from chatbot.sessions import ChatSessionRegistry
+
+
+class FakeManager:
+    has_chat = False
+
+    def trim_history(self, max_tokens):
+        return 0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_ttl_evicts_sessions_idle_behind_a_fresh_one(clock):
+    registry = ChatSessionRegistry(FakeManager, ttl_seconds=60)
+    registry.get("a")
+    clock[0] += 30
+    registry.get("b")
+    clock[0] += 20
+    registry.get("a") # "a" volta a ser usada: "b" fica na frente da fila, ainda dentro do TTL
+    clock[0] += 50 # "b" está parada há 70s, "a" há 50s
+
+    registry.get("c")
+
+    assert [session["session_id"] for session in registry.stats()["sessions"]] == ["a", "c"]
+    assert registry.evictions == 1
+
+
+def test_get_counts_as_use_for_ttl(clock):
+    registry = ChatSessionRegistry(FakeManager, ttl_seconds=60)
+    first = registry.get("a")
+    clock[0] += 50
+    registry.get("a")
+    clock[0] += 50
+
+    assert registry.get("a") is first
+
+
+def test_record_turn_refreshes_idle_time(clock):
+    registry = ChatSessionRegistry(FakeManager, ttl_seconds=60)
+    session = registry.get("a")
+    clock[0] += 59
+    registry.record_turn(session, latency=0.1)
+    clock[0] += 59
+
+    assert registry.get("a") is session
+    assert registry.evictions == 0
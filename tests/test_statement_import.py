@@ -0,0 +1,63 @@
+import io
+
+from utils.statement_import import import_statement, iter_csv_transactions, iter_ofx_transactions
+
+CSV_EXTRATO = """Data;Descrição;Valor;Categoria
+05/01/2024;Salário;5.000,00;
+06/01/2024;Mercado;-1.234,56;Alimentação
+31/02/2024;Data inválida;-10,00;
+"""
+
+OFX_SGML = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240110120000<TRNAMT>-45.90<NAME>PADARIA
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240111<TRNAMT>1500.00<MEMO>PIX RECEBIDO
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def test_csv_uses_brazilian_amounts_and_sign_for_type():
+    rows = list(iter_csv_transactions(io.StringIO(CSV_EXTRATO)))
+
+    assert rows[0] == {"type": "entrada", "amount": 5000.0, "category": "outras receitas", "description": "Salário", "date": "2024-01-05"}
+    assert rows[1] == {"type": "saída", "amount": 1234.56, "category": "Alimentação", "description": "Mercado", "date": "2024-01-06"}
+    assert rows[2]["date"] is None # Rejeitada por bulk_add_transactions
+
+
+def test_csv_type_column_overrides_the_sign():
+    rows = list(iter_csv_transactions(io.StringIO("date,amount,type\n2024-01-05,30.00,débito\n")))
+
+    assert (rows[0]["type"], rows[0]["amount"]) == ("saída", 30.0)
+
+
+def test_ofx_sgml_without_closing_tags():
+    rows = list(iter_ofx_transactions(io.StringIO(OFX_SGML)))
+
+    assert [(row["type"], row["amount"], row["description"], row["date"]) for row in rows] == [
+        ("saída", 45.9, "PADARIA", "2024-01-10"),
+        ("entrada", 1500.0, "PIX RECEBIDO", "2024-01-11"),
+    ]
+
+
+def test_import_statement_inserts_valid_rows_and_rejects_the_rest(temp_db, tmp_path):
+    path = tmp_path / "extrato.csv"
+    path.write_text(CSV_EXTRATO, encoding="utf-8")
+
+    stats = import_statement(str(path), chunk_size=2)
+
+    assert (stats["inserted"], stats["rejected"], stats["failed_chunks"]) == (2, 1, 0)
+    assert sorted((t.category, t.amount) for t in temp_db.get_transactions()) == [("alimentação", 1234.56), ("outras receitas", 5000.0)]
+
+
+def test_bulk_add_rolls_back_only_the_failing_chunk(temp_db):
+    temp_db.get_db_connection().execute('''
+    CREATE TRIGGER falha_no_meio BEFORE INSERT ON transactions WHEN NEW.description = 'falha'
+    BEGIN SELECT RAISE(ABORT, 'falha simulada'); END
+    ''')
+    rows = [{"type": "saída", "amount": n, "category": "teste", "description": "falha" if n == 4 else "", "date": "2024-01-10"}
+            for n in range(1, 7)]
+
+    stats = temp_db.bulk_add_transactions(iter(rows), chunk_size=2)
+
+    assert stats == {"inserted": 4, "rejected": 0, "failed_chunks": 1, "failed_rows": 2}
+    assert sorted(t.amount for t in temp_db.get_transactions()) == [1.0, 2.0, 5.0, 6.0]
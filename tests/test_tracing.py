@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+
+import pytest
+
+from utils import tracing
+
+
+class ListExporter:
+    def __init__(self):
+        self.records = []
+
+    def export(self, records):
+        self.records.extend(records)
+
+    def shutdown(self):
+        pass
+
+    def named(self, name):
+        return [record for record in self.records if record["name"] == name]
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    tracing.configure(exporter)
+    yield exporter
+    tracing.configure()
+
+
+def test_disabled_tracing_yields_the_noop_span():
+    tracing.configure()
+    with tracing.span("nada") as current:
+        assert current is tracing.NOOP_SPAN
+        assert tracing.current_span() is None
+
+
+def test_trace_is_exported_when_the_root_ends(exporter):
+    with tracing.start_trace("chat.turn", session="s1") as root:
+        with tracing.span("tool.x") as child:
+            child.set_attribute("linhas", 3)
+        assert exporter.records == []
+        with pytest.raises(ValueError):
+            with tracing.span("tool.y"):
+                raise ValueError("falhou")
+
+    records = {record["name"]: record for record in exporter.records}
+    assert list(records) == ["tool.x", "tool.y", "chat.turn"]
+    assert {record["trace_id"] for record in exporter.records} == {root.trace_id}
+    assert records["tool.x"]["parent_span_id"] == root.span_id
+    assert records["tool.x"]["attributes"] == {"linhas": 3}
+    assert (records["tool.y"]["status"], records["tool.y"]["error"]) == ("error", "ValueError: falhou")
+    assert records["chat.turn"]["parent_span_id"] is None
+
+
+def test_use_parent_links_work_from_another_thread(exporter):
+    with tracing.start_trace("chat.turn") as root:
+        def work():
+            with tracing.use_parent(root), tracing.span("thread"):
+                pass
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert exporter.named("thread")[0]["parent_span_id"] == root.span_id
+
+
+def test_sql_spans_record_statement_and_rows(temp_db, exporter):
+    for amount in (10, 20, 30):
+        temp_db.add_transaction("saída", amount, "Mercado", "", "2024-01-10")
+
+    with tracing.start_trace("chat.turn"):
+        assert len(temp_db.get_transactions()) == 3
+    temp_db.get_transactions() # Fora de um trace: sem span
+
+    select = [record for record in exporter.named("sql") if record["attributes"]["db.operation"] == "SELECT"]
+    assert len(select) == 1
+    attributes = select[0]["attributes"]
+    assert attributes["db.rows"] == 3
+    assert attributes["db.name"] == "transactions.db"
+    assert "FROM transactions" in attributes["db.statement"]
+
+
+def test_configure_at_runtime_swaps_open_connections(temp_db):
+    tracing.configure()
+    plain = temp_db.get_db_connection()
+    assert type(plain) is sqlite3.Connection
+    rows = temp_db.iter_transactions(batch_size=1)
+    temp_db.add_transaction("saída", 10, "Mercado", "", "2024-01-10")
+    temp_db.add_transaction("saída", 20, "Mercado", "", "2024-01-11")
+    assert next(rows).amount == 20
+
+    exporter = ListExporter()
+    tracing.configure(exporter)
+    try:
+        assert isinstance(temp_db.get_db_connection(), tracing.TracedConnection)
+        with tracing.start_trace("chat.turn"):
+            temp_db.get_transactions()
+        assert exporter.named("sql")
+        assert next(rows).amount == 10 # O cursor aberto antes da troca continua válido
+    finally:
+        tracing.configure()
+
+    assert type(temp_db.get_db_connection()) is sqlite3.Connection
+
+
+def test_jsonl_round_trip_and_summary(tmp_path):
+    path = str(tmp_path / "traces" / "traces.jsonl")
+    tracing.configure(tracing.JsonlExporter(path))
+    try:
+        with tracing.start_trace("chat.turn") as root:
+            with tracing.span("gemini.send_message"):
+                pass
+            with tracing.span("gemini.send_message"):
+                pass
+    finally:
+        tracing.configure()
+
+    traces = tracing.load_traces(path)
+    assert list(traces) == [root.trace_id]
+    summary = tracing.summarize_trace(traces[root.trace_id])
+    assert summary["root"]["name"] == "chat.turn"
+    assert summary["by_name"]["gemini.send_message"]["count"] == 2
+
+
+def test_otlp_conversion_round_trip(exporter):
+    with tracing.start_trace("chat.turn", **{"chat.session": "s1", "chat.tools": 2}):
+        with pytest.raises(RuntimeError):
+            with tracing.span("tool.x"):
+                raise RuntimeError("erro")
+
+    body = tracing.to_otlp(exporter.records)
+    spans = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["status"] == {"code": 2, "message": "RuntimeError: erro"}
+    assert {"key": "chat.tools", "value": {"intValue": "2"}} in spans[1]["attributes"]
+
+    restored = tracing.from_otlp(body)
+    for original, record in zip(exporter.records, restored):
+        assert record == {**original, "duration_ms": record["duration_ms"]}
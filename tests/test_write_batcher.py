@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+INSERT = "INSERT INTO transactions (type, amount_cents, category, description, date) VALUES (?, ?, ?, ?, ?)"
+
+
+def _row(amount_cents, category="mercado", type="saída"):
+    return (type, amount_cents, category, "", "2024-01-10")
+
+
+@pytest.fixture
+def batcher(temp_db, monkeypatch):
+    """WriteBatcher próprio, parado: as escritas ficam na fila até start() (um único grupo)."""
+    batcher = temp_db.WriteBatcher(max_delay=0.05)
+    monkeypatch.setattr(batcher, "_start", lambda: None)
+    batcher.start = lambda: temp_db.WriteBatcher._start(batcher)
+    yield batcher
+    batcher.stop()
+
+
+def _amounts(db):
+    return [row[0] for row in db.get_db_connection().execute("SELECT amount_cents FROM transactions ORDER BY id")]
+
+
+def test_failed_write_does_not_undo_the_rest_of_the_group(temp_db, batcher):
+    first = batcher.submit(INSERT, _row(100), result="lastrowid")
+    broken = batcher.submit(INSERT, _row(200, type=None), result="lastrowid") # type NOT NULL
+    last = batcher.submit(INSERT, _row(300), result="lastrowid")
+    batcher.start()
+
+    assert last.result(timeout=5) == first.result(timeout=5) + 1
+    with pytest.raises(sqlite3.IntegrityError):
+        broken.result(timeout=5)
+    assert _amounts(temp_db) == [100, 300]
+    stats = batcher.stats()
+    assert (stats["batches"], stats["writes"], stats["failed_writes"]) == (1, 2, 1)
+
+
+def test_futures_resolve_to_row_counts(temp_db, batcher):
+    inserted = [batcher.submit(INSERT, _row(100)), batcher.submit(INSERT, _row(200))]
+    updated = batcher.submit("UPDATE transactions SET category = 'feira'")
+    deleted = batcher.submit("DELETE FROM transactions WHERE amount_cents = 999")
+    batcher.start()
+
+    assert [future.result(timeout=5) for future in inserted] == [1, 1]
+    assert updated.result(timeout=5) == 2
+    assert deleted.result(timeout=5) == 0
+
+
+def test_groups_commit_once_per_shard(temp_db, batcher, tmp_path, monkeypatch):
+    monkeypatch.setattr(temp_db, "TENANTS_DIR", str(tmp_path / "tenants"))
+    futures = [batcher.submit(INSERT, _row(100))]
+    for tenant_id, amount in (("t1", 200), ("t2", 300), ("t1", 400)):
+        with temp_db.tenant_scope(tenant_id):
+            futures.append(batcher.submit(INSERT, _row(amount)))
+    batcher.start()
+
+    assert [future.result(timeout=5) for future in futures] == [1, 1, 1, 1]
+    assert batcher.stats()["batches"] == 3 # Um commit por banco presente no grupo
+    assert _amounts(temp_db) == [100]
+    with temp_db.tenant_scope("t1"):
+        assert _amounts(temp_db) == [200, 400]
+    with temp_db.tenant_scope("t2"):
+        assert _amounts(temp_db) == [300]
+
+
+def test_stop_flushes_queued_writes(temp_db, batcher):
+    futures = [batcher.submit(INSERT, _row(amount)) for amount in range(1, 51)]
+    batcher.start()
+    batcher.stop()
+
+    assert all(future.done() for future in futures)
+    assert _amounts(temp_db) == list(range(1, 51))
+
+
+def test_without_group_commit_writes_run_inline(temp_db, monkeypatch):
+    monkeypatch.setattr(temp_db, "GROUP_COMMIT", False)
+    def no_batcher():
+        raise AssertionError("com FINANCEBOT_GROUP_COMMIT=0 a thread escritora não deveria ser usada")
+    monkeypatch.setattr(temp_db, "get_write_batcher", no_batcher)
+
+    transaction_id = temp_db.add_transaction("saída", 12.5, "Mercado", "", "2024-01-10")
+
+    assert temp_db.get_transactions()[0].id == transaction_id
+    assert temp_db.queue_delete_transaction(transaction_id).result() == 1
+    failed = temp_db._execute_write(INSERT, _row(100, type=None))
+    assert isinstance(failed.exception(), sqlite3.IntegrityError)
+    assert _amounts(temp_db) == []
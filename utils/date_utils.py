@@ -1,120 +1,143 @@
-import dateparser
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import re
 
+from utils.metrics import timed
+
+# Os formatos mais comuns são resolvidos por regex pré-compiladas; o dateparser (lento,
+# principalmente na primeira chamada) só é importado e usado quando nenhuma delas casa.
+# Os resultados ficam num cache LRU cuja chave inclui a data de hoje, já que "hoje",
+# "ontem" ou "15/05" dependem dela.
+
+PARSE_CACHE_SIZE = 1024
+
+PT_MONTHS = {
+    'janeiro': 1, 'jan': 1, 'fevereiro': 2, 'fev': 2, 'março': 3, 'marco': 3, 'mar': 3,
+    'abril': 4, 'abr': 4, 'maio': 5, 'mai': 5, 'junho': 6, 'jun': 6, 'julho': 7, 'jul': 7,
+    'agosto': 8, 'ago': 8, 'setembro': 9, 'set': 9, 'outubro': 10, 'out': 10,
+    'novembro': 11, 'nov': 11, 'dezembro': 12, 'dez': 12,
+}
+# Nomes para exibir ("Outubro de 2026"): strftime('%B') segue o locale do sistema, em geral inglês
+PT_MONTH_NAMES = ('janeiro', 'fevereiro', 'março', 'abril', 'maio', 'junho', 'julho', 'agosto',
+                  'setembro', 'outubro', 'novembro', 'dezembro')
+RELATIVE_DAYS = {'hoje': 0, 'ontem': -1, 'anteontem': -2, 'amanhã': 1}
+
+_ISO_DATE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+_NUMERIC_DATE = re.compile(r'^(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}|\d{2}))?$') # DD/MM[/AAAA], DD-MM[-AA]
+_MONTH_NAME_DATE = re.compile(r'^(?:dia\s+)?(\d{1,2})\s+(?:de\s+)?([a-zç]+)\.?(?:\s+(?:de\s+)?(\d{4}))?$') # 15 de maio [de 2024]
+_MONTH_NAME_PERIOD = re.compile(r'^(?:(?:em|de)\s+)?([a-zç]+)\.?(?:\s+(?:de\s+)?(\d{4}))?$') # julho [de 2023]
+_NUMERIC_PERIOD = re.compile(r'^(\d{1,2})/(\d{4})$') # 07/2023
+
+_dateparser = None
+
+
+def _get_dateparser():
+    global _dateparser
+    if _dateparser is None:
+        import dateparser
+        _dateparser = dateparser
+    return _dateparser
+
+
+def _expand_year(year_str: str) -> int:
+    year = int(year_str)
+    if len(year_str) == 2: # Heurística comum para yy
+        year += 2000 if year < 70 else 1900
+    return year
+
+
+def _dateparser_parse(text: str) -> datetime | None:
+    # PREFER_DATES_FROM: 'past' - se ambíguo, prefere datas no passado.
+    # DATE_ORDER: 'DMY' - ajuda a interpretar DD/MM/YYYY corretamente em pt-BR.
+    settings = {'PREFER_DATES_FROM': 'past', 'DATE_ORDER': 'DMY'}
+    # Tentar remover preposições comuns que podem confundir o dateparser
+    return _get_dateparser().parse(text.replace(' de ', ' '), languages=['pt'], settings=settings)
+
+
+def _fast_parse_date(text: str, today: date) -> date | None:
+    """Formatos reconhecidos por regex. Levanta ValueError para datas impossíveis (ex.: 31/02)."""
+    if text in RELATIVE_DAYS:
+        return today + timedelta(days=RELATIVE_DAYS[text])
+    match = _ISO_DATE.match(text)
+    if match:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    match = _NUMERIC_DATE.match(text)
+    if match:
+        day, month, year = match.groups()
+        # Sem ano, assume o ano corrente (como o formato '%d/%m' sempre fez)
+        return date(_expand_year(year) if year else today.year, int(month), int(day))
+    match = _MONTH_NAME_DATE.match(text)
+    if match and match.group(2) in PT_MONTHS:
+        day, month, year = int(match.group(1)), PT_MONTHS[match.group(2)], match.group(3)
+        if year:
+            return date(int(year), month, day)
+        parsed = date(today.year, month, day)
+        # Sem ano, prefere o passado: "15 de dezembro" em janeiro é do ano anterior
+        return parsed if parsed <= today else date(today.year - 1, month, day)
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_cached(text: str, today: date) -> str | None:
+    try:
+        parsed = _fast_parse_date(text, today)
+    except ValueError:
+        return None # Casou com um formato conhecido, mas a data não existe
+    if parsed is None:
+        parsed = _dateparser_parse(text)
+    return parsed.strftime('%Y-%m-%d') if parsed else None
+
+
+@timed("financebot_date_parse_seconds", function="parse_date_to_str")
 def parse_date_to_str(date_input: str | None, default_to_today: bool = True) -> str | None:
     """
-    Converte uma string de data (potencialmente em linguagem natural ou vários formatos) 
+    Converte uma string de data (potencialmente em linguagem natural ou vários formatos)
     para o formato YYYY-MM-DD.
     Retorna None se não conseguir parsear e default_to_today for False (ou se o input for inválido).
     """
+    today = date.today()
     if not date_input:
-        return datetime.now().strftime('%Y-%m-%d') if default_to_today else None
-    
-    date_input_lower = date_input.lower().strip()
-    now = datetime.now()
-
-    if date_input_lower == 'hoje':
-        return now.strftime('%Y-%m-%d')
-    if date_input_lower == 'ontem':
-        return (now - timedelta(days=1)).strftime('%Y-%m-%d')
-
-    # Lista de formatos a serem tentados explicitamente ANTES do dateparser,
-    # para maior controle, especialmente com anos de 2 dígitos.
-    # Adicionar mais formatos conforme necessário.
-    explicit_formats_with_year = [
-        '%d/%m/%Y', '%d-%m-%Y', 
-        '%d de %B de %Y', # 15 de maio de 2024 (requer locale ou dateparser)
-        '%Y-%m-%d' # Formato ISO já é o desejado
-    ]
-    explicit_formats_without_year = [ # Assumirá o ano corrente
-        '%d/%m', '%d-%m',
-        '%d de %B' # 15 de maio (requer locale ou dateparser)
-    ]
+        return today.strftime('%Y-%m-%d') if default_to_today else None
 
-    parsed_dt: datetime | None = None
-
-    # 1. Tentar formatos explícitos com ano
-    for fmt in explicit_formats_with_year:
-        try:
-            # Para formatos com nome do mês, dateparser é melhor se não especificarmos locale
-            if '%B' in fmt: 
-                continue 
-            parsed_dt = datetime.strptime(date_input, fmt)
-            # Se o ano for de 2 dígitos e for interpretado como 19xx ou 20xx, verificar se faz sentido
-            if parsed_dt.year < 2000 and len(str(parsed_dt.year)) == 4 and date_input.count('/') == 2 and len(date_input.split('/')[-1]) == 2 : # d/m/yy
-                 parsed_dt = parsed_dt.replace(year=parsed_dt.year + 2000 if parsed_dt.year < 70 else parsed_dt.year + 1900) # Heurística comum para yy
-            break 
-        except ValueError:
-            continue
-    
-    # 2. Se não parseou, tentar formatos explícitos sem ano (assumir ano corrente)
-    if not parsed_dt:
-        for fmt in explicit_formats_without_year:
-            try:
-                if '%B' in fmt:
-                    continue
-                dt_temp = datetime.strptime(date_input, fmt)
-                parsed_dt = dt_temp.replace(year=now.year)
-                # Se a data resultante for futura e o input não especificou ano, considerar ano passado
-                if parsed_dt > now and not re.search(r'\b(de\s+)?\d{4}\b', date_input_lower):
-                    # Verifique se o usuário não mencionou o ano
-                    # e se a data DD/MM resultou em uma data futura no ano corrente.
-                    # Isso é um pouco heurístico. dateparser lida melhor com isso.
-                    # Para ser mais seguro, podemos deixar o dateparser tentar.
-                    pass # Não vamos retroceder o ano aqui, deixaremos para o dateparser
-                break
-            except ValueError:
-                continue
-
-    # 3. Se ainda não parseou, usar dateparser como uma tentativa mais flexível
-    # dateparser é bom com nomes de meses e formatos mais complexos.
-    if not parsed_dt:
-        # Configurações para o dateparser:
-        # PREFER_DATES_FROM: 'past' - se ambíguo, prefere datas no passado.
-        # DATE_ORDER: 'DMY' - ajuda a interpretar DD/MM/YYYY corretamente em pt-BR.
-        # STRICT_PARSING: False - permite alguma flexibilidade.
-        # FUZZY: True - pode ajudar com pequenas variações, mas use com cautela.
-        settings = {'PREFER_DATES_FROM': 'past', 'DATE_ORDER': 'DMY'}
-        # Tentar remover preposições comuns que podem confundir o dateparser se ele não estiver esperando
-        cleaned_date_input = date_input_lower.replace(' de ', ' ') 
-        
-        parsed_dt_dp = dateparser.parse(cleaned_date_input, languages=['pt'], settings=settings)
-        
-        if parsed_dt_dp:
-            parsed_dt = parsed_dt_dp
-            # Se dateparser não pegou o ano e resultou em data futura, e o input não tinha ano:
-            # (Esta lógica pode ser redundante se 'PREFER_DATES_FROM': 'past' funcionar bem)
-            if parsed_dt.year == now.year and parsed_dt > now and not re.search(r'\b(de\s+)?\d{4}\b', date_input_lower):
-                # Check if the original input string explicitly mentioned a year
-                # Heurística: se o input for "10 dezembro" e hoje é 1 nov, ele parseará para 10 dez do ano CORRENTE.
-                # Se quisermos que "10 dezembro" seja do ano passado se já passou, precisamos de lógica adicional
-                # ou confiar que o usuário será mais específico, ou que 'PREFER_DATES_FROM': 'past' resolverá.
-                # Para inputs como "15/12" quando estamos em janeiro, dateparser com DMY e past deve pegar o ano passado.
-                pass
-
-
-    # 4. Se finalmente temos uma data parseada, formatar e retornar
-    if parsed_dt:
-        return parsed_dt.strftime('%Y-%m-%d')
-    
-    # 5. Se tudo falhou e default_to_today é True, retorna hoje
+    parsed = _parse_date_cached(date_input.lower().strip(), today)
+    if parsed:
+        return parsed
     if default_to_today:
-        return now.strftime('%Y-%m-%d')
-    
-    # 6. Se tudo falhou e default_to_today é False, retorna None
+        return today.strftime('%Y-%m-%d')
     return None
 
 
-def parse_period_to_dates(period_str: str) -> tuple[str | None, str | None, str]:
-    """
-    Converte uma string de período (ex: "mês passado", "julho", "julho de 2023")
-    em datas de início e fim (YYYY-MM-DD) e uma descrição do período.
-    Retorna (start_date, end_date, period_description_for_user).
-    """
-    now = datetime.now()
+def _month_label(dt: datetime) -> str:
+    return f"{PT_MONTH_NAMES[dt.month - 1]} de {dt.year}".capitalize()
+
+
+def _month_bounds(year: int, month: int) -> tuple[datetime, datetime]:
+    start_date_dt = datetime(year, month, 1)
+    next_month_dt = (start_date_dt.replace(day=28) + timedelta(days=4))
+    return start_date_dt, next_month_dt - timedelta(days=next_month_dt.day)
+
+
+def _fast_parse_period_month(text: str, today: date) -> tuple[int, int] | None:
+    """(ano, mês) para 'julho', 'julho de 2023', 'jul 2023' ou '07/2023', sem dateparser."""
+    match = _NUMERIC_PERIOD.match(text)
+    if match:
+        month = int(match.group(1))
+        return (int(match.group(2)), month) if 1 <= month <= 12 else None
+    match = _MONTH_NAME_PERIOD.match(text)
+    if match and match.group(1) in PT_MONTHS:
+        month = PT_MONTHS[match.group(1)]
+        if match.group(2):
+            return int(match.group(2)), month
+        # Sem ano, prefere o passado: "dezembro" em janeiro é o dezembro anterior
+        return (today.year, month) if month <= today.month else (today.year - 1, month)
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_period_cached(period_str: str, today: date) -> tuple[str | None, str | None, str]:
+    now = datetime.combine(today, datetime.min.time())
     period_str_lower = period_str.lower().strip()
-    period_description_for_user = period_str.capitalize() 
+    period_description_for_user = period_str.capitalize()
 
     start_date_dt: datetime | None = None
     end_date_dt: datetime | None = None
@@ -129,67 +152,59 @@ def parse_period_to_dates(period_str: str) -> tuple[str | None, str | None, str]
         start_date_dt = end_date_dt = now - timedelta(days=1)
         period_description_for_user = "ontem"
     elif "este mês" == period_str_lower or "mês atual" == period_str_lower:
-        start_date_dt = now.replace(day=1)
-        next_month_dt = (start_date_dt.replace(day=28) + timedelta(days=4))
-        end_date_dt = next_month_dt - timedelta(days=next_month_dt.day)
-        period_description_for_user = f"{now.strftime('%B de %Y').capitalize()}"
+        start_date_dt, end_date_dt = _month_bounds(now.year, now.month)
+        period_description_for_user = _month_label(now)
     elif "mês passado" == period_str_lower:
-        first_day_current_month_dt = now.replace(day=1)
-        last_day_last_month_dt = first_day_current_month_dt - timedelta(days=1)
-        first_day_last_month_dt = last_day_last_month_dt.replace(day=1)
-        start_date_dt = first_day_last_month_dt
-        end_date_dt = last_day_last_month_dt
-        period_description_for_user = f"{first_day_last_month_dt.strftime('%B de %Y').capitalize()}"
+        last_day_last_month_dt = now.replace(day=1) - timedelta(days=1)
+        start_date_dt, end_date_dt = _month_bounds(last_day_last_month_dt.year, last_day_last_month_dt.month)
+        period_description_for_user = _month_label(start_date_dt)
     elif "todo o período" == period_str_lower:
         start_date_dt, end_date_dt = None, None # Sinaliza para buscar tudo
         period_description_for_user = "todo o período"
     else:
-        # Tenta parsear com dateparser, focando em mês/ano
-        settings = {'PREFER_DATES_FROM': 'past', 'DATE_ORDER': 'DMY'}
-        # Limpar um pouco o input para dateparser
-        cleaned_period_str = period_str_lower.replace(' de ', ' ')
-        
-        parsed_dt_info = dateparser.parse(cleaned_period_str, languages=['pt'], settings=settings)
-        
-        if parsed_dt_info:
-            # Se dateparser retorna um dia específico, assumimos que o usuário quer o mês inteiro
-            year_to_use = parsed_dt_info.year
-            month_to_use = parsed_dt_info.month
-
-            # Heurística para inferir o ano se apenas o mês foi dado e o mês é futuro
-            # Ex: em Nov/2023, "Dezembro" deve ser Dez/2023, mas "Janeiro" deve ser Jan/2023 (passado)
-            # Se o input original NÃO continha um ano:
-            if not re.search(r'\b(de\s+)?\d{4}\b', period_str_lower):
-                if year_to_use == now.year and month_to_use > now.month: # Mês futuro no ano corrente
-                    # Esta lógica é complexa. PREFER_DATES_FROM: 'past' deve ajudar.
-                    # Se for "julho" e estamos em maio, ele pegará julho do ano corrente.
-                    # Se for "dezembro" e estamos em janeiro, ele DEVE pegar dezembro do ano passado.
-                    pass # A configuração 'PREFER_DATES_FROM': 'past' deve cuidar disso.
-                         # Se não, podemos forçar year_to_use -=1 em certos casos.
-
-            start_date_dt = datetime(year_to_use, month_to_use, 1)
-            next_month_calc_dt = (start_date_dt.replace(day=28) + timedelta(days=4))
-            end_date_dt = next_month_calc_dt - timedelta(days=next_month_calc_dt.day)
-            period_description_for_user = f"{start_date_dt.strftime('%B de %Y').capitalize()}"
-        else:
+        year_month = _fast_parse_period_month(period_str_lower, today)
+        if year_month is None:
+            # Último recurso: dateparser. Se ele retorna um dia específico, assumimos que o usuário quer o mês inteiro
+            parsed_dt_info = _dateparser_parse(period_str_lower)
+            if parsed_dt_info:
+                year_month = (parsed_dt_info.year, parsed_dt_info.month)
+        if year_month is None:
             return None, None, f"Período '{period_str}' não reconhecido. Tente 'mês passado', 'este mês', 'Julho de 2023', etc."
+        start_date_dt, end_date_dt = _month_bounds(*year_month)
+        period_description_for_user = _month_label(start_date_dt)
 
     start_date_str = start_date_dt.strftime('%Y-%m-%d') if start_date_dt else None
     end_date_str = end_date_dt.strftime('%Y-%m-%d') if end_date_dt else None
-            
+
     return start_date_str, end_date_str, period_description_for_user
 
 
+@timed("financebot_date_parse_seconds", function="parse_period_to_dates")
+def parse_period_to_dates(period_str: str) -> tuple[str | None, str | None, str]:
+    """
+    Converte uma string de período (ex: "mês passado", "julho", "julho de 2023")
+    em datas de início e fim (YYYY-MM-DD) e uma descrição do período.
+    Retorna (start_date, end_date, period_description_for_user).
+    """
+    return _parse_period_cached(period_str, date.today())
+
+
+def clear_parse_caches():
+    """Esvazia os caches de parsing (útil em benchmarks e quando o relógio é simulado)."""
+    _parse_date_cached.cache_clear()
+    _parse_period_cached.cache_clear()
+
+
 if __name__ == '__main__':
     test_dates = [
-        "hoje", "ontem", "15/05", "15/05/2024", "15-05-2024", "15 de maio", 
+        "hoje", "ontem", "15/05", "15/05/2024", "15-05-2024", "15 de maio",
         "15 de maio de 2024", "2024-05-15", "12/04/24", "01/12", "dezembro",
         "natal", "amanhã", "próxima semana", "15/13/2023", None, ""
     ]
     print("--- Testando parse_date_to_str (default_to_today=True) ---")
     for date_str_test in test_dates:
         print(f"Input: '{date_str_test}' -> Output: '{parse_date_to_str(date_str_test)}'")
-    
+
     print("\n--- Testando parse_date_to_str (default_to_today=False) ---")
     for date_str_test in test_dates:
         print(f"Input: '{date_str_test}' -> Output: '{parse_date_to_str(date_str_test, default_to_today=False)}'")
@@ -198,4 +213,4 @@ if __name__ == '__main__':
     test_periods = ["hoje", "ontem", "este mês", "mês passado", "julho", "julho 2023", "dezembro", "janeiro", "todo o período", "bla"]
     for period_str_test in test_periods:
         s, e, d = parse_period_to_dates(period_str_test)
-        print(f"Input: '{period_str_test}' -> Start: {s}, End: {e}, Desc: '{d}'")
\ No newline at end of file
+        print(f"Input: '{period_str_test}' -> Start: {s}, End: {e}, Desc: '{d}'")
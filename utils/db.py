@@ -1,118 +1,1010 @@
 import sqlite3
 import os
+import atexit
+import calendar
+import json
+import math
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from itertools import islice
 
-DATABASE_NAME = os.path.join(os.path.dirname(__file__), '..', 'data', 'transactions.db')
+from utils import metrics, tracing
+from utils.migrations import run_migrations
+from utils.models import Transaction, to_cents, transaction_row_factory
 
-def get_db_connection():
-    os.makedirs(os.path.join(os.path.dirname(__file__), '..', 'data'), exist_ok=True)
-    conn = sqlite3.connect(DATABASE_NAME)
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+DATABASE_NAME = os.path.join(DATA_DIR, 'transactions.db')
+TENANTS_DIR = os.path.join(DATA_DIR, 'tenants')  # Um arquivo SQLite (shard) por inquilino
+MAX_OPEN_SHARDS = 64  # Conexões mantidas abertas por thread; acima disso, fecha a menos usada (LRU)
+_TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Inquilino (usuário ou família) das operações no contexto atual. None usa DATABASE_NAME,
+# como numa instalação de um só usuário. Veja tenant_scope().
+current_tenant: ContextVar[str | None] = ContextVar("current_tenant", default=None)
+
+# Ajustes aplicados uma única vez, quando a conexão da thread é aberta.
+# WAL permite leituras concorrentes com uma escrita; synchronous=NORMAL é seguro em WAL
+# e evita um fsync por commit.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MiB mapeados em memória
+    "PRAGMA cache_size=-16000",  # ~16 MiB de cache de páginas
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+STATEMENT_CACHE_SIZE = 256  # Prepared statements mantidos em cache por conexão
+
+_thread_local = threading.local()
+_open_connections = []  # (thread, caminho, conexão) de todas as threads, para o encerramento
+_pool_lock = threading.Lock()
+_pool_generation = 0  # Incrementado em close_db_connections() para invalidar as conexões das threads
+_ready_dirs = set()  # Diretórios já criados, para não repetir os.makedirs a cada conexão
+_initialized_databases = set()  # Bancos já migrados neste processo
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    db_dir = os.path.dirname(db_path)
+    if db_dir not in _ready_dirs:
+        os.makedirs(db_dir, exist_ok=True)
+        _ready_dirs.add(db_dir)
+    # check_same_thread=False apenas para permitir que close_db_connections() feche
+    # conexões de outras threads no encerramento; cada conexão é usada por uma única thread.
+    # Com o rastreamento ligado, cada instrução executada dentro de um trace vira um span 'sql'
+    conn = sqlite3.connect(db_path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False,
+                           factory=tracing.connection_factory())
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _prune_dead_threads():
+    """Fecha conexões de threads que já terminaram (chamado com _pool_lock adquirido)."""
+    alive = []
+    for thread, db_path, conn in _open_connections:
+        if thread.is_alive():
+            alive.append((thread, db_path, conn))
+        else:
+            conn.close()
+    _open_connections[:] = alive
+
+
+def get_tenant_database_path(tenant_id: str | None) -> str:
+    """Caminho do shard do inquilino (DATABASE_NAME para None). Levanta ValueError se o id for inválido."""
+    if tenant_id is None:
+        return DATABASE_NAME
+    if not _TENANT_ID_PATTERN.fullmatch(tenant_id):
+        raise ValueError(f"Identificador de inquilino inválido: '{tenant_id}'.")
+    return os.path.join(TENANTS_DIR, f"{tenant_id}.db")
+
+
+@contextmanager
+def tenant_scope(tenant_id: str | None):
+    """Executa o bloco com as funções deste módulo apontando para o shard do inquilino."""
+    get_tenant_database_path(tenant_id)  # Valida antes de trocar o contexto
+    token = current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def _get_connection(db_path: str) -> sqlite3.Connection:
+    """
+    Conexão persistente da thread atual para db_path, aberta (e configurada) só na
+    primeira chamada. Cada thread mantém até MAX_OPEN_SHARDS conexões, numa LRU; shards
+    de inquilinos são criados e migrados quando abertos pela primeira vez no processo.
+    Se o rastreamento foi ligado ou desligado depois da abertura, a conexão é trocada
+    na próxima chamada fora de uma transação.
+    """
+    connections = getattr(_thread_local, 'connections', None)
+    if connections is None or _thread_local.generation != _pool_generation:
+        connections = _thread_local.connections = OrderedDict()
+        _thread_local.generation = _pool_generation
+    conn = connections.get(db_path)
+    if conn is not None:
+        if type(conn) is tracing.connection_factory() or conn.in_transaction:
+            connections.move_to_end(db_path)
+            return conn
+        # tracing.configure() ligou ou desligou o rastreamento depois que a conexão foi aberta:
+        # reabre com a fábrica certa. A antiga não é fechada aqui, para não invalidar um cursor
+        # ainda em uso (ex.: iter_transactions); o sqlite3 a fecha quando o último cursor for coletado.
+        del connections[db_path]
+        with _pool_lock:
+            _open_connections[:] = [entry for entry in _open_connections if entry[2] is not conn]
+    conn = _open_connection(db_path)
+    if db_path != DATABASE_NAME and db_path not in _initialized_databases:
+        run_migrations(conn, verbose=False, shard=True)
+        _initialized_databases.add(db_path)
+    connections[db_path] = conn
+    evicted = []
+    while len(connections) > MAX_OPEN_SHARDS:
+        evicted.append(connections.popitem(last=False)[1])
+    with _pool_lock:
+        _prune_dead_threads()
+        if evicted:
+            _open_connections[:] = [entry for entry in _open_connections if entry[2] not in evicted]
+        _open_connections.append((threading.current_thread(), db_path, conn))
+    for old_conn in evicted:
+        old_conn.close()
     return conn
 
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Retorna a conexão persistente da thread atual para o banco do inquilino do contexto
+    (current_tenant; sem inquilino, DATABASE_NAME). Não feche a conexão retornada; use
+    close_db_connections() no encerramento.
+    """
+    return _get_connection(get_tenant_database_path(current_tenant.get()))
+
+
+def _get_main_connection() -> sqlite3.Connection:
+    """Conexão com DATABASE_NAME, independente do inquilino (ex.: a fila de tarefas, compartilhada)."""
+    return _get_connection(DATABASE_NAME)
+
+
+def close_db_connections():
+    """Fecha todas as conexões abertas pelo pool (de todas as threads)."""
+    global _pool_generation
+    with _pool_lock:
+        for thread, db_path, conn in _open_connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"Erro ao fechar conexão com {db_path}: {e}")
+        _open_connections.clear()
+        # As threads reabrem a conexão sob demanda na próxima chamada
+        _pool_generation += 1
+
+
+atexit.register(close_db_connections)
+
+def _normalize_category(category: str) -> str:
+    """Categorias são gravadas e comparadas em minúsculas, sem espaços nas pontas."""
+    return category.lower().strip()
+
+def from_cents(amount_cents: int) -> float:
+    return amount_cents / 100
+
+# Colunas devolvidas nas listagens, na ordem dos campos de Transaction; amount continua em reais (float)
+TRANSACTION_COLUMNS = "id, type, amount_cents / 100.0 AS amount, category, description, date"
+
+def _build_filters(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None) -> tuple[str, list]:
+    """Monta a cláusula WHERE (ou '') e os parâmetros para os filtros comuns de transações."""
+    conditions = []
+    params = []
+    if start_date:
+        conditions.append("date >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append("date <= ?")
+        params.append(end_date)
+    if category:
+        conditions.append("category = ?")
+        params.append(_normalize_category(category))
+    if transaction_type:
+        conditions.append("type = ?")
+        params.append(transaction_type)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
 def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        type TEXT NOT NULL,
-        amount REAL NOT NULL,
-        category TEXT NOT NULL,
-        description TEXT,
-        date TEXT NOT NULL
-    );
-    ''')
-    conn.commit()
-    conn.close()
+    """
+    Cria o banco principal, se necessário, e aplica as migrações pendentes (uma vez por
+    processo). Os shards dos inquilinos são migrados sob demanda, ao serem abertos.
+    """
+    if DATABASE_NAME in _initialized_databases:
+        return
+    conn = _get_main_connection()
+    run_migrations(conn)
+    _initialized_databases.add(DATABASE_NAME)
     print("Banco de dados inicializado ou já existente.")
 
-def add_transaction(type: str, amount: float, category: str, description: str, date_str: str):
+# --- Escritas agrupadas (group commit) ---
+# Com GROUP_COMMIT, as escritas pontuais (add/update/delete) vão para uma única thread
+# escritora, que junta as que chegam dentro de GROUP_COMMIT_MAX_DELAY num só commit:
+# um fsync e uma aquisição do lock de escrita por grupo, em vez de um por escrita.
+GROUP_COMMIT = os.getenv("FINANCEBOT_GROUP_COMMIT", "1") != "0"
+GROUP_COMMIT_MAX_DELAY = 0.002  # Segundos que a primeira escrita do grupo pode esperar por outras
+GROUP_COMMIT_MAX_BATCH = 256  # Escritas por commit, no máximo
+
+
+class WriteBatcher:
+    """
+    Thread escritora única. submit() enfileira uma escrita e devolve um Future que resolve
+    para o lastrowid ("lastrowid") ou o número de linhas afetadas ("rowcount") depois do
+    commit do grupo. Cada escrita roda num SAVEPOINT: se ela falhar, só o seu Future recebe
+    a exceção e as demais do grupo são gravadas.
+    """
+
+    def __init__(self, max_delay: float = GROUP_COMMIT_MAX_DELAY, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._last_batch_size = 0
+        self._lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"batches": 0, "writes": 0, "failed_writes": 0, "failed_commits": 0,
+                         "max_batch_size": 0, "commit_seconds": 0.0, "max_commit_seconds": 0.0}
+
+    def submit(self, query: str, params=(), result: str = "rowcount") -> Future:
+        """Enfileira a escrita no banco do inquilino atual."""
+        future = Future()
+        # O span atual acompanha a escrita, para o SQL executado na thread escritora entrar no trace de quem pediu
+        self._queue.put((get_tenant_database_path(current_tenant.get()), query, tuple(params), result, future, tracing.current_span()))
+        if self._thread is None:
+            self._start()
+        return future
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="financebot-db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0):
+        """Grava o que estiver na fila e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Grupos e escritas gravados, tamanho médio/máximo dos grupos e latência de commit (ms)."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        batches = metrics["batches"]
+        return {
+            "batches": batches,
+            "writes": metrics["writes"],
+            "failed_writes": metrics["failed_writes"],
+            "failed_commits": metrics["failed_commits"],
+            "avg_batch_size": metrics["writes"] / batches if batches else 0.0,
+            "max_batch_size": metrics["max_batch_size"],
+            "avg_commit_ms": metrics["commit_seconds"] / batches * 1000 if batches else 0.0,
+            "max_commit_ms": metrics["max_commit_seconds"] * 1000,
+            "queued": self._queue.qsize(),
+        }
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            # Um escritor sozinho não espera: a janela só é usada quando o grupo anterior
+            # mostrou concorrência (mais de uma escrita) ou já há outras escritas na fila,
+            # e termina antes se o grupo chegar ao tamanho do anterior (todos já escreveram)
+            wait = self._last_batch_size > 1 or not self._queue.empty()
+            deadline = time.monotonic() + (self.max_delay if wait else 0)
+            target = max(self._last_batch_size, 2)
+            stopping = False
+            while len(batch) < self.max_batch:
+                if len(batch) >= target and self._queue.empty():
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            groups = {}  # Um commit por banco (shard) presente no grupo
+            for request in batch:
+                groups.setdefault(request[0], []).append(request)
+            for db_path, requests in groups.items():
+                self._commit_group(db_path, requests)
+            self._last_batch_size = len(batch)
+            if stopping:
+                return
+
+    def _commit_group(self, db_path: str, requests: list):
+        started = time.perf_counter()
+        results = []
+        failed = 0
+        try:
+            conn = _get_connection(db_path)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for _, query, params, result, future, parent_span in requests:
+                    conn.execute("SAVEPOINT write_request")
+                    try:
+                        with tracing.use_parent(parent_span):
+                            cursor = conn.execute(query, params)
+                    except sqlite3.Error as e:
+                        conn.execute("ROLLBACK TO write_request")
+                        results.append((future, None, e))
+                        failed += 1
+                    else:
+                        results.append((future, cursor.lastrowid if result == "lastrowid" else cursor.rowcount, None))
+                    conn.execute("RELEASE write_request")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        except Exception as e:  # Nenhum Future pode ficar sem resposta
+            print(f"DB: Erro ao gravar grupo de {len(requests)} escritas (desfeito): {e}")
+            for request in requests:
+                request[4].set_exception(e)
+            with self._metrics_lock:
+                self._metrics["failed_commits"] += 1
+            return
+        elapsed = time.perf_counter() - started
+        for future, value, error in results:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics["batches"] += 1
+            metrics["writes"] += len(requests) - failed
+            metrics["failed_writes"] += failed
+            metrics["max_batch_size"] = max(metrics["max_batch_size"], len(requests))
+            metrics["commit_seconds"] += elapsed
+            metrics["max_commit_seconds"] = max(metrics["max_commit_seconds"], elapsed)
+
+
+_write_batcher: WriteBatcher | None = None
+_write_batcher_lock = threading.Lock()
+
+def get_write_batcher() -> WriteBatcher:
+    """Thread escritora compartilhada do processo (iniciada na primeira escrita)."""
+    global _write_batcher
+    with _write_batcher_lock:
+        if _write_batcher is None:
+            _write_batcher = WriteBatcher()
+            atexit.register(_write_batcher.stop)  # Roda antes de close_db_connections (atexit é LIFO)
+        return _write_batcher
+
+def _execute_write(query: str, params=(), result: str = "rowcount") -> Future:
+    """Executa uma escrita pontual: pela thread escritora (GROUP_COMMIT) ou direto, com commit próprio."""
+    if GROUP_COMMIT:
+        return get_write_batcher().submit(query, params, result)
+    future = Future()
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        datetime.strptime(date_str, '%Y-%m-%d')
-        cursor.execute('''
-        INSERT INTO transactions (type, amount, category, description, date)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (type, amount, category, description, date_str))
+        cursor = conn.execute(query, params)
         conn.commit()
-        return cursor.lastrowid
+        future.set_result(cursor.lastrowid if result == "lastrowid" else cursor.rowcount)
+    except sqlite3.Error as e:
+        conn.rollback()
+        future.set_exception(e)
+    return future
+
+def queue_add_transaction(type: str, amount: float, category: str, description: str, date_str: str) -> Future:
+    """
+    Enfileira a inserção e devolve um Future com o id da nova transação (ou sqlite3.Error).
+    Levanta ValueError na hora se a data não estiver em YYYY-MM-DD.
+    """
+    datetime.strptime(date_str, '%Y-%m-%d')
+    return _execute_write('''
+        INSERT INTO transactions (type, amount_cents, category, description, date)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (type, to_cents(amount), _normalize_category(category), description, date_str), result="lastrowid")
+
+def add_transaction(type: str, amount: float, category: str, description: str, date_str: str):
+    try:
+        return queue_add_transaction(type, amount, category, description, date_str).result()
     except ValueError:
         print(f"Erro: Formato de data inválido: {date_str}")
         return None
     except sqlite3.Error as e:
         print(f"Erro ao adicionar transação: {e}")
         return None
-    finally:
-        conn.close()
 
-def get_transactions(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None, limit: int = None):
+BULK_CHUNK_SIZE = 5000  # Linhas por transação em bulk_add_transactions
+VALID_TRANSACTION_TYPES = ("entrada", "saída")
+
+def _invalid_dates(dates) -> set:
+    """Valida um lote de datas YYYY-MM-DD de uma vez, parseando cada data distinta só uma vez."""
+    invalid = set()
+    for date_str in set(dates):
+        try:
+            datetime.strptime(date_str, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            invalid.add(date_str)
+    return invalid
+
+def _insert_chunk(conn: sqlite3.Connection, chunk: list) -> tuple[int, int]:
+    """Valida e insere um bloco numa única transação. Retorna (inseridas, rejeitadas)."""
+    invalid = _invalid_dates([t.get('date') for t in chunk])
+    rows = []
+    for t in chunk:
+        transaction_type = (t.get('type') or '').lower()
+        if t.get('date') in invalid or transaction_type not in VALID_TRANSACTION_TYPES or not t.get('category'):
+            continue
+        try:
+            amount = float(t['amount'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not math.isfinite(amount):
+            continue
+        rows.append((transaction_type, to_cents(amount), _normalize_category(t['category']), (t.get('description') or '').strip(), t['date']))
+    with conn:  # Commit ao final do bloco ou rollback se falhar
+        conn.executemany('''
+        INSERT INTO transactions (type, amount_cents, category, description, date)
+        VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+    return len(rows), len(chunk) - len(rows)
+
+def bulk_add_transactions(transactions, chunk_size: int = BULK_CHUNK_SIZE, on_chunk=None) -> dict:
+    """
+    Insere em massa transações vindas de qualquer iterável (lista, gerador, leitor de arquivo)
+    de dicts com as chaves type, amount, category, description e date (YYYY-MM-DD).
+    O iterável é consumido em blocos de chunk_size linhas, cada bloco com executemany numa
+    única transação. Linhas inválidas são rejeitadas; um bloco que falha no banco é desfeito
+    sem afetar os blocos anteriores, já gravados.
+    on_chunk(stats), se fornecido, é chamado após cada bloco com os totais acumulados.
+    Retorna {"inserted": n, "rejected": n, "failed_chunks": n, "failed_rows": n}.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    query = "SELECT id, type, amount, category, description, date FROM transactions"
+    stats = {"inserted": 0, "rejected": 0, "failed_chunks": 0, "failed_rows": 0}
+    iterator = iter(transactions)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            break
+        try:
+            inserted, rejected = _insert_chunk(conn, chunk)
+            stats["inserted"] += inserted
+            stats["rejected"] += rejected
+        except sqlite3.Error as e:
+            print(f"DB: Erro ao inserir bloco de {len(chunk)} transações (desfeito): {e}")
+            stats["failed_chunks"] += 1
+            stats["failed_rows"] += len(chunk)
+        if on_chunk:
+            on_chunk(stats)
+    return stats
+
+ITER_BATCH_SIZE = 1000  # Linhas por consulta em iter_transactions
+
+def get_transactions(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None, limit: int = None, after: tuple[str, int] = None) -> list[Transaction]:
+    """
+    Lista as transações filtradas (mais recentes primeiro). Para percorrer históricos
+    grandes sem montar a lista inteira, use iter_transactions.
+    """
+    rows = iter_transactions(start_date, end_date, category, transaction_type, after=after,
+                             batch_size=min(limit, ITER_BATCH_SIZE) if limit else ITER_BATCH_SIZE)
+    return list(islice(rows, limit))
+
+def iter_transactions(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None, batch_size: int = ITER_BATCH_SIZE, after: tuple[str, int] = None):
+    """
+    Gera as transações filtradas, mais recentes primeiro, com paginação por chave (keyset)
+    em (date, id): cada lote de batch_size linhas é uma consulta curta que continua depois
+    da última linha do lote anterior, usando o índice (date, id). Nenhum cursor fica aberto
+    entre os lotes, então a memória não cresce com o tamanho da tabela.
+    after=(date, id) retoma a listagem logo após essa transação.
+    """
+    db_path = get_tenant_database_path(current_tenant.get())  # O inquilino fica fixo entre os lotes
+    where, params = _build_filters(start_date, end_date, category, transaction_type)
+    keyset = " AND (date, id) < (?, ?)" if where else " WHERE (date, id) < (?, ?)"
+    first_query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions{where} ORDER BY date DESC, id DESC LIMIT ?"
+    next_query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions{where}{keyset} ORDER BY date DESC, id DESC LIMIT ?"
+    while True:
+        cursor = _get_connection(db_path).cursor()
+        cursor.row_factory = transaction_row_factory
+        try:
+            if after is None:
+                rows = cursor.execute(first_query, params + [batch_size]).fetchall()
+            else:
+                rows = cursor.execute(next_query, params + [after[0], after[1], batch_size]).fetchall()
+        except sqlite3.Error as e:
+            print(f"Erro ao buscar transações: {e}")
+            return
+        finally:
+            cursor.close()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last = rows[-1]
+        after = (last.date, last.id)
+
+def get_largest_transactions(start_date: str = None, end_date: str = None, transaction_type: str = None, limit: int = 10) -> list[Transaction]:
+    """As `limit` transações de maior valor do período (ordenadas pelo valor, decrescente)."""
+    where, params = _build_filters(start_date, end_date, None, transaction_type)
+    query = f"SELECT {TRANSACTION_COLUMNS} FROM transactions{where} ORDER BY amount_cents DESC, id DESC LIMIT ?"
+    try:
+        return [Transaction.from_row(row) for row in get_db_connection().execute(query, params + [limit]).fetchall()]
+    except sqlite3.Error as e:
+        print(f"Erro ao buscar maiores transações: {e}")
+        return []
+
+def get_outlier_transactions(start_date: str = None, end_date: str = None, factor: float = 3.0, min_count: int = 3, limit: int = 10) -> list[tuple[Transaction, float]]:
+    """
+    Transações com valor >= factor vezes a média da sua categoria (e tipo) no período,
+    só em categorias com pelo menos min_count transações. A média vem de uma função de
+    janela no próprio SQLite. Retorna pares (transação, média da categoria em reais).
+    """
+    where, params = _build_filters(start_date, end_date)
+    query = f"""
+        SELECT {TRANSACTION_COLUMNS}, avg_cents / 100.0 AS category_average FROM (
+            SELECT *, AVG(amount_cents) OVER w AS avg_cents, COUNT(*) OVER w AS category_count
+            FROM transactions{where}
+            WINDOW w AS (PARTITION BY type, category)
+        )
+        WHERE category_count >= ? AND amount_cents >= ? * avg_cents
+        ORDER BY amount_cents / avg_cents DESC, id DESC
+        LIMIT ?
+    """
+    try:
+        return [(Transaction.from_row(row[:-1]), row[-1]) for row in get_db_connection().execute(query, params + [min_count, factor, limit]).fetchall()]
+    except sqlite3.Error as e:
+        print(f"Erro ao buscar transações fora do padrão: {e}")
+        return []
+
+# Expressões SQL aceitas em aggregate_transactions(group_by=...), pelo nome da coluna devolvida
+AGGREGATE_GROUPS = {
+    "type": "type",
+    "category": "category",
+    "day": "date",
+    "month": "substr(date, 1, 7)",  # YYYY-MM
+    "is_investment": "(category = 'investimentos')",  # 1 para investimentos, 0 para o resto
+}
+# Agrupamentos que podem ser respondidos pela tabela monthly_rollups (sem granularidade diária)
+ROLLUP_GROUPS = {
+    "type": "type",
+    "category": "category",
+    "month": "month",
+    "is_investment": "(category = 'investimentos')",
+}
+
+def _is_month_start(date_str: str) -> bool:
+    return date_str.endswith("-01")
+
+def _is_month_end(date_str: str) -> bool:
+    try:
+        day = datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return False
+    return day.day == calendar.monthrange(day.year, day.month)[1]
+
+def _can_use_rollups(group_by, start_date: str = None, end_date: str = None) -> bool:
+    """Os totais mensais servem quando o agrupamento não é diário e o período cobre meses inteiros."""
+    return (all(g in ROLLUP_GROUPS for g in group_by)
+            and (not start_date or _is_month_start(start_date))
+            and (not end_date or _is_month_end(end_date)))
+
+def _build_rollup_filters(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None) -> tuple[str, list]:
+    """Equivalente a _build_filters para monthly_rollups, com o período convertido em meses."""
     conditions = []
     params = []
-
     if start_date:
-        conditions.append("date >= ?")
-        params.append(start_date)
+        conditions.append("month >= ?")
+        params.append(start_date[:7])
     if end_date:
-        conditions.append("date <= ?")
-        params.append(end_date)
+        conditions.append("month <= ?")
+        params.append(end_date[:7])
     if category:
-        conditions.append("LOWER(category) = LOWER(?)")
-        params.append(category)
+        conditions.append("category = ?")
+        params.append(_normalize_category(category))
     if transaction_type:
         conditions.append("type = ?")
         params.append(transaction_type)
-        
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY date DESC, id DESC"
-    if limit:
-        query += f" LIMIT {limit}"
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+def aggregate_transactions(group_by=(), start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None) -> list[dict]:
+    """
+    Soma (em centavos, dentro do SQLite) e conta as transações filtradas numa única consulta
+    GROUP BY. group_by é um nome ou uma sequência de nomes de AGGREGATE_GROUPS, por exemplo
+    ("month", "type"). Cada item do resultado traz as chaves do agrupamento mais
+    "total" (reais), "total_cents" e "count". Sem agrupamento, retorna um único item.
+    Quando o período cobre meses inteiros e não há agrupamento diário, lê monthly_rollups
+    (O(meses)) em vez de transactions (O(transações)).
+    """
+    if isinstance(group_by, str):
+        group_by = (group_by,)
+    unknown = [g for g in group_by if g not in AGGREGATE_GROUPS]
+    if unknown:
+        raise ValueError(f"Agrupamento desconhecido: {unknown}. Use {list(AGGREGATE_GROUPS)}.")
 
+    conn = get_db_connection()
+    if _can_use_rollups(group_by, start_date, end_date):
+        where, params = _build_rollup_filters(start_date, end_date, category, transaction_type)
+        group_columns = [f"{ROLLUP_GROUPS[g]} AS {g}" for g in group_by]
+        aggregates = ['COALESCE(SUM(total_cents), 0) AS total_cents', 'COALESCE(SUM(count), 0) AS count']
+        table = "monthly_rollups"
+    else:
+        where, params = _build_filters(start_date, end_date, category, transaction_type)
+        group_columns = [f"{AGGREGATE_GROUPS[g]} AS {g}" for g in group_by]
+        aggregates = ['COALESCE(SUM(amount_cents), 0) AS total_cents', 'COUNT(*) AS count']
+        table = "transactions"
+    query = f"SELECT {', '.join(group_columns + aggregates)} FROM {table}{where}"
+    if group_by:
+        group_list = ", ".join(group_by)
+        query += f" GROUP BY {group_list} ORDER BY {group_list}"
     try:
-        cursor.execute(query, params)
-        transactions = [dict(row) for row in cursor.fetchall()]
-        return transactions
+        rows = conn.execute(query, params).fetchall()
     except sqlite3.Error as e:
-        print(f"Erro ao buscar transações: {e}")
+        print(f"Erro ao agregar transações: {e}")
         return []
+    results = []
+    for row in rows:
+        item = dict(row)
+        item["total"] = from_cents(item["total_cents"])
+        results.append(item)
+    return results
+
+def sum_transactions(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None) -> dict:
+    """
+    Soma e conta as transações filtradas dentro do SQLite (SUM sobre centavos inteiros),
+    sem trazer as linhas para o Python. Retorna {"total": float, "total_cents": int, "count": int}.
+    """
+    rows = aggregate_transactions((), start_date, end_date, category, transaction_type)
+    if not rows:
+        return {"total": 0.0, "total_cents": 0, "count": 0}
+    return rows[0]
+
+def get_summary_totals(start_date: str = None, end_date: str = None) -> dict:
+    """
+    Calcula numa única consulta os totais de ganhos (entradas), gastos (saídas fora de
+    'investimentos') e investimentos do período, em reais, e o saldo (ganhos - todas as saídas).
+    """
+    income_cents = expenses_cents = investments_cents = 0
+    for row in aggregate_transactions(("type", "is_investment"), start_date, end_date):
+        if row["type"] == "entrada":
+            income_cents += row["total_cents"]
+        elif row["is_investment"]:
+            investments_cents += row["total_cents"]
+        else:
+            expenses_cents += row["total_cents"]
+    return {
+        "income": from_cents(income_cents),
+        "expenses": from_cents(expenses_cents),
+        "investments": from_cents(investments_cents),
+        "balance": from_cents(income_cents - expenses_cents - investments_cents),
+    }
+
+# --- Leitura colunar (NumPy) para análises ---
+COLUMNAR_BATCH_SIZE = 50_000  # Linhas por fetchmany em _read_columns
+_EPOCH_DAYS_SQL = "CAST(julianday(date) - 2440587.5 AS INTEGER)"  # Dias desde 1970-01-01 (datetime64[D])
+_numpy = None
+
+def _get_numpy():
+    global _numpy
+    if _numpy is None:
+        import numpy
+        _numpy = numpy
+    return _numpy
+
+def _read_columns(query: str, params: list, encoded=(), date_columns=(), batch_size: int = COLUMNAR_BATCH_SIZE) -> dict:
+    """
+    Lê o resultado da consulta direto para colunas NumPy, em lotes de batch_size. Colunas
+    numéricas viram int64; as de date_columns (dias desde 1970, ver _EPOCH_DAYS_SQL) viram
+    datetime64[D]; as de encoded (textos repetidos, como tipo e categoria) viram códigos
+    int32, com os valores distintos em "<coluna>_labels" (codificação por dicionário, como
+    no Arrow). As tuplas de cada lote são descartadas assim que convertidas.
+    """
+    np = _get_numpy()
+    cursor = get_db_connection().cursor()
+    cursor.row_factory = None  # Tuplas simples: mais rápidas que sqlite3.Row
+    try:
+        cursor.execute(query, params)
+        names = [description[0] for description in cursor.description]
+        lookups = {name: {} for name in encoded}
+        chunks = {name: [] for name in names}
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for name, values in zip(names, zip(*rows)):
+                if name in lookups:
+                    lookup = lookups[name]
+                    chunks[name].append(np.fromiter((lookup.setdefault(v, len(lookup)) for v in values), dtype=np.int32, count=len(rows)))
+                else:
+                    chunks[name].append(np.fromiter(values, dtype=np.int64, count=len(rows)))
+    except sqlite3.Error as e:
+        print(f"Erro na leitura colunar: {e}")
+        return {}
     finally:
-        conn.close()
+        cursor.close()
+    columns = {}
+    for name in names:
+        parts = chunks.pop(name)
+        column = np.concatenate(parts) if parts else np.empty(0, dtype=np.int32 if name in lookups else np.int64)
+        columns[name] = column.view("datetime64[D]") if name in date_columns else column
+        if name in lookups:
+            columns[f"{name}_labels"] = list(lookups[name])
+    return columns
 
-def delete_transaction_by_id(transaction_id: int) -> bool:
+def get_daily_total_columns(start_date: str = None, end_date: str = None, category: str = None, transaction_type: str = None) -> dict:
+    """
+    Totais por dia, tipo e categoria (agregados no SQLite) como colunas NumPy: date
+    (datetime64[D]), type/category (códigos + labels), amount_cents e count (int64).
+    """
+    where, params = _build_filters(start_date, end_date, category, transaction_type)
+    query = (f"SELECT {_EPOCH_DAYS_SQL} AS date, type, category, SUM(amount_cents) AS amount_cents, COUNT(*) AS count "
+             f"FROM transactions{where} GROUP BY transactions.date, type, category ORDER BY transactions.date, type, category")
+    return _read_columns(query, params, encoded=("type", "category"), date_columns=("date",))
+
+def get_write_generation(start_date: str = None, end_date: str = None) -> int | None:
+    """
+    Retorna um número que muda sempre que uma escrita toca o período (ou o banco todo,
+    sem período). Serve como chave de cache: se não mudou, os dados do período também não.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+        if not start_date and not end_date:
+            row = conn.execute("SELECT generation FROM write_generations WHERE scope = '*'").fetchone()
+        else:
+            # Os contadores só crescem, então a soma dos meses do período muda a cada escrita neles
+            where, params = ["scope != '*'"], []
+            if start_date:
+                where.append("scope >= ?")
+                params.append(start_date[:7])
+            if end_date:
+                where.append("scope <= ?")
+                params.append(end_date[:7])
+            row = conn.execute(f"SELECT SUM(generation) FROM write_generations WHERE {' AND '.join(where)}", params).fetchone()
+    except sqlite3.Error as e:
+        print(f"Erro ao ler o contador de escritas: {e}")
+        return None  # Desconhecido: quem usa como chave de cache não deve reutilizar resultados
+    return row[0] if row and row[0] is not None else 0
+
+def rebuild_monthly_rollups() -> int:
+    """
+    Recalcula monthly_rollups a partir de transactions, numa única transação, para corrigir
+    qualquer divergência. Retorna o número de linhas de totais gravadas.
+    """
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM monthly_rollups")
+            cursor = conn.execute('''
+            INSERT INTO monthly_rollups (month, type, category, total_cents, count)
+            SELECT substr(date, 1, 7), type, category, SUM(amount_cents), COUNT(*)
+            FROM transactions GROUP BY substr(date, 1, 7), type, category
+            ''')
+        print(f"DB: Totais mensais recalculados ({cursor.rowcount} linhas).")
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"DB: Erro ao recalcular totais mensais: {e}")
+        return 0
+
+# Limites do cache de relatórios; acima deles, as entradas usadas há mais tempo saem primeiro
+REPORT_CACHE_MAX_ENTRIES = 200
+REPORT_CACHE_MAX_BYTES = 4 * 1024 * 1024
+
+def get_period_fingerprint(start_date: str = None, end_date: str = None) -> str | None:
+    """
+    Impressão digital das transações do período (quantidade, soma em centavos, menor/maior
+    id e soma dos ids), calculada pelo índice de data. Muda quando o conteúdo do período muda.
+    """
+    where, params = _build_filters(start_date, end_date)
+    try:
+        row = get_db_connection().execute(
+            f"SELECT COUNT(*), COALESCE(SUM(amount_cents), 0), MIN(id), MAX(id), COALESCE(SUM(id), 0) FROM transactions{where}",
+            params).fetchone()
+    except sqlite3.Error as e:
+        print(f"Erro ao calcular a impressão digital do período: {e}")
+        return None
+    return ":".join(str(value) for value in row)
+
+# Acertos do cache ainda não gravados: {caminho do banco: {(início, fim, variante): [último uso, acertos]}}.
+# Uma leitura do cache não escreve no banco; os acertos vão junto com a próxima gravação (store_cached_report).
+_report_cache_hits = {}
+_report_cache_hits_lock = threading.Lock()
+
+def get_cached_report(start_date: str, end_date: str, variant: str, fingerprint: str) -> str | None:
+    """Relatório em cache para o período/variante, se a impressão digital ainda confere."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT fingerprint, report_text FROM report_cache WHERE start_date = ? AND end_date = ? AND variant = ?",
+            (start_date, end_date, variant)).fetchone()
+        if row is None:
+            return None
+        if row["fingerprint"] != fingerprint: # Escrita que escapou dos triggers: entrada velha
+            with conn:
+                conn.execute("DELETE FROM report_cache WHERE start_date = ? AND end_date = ? AND variant = ?",
+                             (start_date, end_date, variant))
+            return None
+    except sqlite3.Error as e:
+        print(f"Erro ao ler o cache de relatórios: {e}")
+        return None
+    with _report_cache_hits_lock:
+        hits = _report_cache_hits.setdefault(get_tenant_database_path(current_tenant.get()), {})
+        entry = hits.setdefault((start_date, end_date, variant), [0.0, 0])
+        entry[0] = time.time()
+        entry[1] += 1
+    return row["report_text"]
+
+def _flush_report_cache_hits(conn: sqlite3.Connection):
+    """Grava os acertos acumulados do banco atual (last_used_at e hits). Chamar dentro de uma transação."""
+    with _report_cache_hits_lock:
+        hits = _report_cache_hits.pop(get_tenant_database_path(current_tenant.get()), {})
+    conn.executemany("UPDATE report_cache SET last_used_at = MAX(last_used_at, ?), hits = hits + ? WHERE start_date = ? AND end_date = ? AND variant = ?",
+                     [(last_used, count, *key) for key, (last_used, count) in hits.items()])
+
+def store_cached_report(start_date: str, end_date: str, variant: str, fingerprint: str, report_text: str):
+    """Grava o relatório no cache e despeja as entradas menos usadas além dos limites de tamanho."""
+    conn = get_db_connection()
+    now = time.time()
+    try:
+        with conn:
+            _flush_report_cache_hits(conn) # A ordem de despejo considera os acertos desde a última gravação
+            conn.execute('''
+            INSERT OR REPLACE INTO report_cache (start_date, end_date, variant, fingerprint, report_text, size_bytes, created_at, last_used_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (start_date, end_date, variant, fingerprint, report_text, len(report_text.encode("utf-8")), now, now))
+            # Mantém as entradas mais recentes enquanto couberem nos dois limites
+            conn.execute('''
+            DELETE FROM report_cache WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER w AS position, SUM(size_bytes) OVER w AS running_bytes
+                    FROM report_cache
+                    WINDOW w AS (ORDER BY last_used_at DESC, rowid DESC)
+                ) WHERE position > ? OR running_bytes > ?
+            )
+            ''', (REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_MAX_BYTES))
+    except sqlite3.Error as e:
+        print(f"Erro ao gravar o cache de relatórios: {e}")
+
+def clear_report_cache() -> int:
+    """Esvazia o cache de relatórios. Retorna quantas entradas foram removidas."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM report_cache").rowcount
+    except sqlite3.Error as e:
+        print(f"Erro ao limpar o cache de relatórios: {e}")
+        return 0
+
+# Estados de uma tarefa da fila (tabela jobs). A fila fica sempre no banco principal, compartilhada
+# por todos os inquilinos; cada tarefa guarda o inquilino em tenant_id.
+JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED = "pendente", "executando", "concluído", "falhou"
+
+def _job_from_row(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+def enqueue_job(kind: str, payload: dict, owner: str = None, max_attempts: int = 3, tenant_id: str = None) -> int | None:
+    """Adiciona uma tarefa à fila persistente. Retorna o id da tarefa (ou None em caso de erro)."""
+    conn = _get_main_connection()
+    now = time.time()
+    try:
+        with conn:
+            cursor = conn.execute('''
+            INSERT INTO jobs (kind, payload, owner, tenant_id, status, max_attempts, created_at, available_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (kind, json.dumps(payload, ensure_ascii=False), owner, tenant_id, JOB_PENDING, max_attempts, now, now))
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        print(f"Erro ao enfileirar tarefa: {e}")
+        return None
+
+def claim_next_job(lease_seconds: float) -> dict | None:
+    """
+    Reserva a próxima tarefa disponível (pendente e fora do atraso de nova tentativa, ou
+    executando com o prazo vencido, de um processo que morreu). BEGIN IMMEDIATE garante
+    que dois workers, mesmo em processos diferentes, não peguem a mesma tarefa. Tarefas
+    com o prazo vencido que já esgotaram max_attempts passam a 'falhou' em vez de voltar.
+    """
+    conn = _get_main_connection()
+    now = time.time()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute('''
+        UPDATE jobs SET status = ?, error = 'Prazo da tarefa vencido após ' || attempts || ' tentativa(s).',
+               finished_at = ?, lease_expires_at = NULL
+        WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts
+        ''', (JOB_FAILED, now, JOB_RUNNING, now))
+        row = conn.execute('''
+        SELECT id FROM jobs
+        WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ? AND attempts < max_attempts)
+        ORDER BY available_at, id LIMIT 1
+        ''', (JOB_PENDING, now, JOB_RUNNING, now)).fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        conn.execute('''
+        UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, finished_at = NULL, lease_expires_at = ?
+        WHERE id = ?
+        ''', (JOB_RUNNING, now, now + lease_seconds, row["id"]))
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
         conn.commit()
-        return cursor.rowcount > 0
+        return _job_from_row(job)
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"Erro ao reservar tarefa: {e}")
+        return None
+
+def complete_job(job_id: int, result: str):
+    conn = _get_main_connection()
+    try:
+        with conn:
+            conn.execute("UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_expires_at = NULL WHERE id = ?",
+                         (JOB_DONE, result, time.time(), job_id))
+    except sqlite3.Error as e:
+        print(f"Erro ao concluir tarefa {job_id}: {e}")
+
+def fail_job(job_id: int, error: str, retry_delay: float | None):
+    """Registra a falha da tentativa: volta para a fila após retry_delay segundos ou, se None, falha de vez."""
+    conn = _get_main_connection()
+    now = time.time()
+    try:
+        with conn:
+            if retry_delay is None:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL WHERE id = ?",
+                             (JOB_FAILED, error, now, job_id))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, available_at = ?, lease_expires_at = NULL WHERE id = ?",
+                             (JOB_PENDING, error, now, now + retry_delay, job_id))
+    except sqlite3.Error as e:
+        print(f"Erro ao registrar falha da tarefa {job_id}: {e}")
+
+def get_job(job_id: int) -> dict | None:
+    try:
+        row = _get_main_connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Erro ao buscar tarefa {job_id}: {e}")
+        return None
+    return _job_from_row(row) if row else None
+
+def get_jobs(owner: str = None, statuses=None, limit: int = 50) -> list[dict]:
+    """Tarefas mais recentes primeiro, opcionalmente de um dono (sessão) e em certos estados."""
+    conditions, params = [], []
+    if owner is not None:
+        conditions.append("owner = ?")
+        params.append(owner)
+    if statuses:
+        conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    try:
+        rows = _get_main_connection().execute(f"SELECT * FROM jobs{where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+    except sqlite3.Error as e:
+        print(f"Erro ao listar tarefas: {e}")
+        return []
+    return [_job_from_row(row) for row in rows]
+
+def get_job_stats() -> dict:
+    """Quantidade de tarefas por estado e tempos médios/máximos de espera na fila e de execução."""
+    conn = _get_main_connection()
+    try:
+        by_status = {row["status"]: row["count"] for row in conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")}
+        timing = conn.execute('''
+        SELECT AVG(started_at - created_at) AS avg_queue_seconds, MAX(started_at - created_at) AS max_queue_seconds,
+               AVG(finished_at - started_at) AS avg_run_seconds, MAX(finished_at - started_at) AS max_run_seconds,
+               COALESCE(SUM(attempts - 1), 0) AS retries
+        FROM jobs WHERE status = ?
+        ''', (JOB_DONE,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Erro ao calcular métricas das tarefas: {e}")
+        return {}
+    return {"by_status": by_status, **dict(timing)}
+
+def queue_delete_transaction(transaction_id: int) -> Future:
+    """Enfileira a exclusão; o Future resolve para o número de linhas excluídas (0 ou 1)."""
+    return _execute_write("DELETE FROM transactions WHERE id = ?", (transaction_id,))
+
+def delete_transaction_by_id(transaction_id: int) -> bool:
+    try:
+        return queue_delete_transaction(transaction_id).result() > 0
     except sqlite3.Error as e:
         print(f"Erro ao excluir transação ID {transaction_id}: {e}")
         return False
-    finally:
-        conn.close()
 
 def get_last_transaction_id(transaction_type: str = None, category: str = None) -> int | None:
     conn = get_db_connection()
     cursor = conn.cursor()
-    query = "SELECT id FROM transactions"
-    conditions = []
-    params = []
-    if transaction_type:
-        conditions.append("type = ?")
-        params.append(transaction_type)
-    if category:
-        conditions.append("LOWER(category) = LOWER(?)")
-        params.append(category)
-    
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-        
-    query += " ORDER BY date DESC, id DESC LIMIT 1" # Mais recente por data, depois por ID
+    where, params = _build_filters(category=category, transaction_type=transaction_type)
+    query = f"SELECT id FROM transactions{where} ORDER BY date DESC, id DESC LIMIT 1" # Mais recente por data, depois por ID
     try:
         cursor.execute(query, params)
         row = cursor.fetchone()
@@ -120,8 +1012,6 @@ def get_last_transaction_id(transaction_type: str = None, category: str = None)
     except sqlite3.Error as e:
         print(f"Erro ao buscar último ID: {e}")
         return None
-    finally:
-        conn.close()
 
 def delete_transactions_by_criteria(
     delete_all_flag: bool = False, # Renomeado para evitar conflito com keyword 'all'
@@ -135,8 +1025,6 @@ def delete_transactions_by_criteria(
         print("Nenhum critério de exclusão válido fornecido.")
         return 0
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
     query = "DELETE FROM transactions"
     conditions = []
     params = []
@@ -148,8 +1036,8 @@ def delete_transactions_by_criteria(
             conditions.append("type = ?")
             params.append(transaction_type)
         if category:
-            conditions.append("LOWER(category) = LOWER(?)")
-            params.append(category)
+            conditions.append("category = ?")
+            params.append(_normalize_category(category))
         if date_str:
             conditions.append("date = ?")
             params.append(date_str)
@@ -170,37 +1058,35 @@ def delete_transactions_by_criteria(
     
     try:
         print(f"DB: Executando exclusão: {query} com params {params}")
-        cursor.execute(query, params)
-        conn.commit()
-        deleted_rows = cursor.rowcount
+        deleted_rows = _execute_write(query, params).result()
         print(f"DB: {deleted_rows} transações excluídas.")
         return deleted_rows
     except sqlite3.Error as e:
         print(f"DB: Erro ao excluir transações por critério: {e}")
         return 0
-    finally:
-        conn.close()
 
-def update_transaction(
-    transaction_id: int, 
-    new_amount: float = None, 
-    new_category: str = None, 
-    new_description: str = None, 
+def queue_update_transaction(
+    transaction_id: int,
+    new_amount: float = None,
+    new_category: str = None,
+    new_description: str = None,
     new_date_str: str = None,
     new_type: str = None
-) -> bool:
+) -> Future | None:
+    """
+    Enfileira a atualização dos campos fornecidos (os inválidos são ignorados). O Future
+    resolve para o número de linhas atualizadas; retorna None se não houver o que atualizar.
+    """
     if not any([new_amount is not None, new_category, new_description is not None, new_date_str, new_type]):
         print("Nenhum campo fornecido para atualização.")
-        return False
+        return None
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
     fields_to_update = []
     params_update = []
 
     if new_amount is not None:
-        fields_to_update.append("amount = ?")
-        params_update.append(float(new_amount))
+        fields_to_update.append("amount_cents = ?")
+        params_update.append(to_cents(new_amount))
     if new_category:
         fields_to_update.append("category = ?")
         params_update.append(new_category.lower().strip())
@@ -220,19 +1106,48 @@ def update_transaction(
     
     if not fields_to_update:
         print("Nenhum campo válido para atualização.")
-        conn.close()
-        return False
+        return None
 
     params_update.append(transaction_id)
     query = f"UPDATE transactions SET {', '.join(fields_to_update)} WHERE id = ?"
-    
+    print(f"DB: Executando atualização: {query} com params {params_update}")
+    return _execute_write(query, params_update)
+
+def update_transaction(
+    transaction_id: int, 
+    new_amount: float = None, 
+    new_category: str = None, 
+    new_description: str = None, 
+    new_date_str: str = None,
+    new_type: str = None
+) -> bool:
+    future = queue_update_transaction(transaction_id, new_amount, new_category, new_description, new_date_str, new_type)
+    if future is None:
+        return False
     try:
-        print(f"DB: Executando atualização: {query} com params {params_update}")
-        cursor.execute(query, params_update)
-        conn.commit()
-        return cursor.rowcount > 0
+        return future.result() > 0
     except sqlite3.Error as e:
         print(f"DB: Erro ao atualizar transação ID {transaction_id}: {e}")
         return False
-    finally:
-        conn.close()
\ No newline at end of file
+
+
+# Latência por função pública (financebot_db_call_seconds{function=...}) quando as métricas
+# estão ligadas. Ficam de fora os utilitários que não fazem consulta.
+metrics.instrument_module(globals(), "financebot_db_call_seconds", exclude=(
+    "get_db_connection", "close_db_connections", "get_tenant_database_path", "tenant_scope", "to_cents", "from_cents",
+    "get_write_batcher",
+))
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Inicializa ou migra o banco de dados do FinanceBot.")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recalcula a tabela monthly_rollups a partir das transações.")
+    parser.add_argument("--clear-report-cache", action="store_true", help="Apaga os relatórios gerados guardados em cache.")
+    parser.add_argument("--tenant", help="Aplica as opções acima ao shard deste inquilino (criado se não existir).")
+    args = parser.parse_args()
+    init_db()
+    with tenant_scope(args.tenant):
+        if args.rebuild_rollups:
+            rebuild_monthly_rollups()
+        if args.clear_report_cache:
+            print(f"DB: {clear_report_cache()} relatórios removidos do cache.")
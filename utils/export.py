@@ -0,0 +1,60 @@
+"""
+Exportação das transações para CSV.
+
+As linhas vêm de iter_transactions (paginação por chave, em lotes) e são escritas
+no arquivo à medida que chegam, então a memória usada não cresce com o tamanho do
+histórico. Uso:
+
+    python -m utils.export transacoes.csv
+    python -m utils.export gastos_2024.csv --start 2024-01-01 --end 2024-12-31 --type saída
+"""
+import argparse
+import csv
+import sys
+import time
+
+from utils.db import ITER_BATCH_SIZE, init_db, iter_transactions, tenant_scope
+
+EXPORT_COLUMNS = ("id", "date", "type", "amount", "category", "description")
+
+
+def export_transactions_csv(path: str, start_date: str = None, end_date: str = None, category: str = None,
+                            transaction_type: str = None, batch_size: int = ITER_BATCH_SIZE, encoding: str = "utf-8") -> dict:
+    """Escreve as transações filtradas (mais recentes primeiro) em path. Retorna {'exported', 'elapsed_seconds'}."""
+    started = time.perf_counter()
+    exported = 0
+    rows = iter_transactions(start_date, end_date, category, transaction_type, batch_size=batch_size)
+    with open(path, "w", newline="", encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow((row.id, row.date, row.type, f"{row.amount:.2f}", row.category, row.description or ""))
+            exported += 1
+    return {"exported": exported, "elapsed_seconds": time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta as transações do FinanceBot para CSV.")
+    parser.add_argument("path", help="Arquivo CSV de saída.")
+    parser.add_argument("--start", help="Data inicial (YYYY-MM-DD).")
+    parser.add_argument("--end", help="Data final (YYYY-MM-DD).")
+    parser.add_argument("--category", help="Exporta só esta categoria.")
+    parser.add_argument("--type", choices=("entrada", "saída"), help="Exporta só entradas ou saídas.")
+    parser.add_argument("--batch-size", type=int, default=ITER_BATCH_SIZE, help="Linhas lidas do banco por consulta.")
+    parser.add_argument("--encoding", default="utf-8", help="Codificação do arquivo (padrão: utf-8).")
+    parser.add_argument("--tenant", help="Exporta as transações deste inquilino.")
+    args = parser.parse_args(argv)
+
+    init_db()
+    try:
+        with tenant_scope(args.tenant):
+            stats = export_transactions_csv(args.path, args.start, args.end, args.category, args.type, args.batch_size, args.encoding)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao exportar para '{args.path}': {e}")
+        return 1
+    print(f"'{args.path}': {stats['exported']} transações exportadas em {stats['elapsed_seconds']:.2f}s.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
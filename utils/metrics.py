@@ -0,0 +1,284 @@
+"""
+Métricas de desempenho: contadores e histogramas de latência, em memória, para as
+funções do banco, as ferramentas do chat, as chamadas ao Gemini e o parsing de datas.
+
+Desligadas por padrão (FINANCEBOT_METRICS=1 liga). Desligadas, cada função instrumentada
+paga só a checagem de uma flag. Os valores podem ser lidos em formato Prometheus
+(render_prometheus) ou JSON (dump_json), ou servidos por HTTP em /metrics e /metrics.json
+com FINANCEBOT_METRICS_PORT (veja start_metrics_server).
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.getenv("FINANCEBOT_METRICS", "0") == "1"
+METRICS_PORT = int(os.getenv("FINANCEBOT_METRICS_PORT", "0") or 0)
+
+# Limites superiores (segundos) dos buckets dos histogramas de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_HELP = {
+    "financebot_db_call_seconds": "Latência das funções de utils.db.",
+    "financebot_db_call_errors_total": "Exceções levantadas pelas funções de utils.db.",
+    "financebot_tool_call_seconds": "Latência das ferramentas do chat (AVAILABLE_TOOL_FUNCTIONS).",
+    "financebot_tool_call_errors_total": "Exceções levantadas pelas ferramentas do chat.",
+    "financebot_gemini_request_seconds": "Latência de cada ida e volta ao Gemini.",
+    "financebot_gemini_request_errors_total": "Chamadas ao Gemini que falharam.",
+    "financebot_date_parse_seconds": "Latência do parsing de datas e períodos.",
+    "financebot_date_parse_errors_total": "Exceções no parsing de datas e períodos.",
+}
+
+
+class Histogram:
+    """Histograma cumulativo (como no Prometheus): contagem por bucket, soma e total."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # O último é +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)  # Primeiro bucket com limite >= value
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+_histograms: dict[tuple[str, tuple], Histogram] = {}
+_counters: dict[tuple[str, tuple], float] = {}
+_registry_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return METRICS_ENABLED
+
+
+def set_enabled(value: bool):
+    """Liga ou desliga a coleta em tempo de execução (ex.: em benchmarks)."""
+    global METRICS_ENABLED
+    METRICS_ENABLED = value
+
+
+def reset():
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def observe(name: str, value: float, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _registry_lock:
+            histogram = _histograms.setdefault(key, Histogram())
+    histogram.observe(value)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _registry_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Mede o bloco no histograma name; exceções contam em <name sem _seconds>_errors_total."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except GeneratorExit:  # Gerador fechado antes do fim pelo consumidor: não é erro
+        raise
+    except BaseException:
+        inc(_errors_name(name), **labels)
+        raise
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def _errors_name(name: str) -> str:
+    return name.removesuffix("_seconds") + "_errors_total"
+
+
+def timed(name: str, **labels):
+    """
+    Decorator que mede cada chamada no histograma name (e erros no contador
+    correspondente). Em funções geradoras, mede do início ao fim da iteração.
+    """
+    errors_name = _errors_name(name)
+
+    def decorator(function):
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                if not METRICS_ENABLED:
+                    return (yield from function(*args, **kwargs))
+                started = time.perf_counter()
+                try:
+                    return (yield from function(*args, **kwargs))
+                except GeneratorExit:
+                    raise
+                except BaseException:
+                    inc(errors_name, **labels)
+                    raise
+                finally:
+                    observe(name, time.perf_counter() - started, **labels)
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except BaseException:
+                inc(errors_name, **labels)
+                raise
+            finally:
+                observe(name, time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+def instrument_module(namespace: dict, name: str, label: str = "function", exclude=()):
+    """
+    Envolve com timed() todas as funções públicas definidas no módulo de namespace
+    (normalmente globals()), com o nome da função no rótulo label.
+    """
+    module = namespace["__name__"]
+    for attribute, value in list(namespace.items()):
+        if (attribute.startswith("_") or attribute in exclude or not inspect.isfunction(value)
+                or value.__module__ != module):
+            continue
+        namespace[attribute] = timed(name, **{label: attribute})(value)
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    escaped = (f'{key}="{_escape_label_value(str(value))}"' for key, value in items)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_prometheus() -> str:
+    """Exposição em texto no formato do Prometheus (version 0.0.4)."""
+    with _registry_lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+    lines, described = [], set()
+
+    def describe(metric: str, kind: str):
+        if metric not in described:
+            described.add(metric)
+            lines.append(f"# HELP {metric} {_HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} {kind}")
+
+    for (metric, labels), histogram in histograms:
+        describe(metric, "histogram")
+        snapshot = histogram.snapshot()
+        for bound, count in snapshot["buckets"]:
+            lines.append(f"{metric}_bucket{_format_labels(labels, (('le', _format_bound(bound)),))} {count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {snapshot['sum']!r}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {snapshot['count']}")
+    for (metric, labels), value in counters:
+        describe(metric, "counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def dump_json() -> dict:
+    """As mesmas métricas como dict (serializável em JSON), com média e máximo estimado por série."""
+    with _registry_lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+    result = {"histograms": [], "counters": []}
+    for (metric, labels), histogram in histograms:
+        snapshot = histogram.snapshot()
+        result["histograms"].append({
+            "name": metric,
+            "labels": dict(labels),
+            "count": snapshot["count"],
+            "sum": snapshot["sum"],
+            "mean": snapshot["sum"] / snapshot["count"] if snapshot["count"] else 0.0,
+            "buckets": {_format_bound(bound): count for bound, count in snapshot["buckets"]},
+        })
+    for (metric, labels), value in counters:
+        result["counters"].append({"name": metric, "labels": dict(labels), "value": value})
+    return result
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = render_prometheus().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(dump_json(), ensure_ascii=False).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha no terminal a cada coleta
+
+
+_server: ThreadingHTTPServer | None = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "127.0.0.1") -> ThreadingHTTPServer | None:
+    """
+    Serve /metrics (Prometheus) e /metrics.json numa thread daemon. Não faz nada se as
+    métricas estiverem desligadas ou sem porta; chamadas repetidas reutilizam o servidor.
+    """
+    global _server
+    if not METRICS_ENABLED or not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+            except OSError as e:
+                print(f"Métricas: não foi possível abrir a porta {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="financebot-metrics", daemon=True).start()
+            print(f"Métricas em http://{host}:{port}/metrics")
+        return _server
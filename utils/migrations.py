@@ -0,0 +1,276 @@
+import sqlite3
+
+from utils.models import to_cents
+
+# Migrações versionadas do banco de dados. A versão aplicada fica registrada em
+# PRAGMA user_version; cada migração roda em sua própria transação, junto com a
+# atualização da versão, de modo que bancos existentes são atualizados no lugar.
+
+
+def _migration_create_transactions(conn: sqlite3.Connection):
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        amount REAL NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        date TEXT NOT NULL
+    )
+    ''')
+
+
+def _migration_normalize_category_and_indexes(conn: sqlite3.Connection):
+    # LOWER() do SQLite só trata ASCII ("Alimentação" viraria "alimentaÇÃo"),
+    # então a normalização usa str.lower() do Python, igual à escrita.
+    conn.create_function("py_normalize_category", 1, lambda c: c.lower().strip() if c else c, deterministic=True)
+    conn.execute('''
+    UPDATE transactions SET category = py_normalize_category(category)
+    WHERE category != py_normalize_category(category)
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date_id ON transactions (date, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date)")
+
+
+def _migration_amount_to_cents(conn: sqlite3.Connection):
+    # SQLite não altera o tipo de uma coluna: a tabela é recriada com amount_cents
+    # (inteiro, em centavos) no lugar de amount (REAL) e os dados são copiados.
+    # ROUND(amount * 100) arredondaria o float binário (1.005 -> 100); py_to_cents
+    # arredonda como as escritas novas (1.005 -> 101).
+    conn.create_function("py_to_cents", 1, to_cents, deterministic=True)
+    seq_row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'transactions'").fetchone()
+    conn.execute('''
+    CREATE TABLE transactions_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        amount_cents INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        description TEXT,
+        date TEXT NOT NULL
+    )
+    ''')
+    conn.execute('''
+    INSERT INTO transactions_new (id, type, amount_cents, category, description, date)
+    SELECT id, type, py_to_cents(amount), category, description, date FROM transactions
+    ''')
+    conn.execute("DROP TABLE transactions")
+    conn.execute("ALTER TABLE transactions_new RENAME TO transactions")
+    if seq_row:
+        # Preserva o contador do AUTOINCREMENT para não reutilizar IDs de transações excluídas
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'transactions'", (seq_row[0],))
+        if conn.execute("SELECT changes()").fetchone()[0] == 0:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('transactions', ?)", (seq_row[0],))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date_id ON transactions (date, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, date)")
+
+
+def _migration_monthly_rollups(conn: sqlite3.Connection):
+    # Totais por mês/tipo/categoria mantidos por triggers na mesma transação de cada
+    # escrita em transactions, para que saldos e resumos leiam O(meses) linhas.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS monthly_rollups (
+        month TEXT NOT NULL,
+        type TEXT NOT NULL,
+        category TEXT NOT NULL,
+        total_cents INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (month, type, category)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO monthly_rollups (month, type, category, total_cents, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.type, NEW.category, NEW.amount_cents, 1)
+        ON CONFLICT (month, type, category) DO UPDATE
+        SET total_cents = total_cents + excluded.total_cents, count = count + 1;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_delete AFTER DELETE ON transactions
+    BEGIN
+        UPDATE monthly_rollups SET total_cents = total_cents - OLD.amount_cents, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND type = OLD.type AND category = OLD.category;
+        DELETE FROM monthly_rollups
+        WHERE month = substr(OLD.date, 1, 7) AND type = OLD.type AND category = OLD.category AND count <= 0;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_rollup_update
+    AFTER UPDATE OF date, type, category, amount_cents ON transactions
+    BEGIN
+        UPDATE monthly_rollups SET total_cents = total_cents - OLD.amount_cents, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND type = OLD.type AND category = OLD.category;
+        DELETE FROM monthly_rollups
+        WHERE month = substr(OLD.date, 1, 7) AND type = OLD.type AND category = OLD.category AND count <= 0;
+        INSERT INTO monthly_rollups (month, type, category, total_cents, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.type, NEW.category, NEW.amount_cents, 1)
+        ON CONFLICT (month, type, category) DO UPDATE
+        SET total_cents = total_cents + excluded.total_cents, count = count + 1;
+    END
+    ''')
+    conn.execute("DELETE FROM monthly_rollups")
+    conn.execute('''
+    INSERT INTO monthly_rollups (month, type, category, total_cents, count)
+    SELECT substr(date, 1, 7), type, category, SUM(amount_cents), COUNT(*)
+    FROM transactions GROUP BY substr(date, 1, 7), type, category
+    ''')
+
+
+def _migration_write_generations(conn: sqlite3.Connection):
+    # Contadores de escrita: '*' muda a cada escrita em transactions e 'YYYY-MM' a cada
+    # escrita que toca aquele mês. Caches (ex.: do dashboard) usam esses números como chave.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS write_generations (
+        scope TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_generation_insert AFTER INSERT ON transactions
+    BEGIN
+        INSERT INTO write_generations (scope, generation) VALUES ('*', 1), (substr(NEW.date, 1, 7), 1)
+        ON CONFLICT (scope) DO UPDATE SET generation = generation + 1;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_generation_delete AFTER DELETE ON transactions
+    BEGIN
+        INSERT INTO write_generations (scope, generation) VALUES ('*', 1), (substr(OLD.date, 1, 7), 1)
+        ON CONFLICT (scope) DO UPDATE SET generation = generation + 1;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_generation_update AFTER UPDATE ON transactions
+    BEGIN
+        INSERT INTO write_generations (scope, generation)
+        VALUES ('*', 1), (substr(OLD.date, 1, 7), 1), (substr(NEW.date, 1, 7), 1)
+        ON CONFLICT (scope) DO UPDATE SET generation = generation + 1;
+    END
+    ''')
+
+
+def _migration_report_cache(conn: sqlite3.Connection):
+    # Relatórios gerados por período. Qualquer escrita cuja data caia dentro de um período
+    # em cache apaga a entrada; a impressão digital (fingerprint) das transações do período
+    # é conferida na leitura como segunda garantia.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS report_cache (
+        start_date TEXT NOT NULL,
+        end_date TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        fingerprint TEXT NOT NULL,
+        report_text TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_used_at REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (start_date, end_date, variant)
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_report_cache_last_used ON report_cache(last_used_at)")
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_report_cache_insert AFTER INSERT ON transactions
+    BEGIN
+        DELETE FROM report_cache WHERE NEW.date BETWEEN start_date AND end_date;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_report_cache_delete AFTER DELETE ON transactions
+    BEGIN
+        DELETE FROM report_cache WHERE OLD.date BETWEEN start_date AND end_date;
+    END
+    ''')
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_report_cache_update AFTER UPDATE ON transactions
+    BEGIN
+        DELETE FROM report_cache
+        WHERE OLD.date BETWEEN start_date AND end_date OR NEW.date BETWEEN start_date AND end_date;
+    END
+    ''')
+
+
+def _migration_jobs(conn: sqlite3.Connection):
+    # Fila de tarefas em segundo plano (ex.: geração de relatórios). Fica no banco para
+    # sobreviver a reinícios; lease_expires_at devolve à fila tarefas de um processo que morreu.
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        owner TEXT,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        result TEXT,
+        error TEXT,
+        created_at REAL NOT NULL,
+        available_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        lease_expires_at REAL
+    )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs (owner, id)")
+
+
+def _migration_jobs_tenant(conn: sqlite3.Connection):
+    # A fila fica no banco principal; cada tarefa roda no shard do inquilino que a pediu
+    conn.execute("ALTER TABLE jobs ADD COLUMN tenant_id TEXT")
+
+
+# A posição na lista define a versão (1, 2, ...). Nunca altere ou reordene uma
+# migração já publicada; adicione uma nova ao final.
+MIGRATIONS = [
+    ("criar tabela transactions", _migration_create_transactions),
+    ("normalizar categorias e criar índices", _migration_normalize_category_and_indexes),
+    ("armazenar valores em centavos (amount_cents)", _migration_amount_to_cents),
+    ("totais mensais (monthly_rollups)", _migration_monthly_rollups),
+    ("contadores de escrita (write_generations)", _migration_write_generations),
+    ("cache de relatórios (report_cache)", _migration_report_cache),
+    ("fila de tarefas em segundo plano (jobs)", _migration_jobs),
+    ("inquilino das tarefas (jobs.tenant_id)", _migration_jobs_tenant),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# Só existem no banco principal: nos shards dos inquilinos a versão avança sem aplicá-las
+MAIN_DATABASE_ONLY = {_migration_jobs, _migration_jobs_tenant}
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection, verbose: bool = True, shard: bool = False) -> int:
+    """
+    Aplica, em ordem, as migrações ainda não aplicadas ao banco da conexão.
+    Retorna a versão final do esquema. verbose=False não imprime cada migração
+    (ex.: ao criar o shard de um inquilino); shard=True pula as de MAIN_DATABASE_ONLY.
+    """
+    version = get_schema_version(conn)
+    while version < SCHEMA_VERSION:
+        # BEGIN IMMEDIATE garante que só um processo migre por vez; a versão é
+        # relida dentro da transação caso outro processo tenha migrado antes.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = get_schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.commit()
+                break
+            description, migration = MIGRATIONS[version]
+            skipped = shard and migration in MAIN_DATABASE_ONLY
+            if not skipped:
+                migration(conn)
+            version += 1
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            if verbose and not skipped:
+                print(f"DB: Migração {version} aplicada ({description}).")
+        except Exception:
+            conn.rollback()
+            raise
+    return version
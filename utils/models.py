@@ -0,0 +1,71 @@
+"""
+Tipo de registro das transações, compartilhado entre o banco, as ferramentas do chat,
+os relatórios e o dashboard.
+
+Transaction é uma NamedTuple: cada instância é uma tupla (sem __dict__ por linha), com
+acesso por nome (t.amount) e conversões baratas de e para sqlite3.Row, dicts e colunas.
+A ordem dos campos é a mesma de utils.db.TRANSACTION_COLUMNS.
+"""
+from array import array
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Iterable, Iterator, NamedTuple
+
+
+class Transaction(NamedTuple):
+    id: int | None
+    type: str
+    amount: float # Reais (no banco, amount_cents)
+    category: str
+    description: str
+    date: str # YYYY-MM-DD
+
+    @classmethod
+    def from_row(cls, row) -> "Transaction":
+        """A partir de um sqlite3.Row (ou tupla) com as colunas de TRANSACTION_COLUMNS, na mesma ordem."""
+        return cls(*row)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Transaction":
+        return cls(data.get("id"), data["type"], float(data["amount"]), data["category"], data.get("description") or "", data["date"])
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+CENT = Decimal("0.01")
+
+
+def to_cents(amount: float) -> int:
+    """
+    Converte um valor em reais para centavos inteiros, como é gravado no banco. Usa o valor
+    decimal que o usuário escreveu (str(1.005) == "1.005"), não o float binário, e meio
+    centavo arredonda para longe do zero. A migração 3 usa esta mesma função.
+    """
+    return int(Decimal(str(amount)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def transaction_row_factory(cursor, row) -> Transaction:
+    """row_factory do sqlite3 que gera Transaction direto do cursor."""
+    return Transaction(*row)
+
+
+def transactions_to_columns(transactions: Iterable[Transaction]) -> dict:
+    """
+    Converte transações para colunas: {campo: sequência}. id e amount viram array.array
+    (8 bytes por valor, sem um objeto Python por item; id ausente vira -1); os textos
+    ficam em listas.
+    """
+    columns = {"id": array("q"), "type": [], "amount": array("d"), "category": [], "description": [], "date": []}
+    for t in transactions:
+        columns["id"].append(t.id if t.id is not None else -1)
+        columns["type"].append(t.type)
+        columns["amount"].append(t.amount)
+        columns["category"].append(t.category)
+        columns["description"].append(t.description)
+        columns["date"].append(t.date)
+    return columns
+
+
+def transactions_from_columns(columns: dict) -> Iterator[Transaction]:
+    """Inverso de transactions_to_columns (aceita também listas ou arrays NumPy por coluna)."""
+    return map(Transaction._make, zip(*(columns[field] for field in Transaction._fields)))
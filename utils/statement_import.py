@@ -0,0 +1,223 @@
+"""
+Importação de extratos bancários (CSV e OFX) para o banco de transações.
+
+Os arquivos são lidos de forma incremental e gravados em blocos via
+bulk_add_transactions, então extratos de vários anos não são carregados
+inteiros na memória. Uso:
+
+    python -m utils.statement_import extrato.csv
+    python -m utils.statement_import extrato.ofx --chunk-size 2000
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+from utils.db import BULK_CHUNK_SIZE, bulk_add_transactions, init_db, tenant_scope
+
+DEFAULT_EXPENSE_CATEGORY = "diversos"
+DEFAULT_INCOME_CATEGORY = "outras receitas"
+
+# Cabeçalhos aceitos no CSV (em minúsculas) para cada campo
+CSV_COLUMN_ALIASES = {
+    "date": ("data", "date", "data lançamento", "data lancamento"),
+    "amount": ("valor", "amount", "quantia"),
+    "description": ("descrição", "descricao", "description", "histórico", "historico", "memo"),
+    "category": ("categoria", "category"),
+    "type": ("tipo", "type"),
+}
+CSV_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y')
+
+OFX_TAG_PATTERN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+OFX_READ_SIZE = 64 * 1024
+
+
+def _parse_amount(raw: str) -> float:
+    """Aceita '1234.56', '-1.234,56', 'R$ 50,00' etc."""
+    value = raw.strip().replace("R$", "").replace(" ", "")
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    return float(value)
+
+
+def _parse_csv_date(raw: str) -> str | None:
+    raw = raw.strip()
+    for fmt in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(raw, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def _build_transaction(date_str, amount: float, description: str, category: str = None, transaction_type: str = None) -> dict:
+    """Monta o dict esperado por bulk_add_transactions; sem tipo explícito, o sinal do valor decide."""
+    if transaction_type:
+        transaction_type = transaction_type.strip().lower()
+        if transaction_type in ("saida", "débito", "debito", "debit"):
+            transaction_type = "saída"
+        elif transaction_type in ("crédito", "credito", "credit"):
+            transaction_type = "entrada"
+    else:
+        transaction_type = "saída" if amount is not None and amount < 0 else "entrada"
+    if not category:
+        category = DEFAULT_EXPENSE_CATEGORY if transaction_type == "saída" else DEFAULT_INCOME_CATEGORY
+    return {
+        "type": transaction_type,
+        "amount": abs(amount) if amount is not None else None,  # Rejeitada por bulk_add_transactions
+        "category": category,
+        "description": description or "",
+        "date": date_str,
+    }
+
+
+def iter_csv_transactions(file_obj, delimiter: str = None):
+    """Gera transações linha a linha a partir de um CSV com cabeçalho."""
+    if delimiter is None:
+        sample = file_obj.readline()
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        lines = _chain_first_line(sample, file_obj)
+    else:
+        lines = file_obj
+    reader = csv.reader(lines, delimiter=delimiter)
+    header = [h.strip().lower() for h in next(reader, [])]
+    columns = {}
+    for field, aliases in CSV_COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in header:
+                columns[field] = header.index(alias)
+                break
+    if "date" not in columns or "amount" not in columns:
+        raise ValueError(f"CSV sem colunas de data e valor reconhecíveis: {header}")
+
+    def column(row, field):
+        index = columns.get(field)
+        return row[index] if index is not None and index < len(row) else None
+
+    for row in reader:
+        if not row:
+            continue
+        try:
+            amount = _parse_amount(column(row, "amount"))
+        except (TypeError, ValueError):
+            amount = None
+        yield _build_transaction(
+            _parse_csv_date(column(row, "date") or ""),
+            amount,
+            column(row, "description"),
+            column(row, "category"),
+            column(row, "type"),
+        )
+
+
+def _chain_first_line(first_line: str, file_obj):
+    yield first_line
+    yield from file_obj
+
+
+def _iter_ofx_tags(file_obj):
+    """Tokeniza o OFX (SGML 1.x ou XML 2.x) em blocos, sem ler o arquivo inteiro."""
+    buffer = ""
+    while True:
+        block = file_obj.read(OFX_READ_SIZE)
+        if not block:
+            break
+        buffer += block
+        # Mantém no buffer o último tag, que pode estar incompleto
+        cut = buffer.rfind("<")
+        for match in OFX_TAG_PATTERN.finditer(buffer, 0, cut if cut > 0 else 0):
+            yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+        buffer = buffer[cut:] if cut > 0 else buffer
+    for match in OFX_TAG_PATTERN.finditer(buffer):
+        yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+
+
+def iter_ofx_transactions(file_obj):
+    """Gera uma transação para cada bloco <STMTTRN> do OFX."""
+    current = None
+    for is_closing, tag, value in _iter_ofx_tags(file_obj):
+        if tag == "STMTTRN":
+            # Em SGML o </STMTTRN> pode faltar: um novo bloco fecha o anterior
+            if current is not None:
+                yield _ofx_to_transaction(current)
+            current = None if is_closing else {}
+        elif current is not None and not is_closing:
+            current[tag] = value
+        elif tag == "BANKTRANLIST" and is_closing and current is not None:
+            # SGML sem </STMTTRN>: fecha o último bloco aberto
+            yield _ofx_to_transaction(current)
+            current = None
+
+
+def _ofx_to_transaction(fields: dict) -> dict:
+    raw_date = fields.get("DTPOSTED", "")[:8]
+    try:
+        date_str = datetime.strptime(raw_date, '%Y%m%d').strftime('%Y-%m-%d')
+    except ValueError:
+        date_str = None
+    try:
+        amount = _parse_amount(fields.get("TRNAMT", ""))
+    except ValueError:
+        amount = None
+    description = fields.get("MEMO") or fields.get("NAME") or ""
+    return _build_transaction(date_str, amount, description)
+
+
+def import_statement(path: str, file_format: str = None, chunk_size: int = BULK_CHUNK_SIZE, encoding: str = None) -> dict:
+    """
+    Importa um extrato CSV ou OFX, bloco a bloco, imprimindo o progresso (linhas/s).
+    Retorna as estatísticas de bulk_add_transactions acrescidas do tempo total.
+    """
+    file_format = (file_format or os.path.splitext(path)[1].lstrip(".")).lower()
+    if file_format not in ("csv", "ofx"):
+        raise ValueError(f"Formato de extrato não suportado: '{file_format}'. Use csv ou ofx.")
+    if encoding is None:
+        encoding = "utf-8-sig" if file_format == "csv" else "latin-1"
+
+    init_db()
+    started = time.perf_counter()
+
+    def report_progress(stats):
+        elapsed = time.perf_counter() - started
+        processed = stats["inserted"] + stats["rejected"] + stats["failed_rows"]
+        rate = processed / elapsed if elapsed > 0 else 0
+        print(f"Importação: {stats['inserted']} inseridas, {stats['rejected']} rejeitadas, "
+              f"{stats['failed_chunks']} blocos com erro ({rate:,.0f} linhas/s)")
+
+    with open(path, newline="", encoding=encoding, errors="replace") as file_obj:
+        rows = iter_csv_transactions(file_obj) if file_format == "csv" else iter_ofx_transactions(file_obj)
+        stats = bulk_add_transactions(rows, chunk_size=chunk_size, on_chunk=report_progress)
+
+    stats["elapsed_seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa extratos bancários (CSV ou OFX) para o FinanceBot.")
+    parser.add_argument("paths", nargs="+", help="Arquivos de extrato a importar.")
+    parser.add_argument("--format", choices=("csv", "ofx"), help="Formato do arquivo (padrão: pela extensão).")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="Linhas por transação no banco.")
+    parser.add_argument("--encoding", help="Codificação do arquivo (padrão: utf-8 para CSV, latin-1 para OFX).")
+    parser.add_argument("--tenant", help="Inquilino (usuário ou família) que recebe as transações.")
+    args = parser.parse_args(argv)
+
+    exit_code = 0
+    for path in args.paths:
+        try:
+            with tenant_scope(args.tenant):
+                stats = import_statement(path, args.format, args.chunk_size, args.encoding)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao importar '{path}': {e}")
+            exit_code = 1
+            continue
+        print(f"'{path}': {stats['inserted']} transações importadas em {stats['elapsed_seconds']:.2f}s.")
+        if stats["failed_chunks"]:
+            exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
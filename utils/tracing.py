@@ -0,0 +1,561 @@
+"""
+Rastreamento (tracing) dos turnos do chat: cada mensagem abre um trace com spans filhos
+para as chamadas ao Gemini, as ferramentas e as instruções SQL (texto, linhas e tempos),
+para descobrir o que dominou um turno lento.
+
+Desligado por padrão. Liga com:
+    FINANCEBOT_TRACE_FILE=data/traces.jsonl             # um span por linha (JSONL)
+    FINANCEBOT_TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318 # POST /v1/traces, OTLP/HTTP em JSON
+
+Cada trace é exportado inteiro quando o span raiz termina. Para inspecionar depois:
+    python -m utils.tracing slowest data/traces.jsonl
+    python -m utils.tracing collect --port 4318 --output data/traces.jsonl  # coletor OTLP local
+"""
+import argparse
+import atexit
+import functools
+import json
+import os
+import queue
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_FILE = os.getenv("FINANCEBOT_TRACE_FILE") or None
+TRACE_OTLP_ENDPOINT = os.getenv("FINANCEBOT_TRACE_OTLP_ENDPOINT") or None
+SERVICE_NAME = "financebot"
+SQL_TEXT_LIMIT = 2000  # Caracteres do SQL guardados em db.statement
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "_trace")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self._trace = parent._trace if parent is not None else _Trace(self)
+        self.attributes = attributes
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def add(self, key: str, amount):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_unix_nano": self.start_ns,
+            "end_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Devolvido por span() com o rastreamento desligado: aceita e descarta os atributos."""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add(self, key, amount):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """Spans de um trace, exportados juntos quando a raiz termina."""
+    __slots__ = ("root", "spans", "exported")
+
+    def __init__(self, root: Span):
+        self.root = root
+        self.spans = []
+        self.exported = False
+
+
+_current_span: ContextVar[Span | None] = ContextVar("financebot_current_span", default=None)
+_exporters: list = []
+
+
+def enabled() -> bool:
+    return bool(_exporters)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def configure(*exporters):
+    """Troca os exportadores (sem argumentos, desliga o rastreamento)."""
+    for exporter in _exporters:
+        exporter.shutdown()
+    _exporters[:] = exporters
+
+
+def _export(spans: list):
+    records = [span.to_dict() for span in spans]
+    for exporter in _exporters:
+        try:
+            exporter.export(records)
+        except Exception as e:  # Rastreamento nunca derruba o turno
+            print(f"Tracing: erro ao exportar {len(records)} spans: {e}")
+
+
+def _finish(span: Span):
+    span.end_ns = time.time_ns()
+    trace = span._trace
+    if trace.exported:  # Terminou depois da raiz (ex.: thread que sobreviveu ao turno)
+        _export([span])
+        return
+    trace.spans.append(span)
+    if span is trace.root:
+        trace.exported = True
+        _export(trace.spans)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Span filho do span atual (ou raiz de um novo trace, se não houver). Devolve o Span,
+    para registrar atributos ao longo do bloco; desligado, devolve NOOP_SPAN.
+    """
+    if not _exporters:
+        yield NOOP_SPAN
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current)
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Como span(), mas sempre abre um trace novo (ex.: um turno do chat)."""
+    token = _current_span.set(None)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def use_parent(parent: Span | None):
+    """Torna parent o span atual, para ligar ao trace o trabalho feito em outra thread."""
+    token = _current_span.set(parent)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str, **attributes):
+    """Decorator: cada chamada vira um span name (sem custo além de um teste com o rastreamento desligado)."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _exporters:
+                return function(*args, **kwargs)
+            with span(name, **attributes):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- SQL ---
+
+def _sql_attributes(sql: str, params, database: str) -> dict:
+    statement = _WHITESPACE.sub(" ", sql).strip()
+    return {
+        "db.system": "sqlite",
+        "db.name": database,
+        "db.operation": statement.split(" ", 1)[0].upper(),
+        "db.statement": statement[:SQL_TEXT_LIMIT],
+        "db.params": len(params) if params is not None else 0,
+    }
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor que abre um span por instrução, só dentro de um trace. As linhas lidas (db.rows)
+    e o tempo dos fetch (db.fetch_ms) entram no span da instrução, que se estende até o
+    último fetch.
+    """
+    _span = None
+
+    def execute(self, sql, parameters=()):
+        parent = _current_span.get()
+        if parent is None:
+            self._span = None
+            return super().execute(sql, parameters)
+        statement = Span("sql", parent, _sql_attributes(sql, parameters, self.connection.database_name))
+        self._span = None
+        try:
+            super().execute(sql, parameters)
+        except BaseException as e:
+            statement.error = f"{type(e).__name__}: {e}"
+            _finish(statement)
+            raise
+        if self.description is None:  # Escrita: rowcount já é o número de linhas afetadas
+            statement.attributes["db.rows"] = self.rowcount
+            _finish(statement)
+        else:
+            statement.attributes["db.rows"] = 0
+            statement.attributes["db.fetch_ms"] = 0.0
+            statement.end_ns = time.time_ns()
+            statement._trace.spans.append(statement)
+            self._span = statement
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        parent = _current_span.get()
+        if parent is None:
+            return super().executemany(sql, seq_of_parameters)
+        statement = Span("sql", parent, _sql_attributes(sql, None, self.connection.database_name))
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except BaseException as e:
+            statement.error = f"{type(e).__name__}: {e}"
+            raise
+        else:
+            statement.attributes["db.rows"] = self.rowcount
+        finally:
+            _finish(statement)
+        return self
+
+    def _fetched(self, started: int, rows: int):
+        statement = self._span
+        now = time.time_ns()
+        statement.attributes["db.rows"] += rows
+        statement.attributes["db.fetch_ms"] += (now - started) / 1e6
+        statement.end_ns = now
+
+    def fetchone(self):
+        if self._span is None:
+            return super().fetchone()
+        started = time.time_ns()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        if self._span is None:
+            return super().fetchmany(self.arraysize if size is None else size)
+        started = time.time_ns()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._span is None:
+            return super().fetchall()
+        started = time.time_ns()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        if self._span is None:
+            return super().__next__()
+        started = time.time_ns()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0)
+            raise
+        self._fetched(started, 1)
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """Conexão (sqlite3.connect(..., factory=TracedConnection)) cujas instruções viram spans 'sql'."""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.database_name = os.path.basename(str(database))
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """
+    Fábrica para sqlite3.connect: TracedConnection se o rastreamento estiver ligado. O pool
+    de utils.db compara a conexão com esta fábrica a cada get_db_connection(), então um
+    configure() em tempo de execução vale também para as conexões já abertas.
+    """
+    return TracedConnection if _exporters else sqlite3.Connection
+
+
+# --- Exportadores ---
+
+class JsonlExporter:
+    """Acrescenta cada span como uma linha JSON em path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, records: list):
+        lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def shutdown(self):
+        pass
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _plain_value(value: dict):
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()), None)
+
+
+def to_otlp(records: list, service_name: str = SERVICE_NAME) -> dict:
+    """Spans (dicts de Span.to_dict) no corpo JSON de um POST OTLP/HTTP em /v1/traces."""
+    spans = []
+    for record in records:
+        attributes = [{"key": key, "value": _otlp_value(value)} for key, value in record["attributes"].items() if value is not None]
+        span = {
+            "traceId": record["trace_id"],
+            "spanId": record["span_id"],
+            "name": record["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(record["start_unix_nano"]),
+            "endTimeUnixNano": str(record["end_unix_nano"]),
+            "attributes": attributes,
+            "status": {"code": 2, "message": record["error"]} if record["error"] else {"code": 1},
+        }
+        if record["parent_span_id"]:
+            span["parentSpanId"] = record["parent_span_id"]
+        spans.append(span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "utils.tracing"}, "spans": spans}],
+    }]}
+
+
+def from_otlp(body: dict) -> list:
+    """O inverso de to_otlp: os spans de um corpo OTLP/JSON como dicts no formato do JSONL."""
+    records = []
+    for resource_spans in body.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                status = span.get("status", {})
+                records.append({
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_span_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "start_unix_nano": start,
+                    "end_unix_nano": end,
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "status": "error" if status.get("code") == 2 else "ok",
+                    "error": status.get("message"),
+                    "attributes": {attribute["key"]: _plain_value(attribute["value"]) for attribute in span.get("attributes", [])},
+                })
+    return records
+
+
+class OtlpHttpExporter:
+    """
+    Envia os traces a um coletor OTLP/HTTP (JSON) numa thread própria, para o turno
+    não esperar pela rede. Falhas de envio são impressas e os spans, descartados.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="financebot-trace-export", daemon=True)
+        self._thread.start()
+
+    def export(self, records: list):
+        self._queue.put(records)
+
+    def _run(self):
+        while True:
+            records = self._queue.get()
+            if records is None:
+                return
+            body = json.dumps(to_otlp(records, self.service_name)).encode()
+            request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except OSError as e:
+                print(f"Tracing: falha ao enviar {len(records)} spans para {self.url}: {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Envia o que estiver na fila e encerra a thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+def _configure_from_env():
+    exporters = []
+    if TRACE_FILE:
+        exporters.append(JsonlExporter(TRACE_FILE))
+    if TRACE_OTLP_ENDPOINT:
+        exporters.append(OtlpHttpExporter(TRACE_OTLP_ENDPOINT))
+    if exporters:
+        configure(*exporters)
+        atexit.register(configure)  # Esvazia a fila do exportador OTLP no encerramento
+
+
+_configure_from_env()
+
+
+# --- Ferramentas de linha de comando: coletor local e análise offline ---
+
+class _CollectorRequestHandler(BaseHTTPRequestHandler):
+    exporter: JsonlExporter = None
+
+    def do_POST(self):
+        if self.path != "/v1/traces":
+            self.send_error(404)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = from_otlp(body)
+        except (ValueError, KeyError) as e:
+            self.send_error(400, str(e))
+            return
+        self.exporter.export(records)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_collector(output: str, port: int = 4318, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Coletor OTLP/HTTP mínimo que grava os spans recebidos em output (JSONL). Chame serve_forever()."""
+    handler = type("CollectorRequestHandler", (_CollectorRequestHandler,), {"exporter": JsonlExporter(output)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def load_traces(path: str) -> dict:
+    """Lê um arquivo JSONL de spans e agrupa por trace_id."""
+    traces = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                traces.setdefault(record["trace_id"], []).append(record)
+    return traces
+
+
+def summarize_trace(spans: list) -> dict:
+    """Raiz, tempo total e tempo somado por nome de span (ex.: quanto do turno foi SQL ou Gemini)."""
+    ids = {span["span_id"] for span in spans}
+    root = next((span for span in spans if span["parent_span_id"] not in ids), spans[0])
+    by_name = {}
+    for span in spans:
+        if span is root:
+            continue
+        entry = by_name.setdefault(span["name"], {"count": 0, "total_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += span["duration_ms"]
+    slowest_sql = sorted((span for span in spans if span["name"] == "sql"), key=lambda span: span["duration_ms"], reverse=True)
+    return {"root": root, "duration_ms": root["duration_ms"], "by_name": by_name, "slowest_sql": slowest_sql[:3]}
+
+
+def _print_slowest(path: str, limit: int):
+    summaries = sorted((summarize_trace(spans) for spans in load_traces(path).values()),
+                       key=lambda summary: summary["duration_ms"], reverse=True)
+    for summary in summaries[:limit]:
+        root = summary["root"]
+        print(f"\n{root['duration_ms']:9.1f} ms  {root['name']}  trace {root['trace_id']}  {root['attributes']}")
+        for name, entry in sorted(summary["by_name"].items(), key=lambda item: item[1]["total_ms"], reverse=True):
+            print(f"    {name:40s} {entry['count']:4d}x {entry['total_ms']:9.1f} ms")
+        for statement in summary["slowest_sql"]:
+            attributes = statement["attributes"]
+            print(f"    sql {statement['duration_ms']:8.1f} ms, {attributes.get('db.rows')} linhas: {attributes.get('db.statement', '')[:120]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coletor e análise dos traces do FinanceBot.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    slowest = commands.add_parser("slowest", help="Mostra os traces mais lentos de um arquivo JSONL.")
+    slowest.add_argument("path", help="Arquivo JSONL (FINANCEBOT_TRACE_FILE ou saída do coletor).")
+    slowest.add_argument("--limit", type=int, default=10, help="Quantos traces mostrar.")
+    collect = commands.add_parser("collect", help="Recebe traces OTLP/HTTP (JSON) e grava em JSONL.")
+    collect.add_argument("--output", default=os.path.join("data", "traces.jsonl"), help="Arquivo JSONL de saída.")
+    collect.add_argument("--port", type=int, default=4318, help="Porta HTTP (padrão OTLP/HTTP: 4318).")
+    collect.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args(argv)
+
+    if args.command == "slowest":
+        try:
+            _print_slowest(args.path, args.limit)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao ler '{args.path}': {e}")
+            return 1
+        return 0
+    server = run_collector(args.output, args.port, args.host)
+    print(f"Coletor OTLP em http://{args.host}:{args.port}/v1/traces, gravando em '{args.output}' (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())